@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+RedLens 数据工厂 - 回放 PID 批量审计 (替代 verify_pid.py)
+功能:
+1. 对咪咕数据文件中每场已完赛、带直播间 (mgdbId) 的比赛，重新请求 all-view-list，
+   逐个核对已存的 PID (migu_pid / migu_pid_mandarin / migu_pid_cantonese):
+   - missing: PID 不在回放列表里 (已下架，或 API 当时返回了错误的 PID)
+   - highlight: PID 对应的是集锦
+   - short: 时长不足 AUDIT_MIN_MINUTES 分钟
+   - unreachable: all-view-list 请求失败，无法核对
+2. 复用抓取器的 aiohttp 连接池、响应缓存与容错层 (限速 / 重试 / 熔断)，--concurrency 为并发上限；
+   同一 mgdbId 只请求一次，结果按 mgdbId 缓存 (响应缓存按完赛时间设 TTL，完赛一周以上的场次重跑审计不回源)
+3. 有问题的 PID 按 rank_replays 的当前选择给出替换建议；--write-corrections 时合并写入 PID_CORRECTIONS_FILE，
+   抓取器输出前自动加载 (条目带 was，抓取器之后自己选出新 PID 时不再覆盖)
+4. --report 输出 JSON 报告 (每个问题一条)
+
+用法: python3 DataFactory/audit_pids.py [--input migu_videos_complete.json | --club Chelsea] [--concurrency 16]
+                                        [--write-corrections] [--report audit_report.json]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+import metrics
+from fetch_all_migu_videos import (OUTPUT_FILE, PID_CORRECTIONS_FILE, PID_FIELDS, CompleteMiguFetcher,
+                                   club_output_file, load_pid_corrections)
+from io_utils import atomic_write_json
+from replay_ranker import REPLAY_MIN_SECONDS, ReplayRecord, parse_replay, rank_replays
+
+try:
+    import aiohttp
+except ImportError:  # 未安装 aiohttp 时逐个请求
+    aiohttp = None
+
+logger = logging.getLogger("audit_pids")
+
+# ===== 配置区 =====
+AUDIT_CONCURRENCY = int(os.getenv("MIGU_AUDIT_CONCURRENCY", "16"))
+AUDIT_MIN_MINUTES = int(os.getenv("MIGU_AUDIT_MIN_MINUTES", str(REPLAY_MIN_SECONDS // 60)))  # 低于此时长视为 short
+# PID 字段 -> rank_replays 结果里对应的位置
+RANK_SLOT = {'migu_pid': 'primary', 'migu_pid_mandarin': 'mandarin', 'migu_pid_cantonese': 'cantonese'}
+
+
+def mgdb_id_of(match: Dict) -> str:
+    live_url = match.get('migu_live_url') or match.get('live_url') or ''
+    return live_url.split('/p/live/')[-1] if '/p/live/' in live_url else ''
+
+
+def check_pid(pid: str, videos: Dict[str, ReplayRecord]) -> Optional[str]:
+    """PID 在回放列表中的问题 (missing / highlight / short)，没有问题返回 None"""
+    video = videos.get(pid)
+    if video is None:
+        return 'missing'
+    if video.highlight:
+        return 'highlight'
+    if video.seconds < AUDIT_MIN_MINUTES * 60:
+        return 'short'
+    return None
+
+
+class PidAuditor:
+    """并发重新解析全部已存 PID；replays 为 mgdbId -> replayList 的结果缓存 (None = 请求失败)"""
+
+    def __init__(self, concurrency: int = AUDIT_CONCURRENCY, fetcher: Optional[CompleteMiguFetcher] = None):
+        self.concurrency = max(1, concurrency)
+        self.fetcher = fetcher or CompleteMiguFetcher(list_concurrency=1, replay_concurrency=self.concurrency,
+                                                      per_host_limit=self.concurrency, checkpoint=False)
+        self.replays: Dict[str, Optional[List[Dict]]] = {}
+
+    @staticmethod
+    def _replay_list(data: Optional[Dict]) -> Optional[List[Dict]]:
+        if not isinstance(data, dict):
+            return None
+        return (data.get('body') or {}).get('replayList') or []
+
+    async def _fetch_async(self, targets: Dict[str, str]):
+        semaphore = asyncio.Semaphore(self.concurrency)
+        async with self.fetcher._new_aio_session() as session:
+            async def fetch(mgdb_id: str, match_date: str):
+                async with semaphore:
+                    data = await self.fetcher.fetch_view_list_async(session, mgdb_id, match_date)
+                self.replays[mgdb_id] = self._replay_list(data)
+
+            await asyncio.gather(*(fetch(mgdb_id, d) for mgdb_id, d in targets.items()))
+
+    def fetch(self, targets: Dict[str, str]):
+        """targets: mgdbId -> 比赛日期 (决定响应缓存 TTL)；已在 replays 中的不再请求"""
+        targets = {k: v for k, v in targets.items() if k not in self.replays}
+        if not targets:
+            return
+        if aiohttp is None:
+            logger.warning("⚠️ 未安装 aiohttp，逐个请求")
+            for mgdb_id, match_date in targets.items():
+                self.replays[mgdb_id] = self._replay_list(self.fetcher.fetch_view_list(mgdb_id, match_date))
+        else:
+            self.fetcher._run_async(self._fetch_async(targets))
+
+    def audit(self, matches: List[Dict], club: Optional[str] = None) -> Tuple[List[Dict], List[Dict]]:
+        """返回 (问题列表, 修正建议)"""
+        targets = {}
+        for match in matches:
+            mgdb_id = mgdb_id_of(match)
+            if match.get('is_finished') and mgdb_id and any(match.get(f) for f in PID_FIELDS):
+                targets.setdefault(mgdb_id, match.get('date', ''))
+        self.fetch(targets)
+
+        issues, corrections = [], []
+        for match in matches:
+            mgdb_id = mgdb_id_of(match)
+            if mgdb_id not in targets:
+                continue
+            replay_list = self.replays.get(mgdb_id)
+            base = {'date': match.get('date'), 'opponent': match.get('opponent'), 'mgdb_id': mgdb_id}
+            if club:
+                base['club'] = club
+            if replay_list is None:
+                issues.append(dict(base, problem='unreachable'))
+                continue
+            videos = {}
+            for index, video in enumerate(replay_list):
+                videos.setdefault(video.get('pID', ''), parse_replay(video, index))
+            ranked = rank_replays(replay_list) or {}
+            for field in PID_FIELDS:
+                pid = match.get(field)
+                problem = check_pid(pid, videos) if pid else None
+                if problem is None:
+                    continue
+                suggestion = ranked.get(RANK_SLOT[field])
+                if suggestion == pid or (suggestion and check_pid(suggestion, videos)):
+                    suggestion = None
+                issues.append(dict(base, field=field, pid=pid, problem=problem, suggestion=suggestion))
+                if suggestion:
+                    corrections.append(dict(base, field=field, pid=suggestion, was=pid, reason=problem))
+        return issues, corrections
+
+    def close(self):
+        self.fetcher.resilience.log_stats()
+        self.fetcher.resilience.export_metrics()
+        if self.fetcher.cache:
+            self.fetcher.cache.log_stats()
+        self.fetcher.close()
+
+
+def merge_corrections(existing: List[Dict], new: List[Dict]) -> List[Dict]:
+    """按 (俱乐部, 日期, 对手, 字段) 合并，新建议覆盖旧条目，手工条目保留"""
+    def key(c: Dict):
+        return c.get('club'), c.get('date'), c.get('opponent'), c.get('field', 'migu_pid')
+
+    merged = {key(c): c for c in existing}
+    merged.update({key(c): {k: v for k, v in c.items() if k != 'mgdb_id'} for c in new})
+    return sorted(merged.values(), key=lambda c: (c.get('club') or '', c.get('date') or '', c.get('opponent') or ''))
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
+    parser = argparse.ArgumentParser(description="RedLens 回放 PID 批量审计")
+    parser.add_argument('--input', default=None, help=f"咪咕数据文件 (默认 {OUTPUT_FILE})")
+    parser.add_argument('--club', default=None, help="审计其他俱乐部的输出文件 (英文名，如 Chelsea)")
+    parser.add_argument('--concurrency', type=int, default=AUDIT_CONCURRENCY, help="all-view-list 并发上限")
+    parser.add_argument('--write-corrections', action='store_true', help=f"把替换建议合并写入 {PID_CORRECTIONS_FILE}")
+    parser.add_argument('--report', default=None, help="JSON 报告输出路径")
+    args = parser.parse_args()
+
+    path = args.input or (club_output_file(args.club) if args.club else OUTPUT_FILE)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            matches = json.load(f)
+        started = time.monotonic()
+        auditor = PidAuditor(args.concurrency)
+        try:
+            issues, corrections = auditor.audit(matches, club=args.club)
+        finally:
+            auditor.close()
+        elapsed = time.monotonic() - started
+    except Exception as e:
+        logger.error(f"❌ PID 审计失败: {e}")
+        sys.exit(1)
+
+    for issue in issues:
+        if issue['problem'] == 'unreachable':
+            logger.warning(f"⚠️ {issue['date']} {issue['opponent']}: all-view-list 请求失败 (mgdbId={issue['mgdb_id']})")
+            continue
+        hint = f" → 建议 {issue['suggestion']}" if issue['suggestion'] else " (无可替换的全场回放)"
+        logger.warning(f"❌ {issue['date']} {issue['opponent']} {issue['field']}={issue['pid']}: {issue['problem']}{hint}")
+
+    counts: Dict[str, int] = {}
+    for issue in issues:
+        counts[issue['problem']] = counts.get(issue['problem'], 0) + 1
+    checked = sum(1 for m in matches if mgdb_id_of(m) in auditor.replays for f in PID_FIELDS if m.get(f))
+    logger.info(f"🔎 PID 审计完成: {len(auditor.replays)} 个 mgdbId / {checked} 个 PID，"
+                f"问题 {len(issues)} 个 {counts or ''}，耗时 {elapsed:.1f}s")
+    metrics.record_records('audit', mgdb_ids=len(auditor.replays), pids=checked, issues=len(issues),
+                           corrections=len(corrections), **counts)
+
+    if args.report:
+        atomic_write_json(args.report, {'input': path, 'issues': issues, 'corrections': corrections})
+        logger.info(f"📝 报告已写出: {args.report}")
+    if args.write_corrections:
+        if corrections:
+            merged = merge_corrections(load_pid_corrections(), corrections)
+            atomic_write_json(PID_CORRECTIONS_FILE, merged)
+            logger.info(f"🔧 {len(corrections)} 条修正已写入 {PID_CORRECTIONS_FILE} (共 {len(merged)} 条)，下次抓取自动生效")
+        else:
+            logger.info("✅ 没有需要修正的 PID")
+
+
+if __name__ == "__main__":
+    main()
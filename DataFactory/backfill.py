@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+RedLens 数据工厂 - 多赛季历史回填
+功能:
+1. 按赛季范围 (起始年份，如 2015-2024) 逐季确定需要抓取的日期:
+   - 有该赛季的赛程页 (--fixtures-dir 下的 {赛季}.html，或 ARSENAL_SEASON_URL 模板) 时，按赛季推断年份解析，
+     只抓赛程上的日期
+   - 否则按已学到的 match-list 窗口宽度平铺整个赛季 (8 月 1 日 - 次年 7 月 31 日)，窗口未知时先每个赛事探测一次
+2. 所有赛季的任务合并成一次抓取: 同一个连接池、同一套限速 / 重试 / 熔断，
+   --concurrency 是 match-list 与回放请求共用的全局并发预算；断点日志照常生效，中断后重跑同一命令即可续抓
+3. 赛事 ID 按赛季查: COMPETITIONS_FILE ({"2015": {"FA Cup": "..."}}) 里有该赛季的条目时用它，
+   否则沿用当前赛季的 COMPETITION_MAP —— 咪咕早年的赛事 ID 未经核实，若与现在不同，需要在该文件里补上，
+   否则那些赛季对应赛事的请求会落空 (list 响应为空)
+4. 结果按赛季拆分写到 {output-dir}/{2015-16}/ 下 (migu_videos_complete.json，有赛程时另有
+   matches.json / matches_with_videos.json；MIGU_TRACKED_CLUBS 中的其他俱乐部各有 migu_videos_{slug}.json)，
+   不改动当前赛季的状态库和数据文件
+
+用法: python3 DataFactory/backfill.py --seasons 2015-2024 [--concurrency 8] [--fixtures-dir DIR] [--output-dir backfill]
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Set, Tuple
+
+import fetch_fixtures
+import generate_deep_links
+import merge_data
+from fetch_all_migu_videos import COMPETITION_MAP, CompleteMiguFetcher, club_output_file
+from io_utils import atomic_write_json
+from scan_journal import ScanJournal
+from window_planner import DATE_FORMAT
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
+logger = logging.getLogger("backfill")
+
+# ===== 配置区 =====
+BACKFILL_DIR = "backfill"
+DEFAULT_CONCURRENCY = int(os.getenv("BACKFILL_CONCURRENCY", "8"))
+SEASON_URL_TEMPLATE = os.getenv("ARSENAL_SEASON_URL", "")     # 历史赛程页地址模板，{season} 替换为起始年份
+COMPETITIONS_FILE = os.getenv("BACKFILL_COMPETITIONS_FILE", "migu_competitions.json")  # 按赛季覆盖赛事 ID，可选
+PROBE_DAYS = ((10, 15), (2, 15))                               # 窗口未知时的探测日期 (月, 日)，赛季中段
+
+Task = Tuple[str, str]  # (YYYYMMDD, comp_id)
+
+
+def parse_seasons(text: str) -> List[int]:
+    """'2015-2024' -> [2015, ..., 2024]；'2019' -> [2019]"""
+    start, _, end = text.partition('-')
+    first, last = int(start), int(end or start)
+    if last < first:
+        raise ValueError(f"赛季范围无效: {text}")
+    return list(range(first, last + 1))
+
+
+def season_label(season: int) -> str:
+    return f"{season}-{(season + 1) % 100:02d}"
+
+
+def season_bounds(season: int) -> Tuple[date, date]:
+    """赛季覆盖的日期 (含)，与 fetch_fixtures 的跨年规则一致"""
+    start = date(season, fetch_fixtures.SEASON_ROLLOVER_MONTH, 1)
+    return start, date(season + 1, fetch_fixtures.SEASON_ROLLOVER_MONTH, 1) - timedelta(days=1)
+
+
+def season_of(date_str: str) -> Optional[int]:
+    try:
+        day = datetime.strptime(date_str, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        return None
+    return day.year if day.month >= fetch_fixtures.SEASON_ROLLOVER_MONTH else day.year - 1
+
+
+def load_season_fixtures(season: int, fixtures_dir: Optional[str]) -> Optional[List[Dict]]:
+    """该赛季的赛程 (本地存档优先，其次 ARSENAL_SEASON_URL)；都没有时返回 None"""
+    content = None
+    if fixtures_dir:
+        path = os.path.join(fixtures_dir, f"{season}.html")
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                content = f.read()
+    if content is None and SEASON_URL_TEMPLATE:
+        url = SEASON_URL_TEMPLATE.format(season=season)
+        try:
+            response = fetch_fixtures._get_page(fetch_fixtures.HEADERS, url)
+            if response.status_code == 200:
+                content = response.content
+            else:
+                logger.warning(f"⚠️ {season_label(season)} 赛程页返回 HTTP {response.status_code}")
+        except Exception as e:
+            logger.warning(f"⚠️ {season_label(season)} 赛程页抓取失败: {e}")
+    if content is None:
+        return None
+    first, last = season_bounds(season)
+    fixtures = [m for m in fetch_fixtures.parse_fixtures_html(content, season=season)
+                if first.isoformat() <= m['date'] <= last.isoformat()]
+    return fixtures or None
+
+
+def load_competition_overrides(path: str = COMPETITIONS_FILE) -> Dict[int, Dict[str, str]]:
+    """{赛季起始年份: {赛事名: 咪咕赛事 ID}}；文件不存在时为空"""
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return {int(season): ids for season, ids in json.load(f).items()}
+
+
+def competition_ids(season: int, names: List[str], overrides: Dict[int, Dict[str, str]]) -> Dict[str, str]:
+    """该赛季选中赛事的 ID: 覆盖表优先，其次是当前赛季的 COMPETITION_MAP"""
+    ids = dict(COMPETITION_MAP, **overrides.get(season, {}))
+    return {name: ids[name] for name in names}
+
+
+def fixture_tasks(fixtures: List[Dict], comp_ids: Dict[str, str]) -> Set[Task]:
+    """comp_ids: 赛事名 -> 该赛季的赛事 ID"""
+    tasks = set()
+    for match in fixtures:
+        comp_id = comp_ids.get(match.get('competition'))
+        if comp_id is not None:
+            tasks.add((match['date'].replace('-', ''), comp_id))
+    return tasks
+
+
+def sweep_tasks(season: int, comp_id: str, window: Tuple[int, int], today: date) -> Set[Task]:
+    """
+    按窗口宽度平铺整个赛季: 锚点 a 覆盖 [a+lo, a+hi]，相邻锚点间隔一个窗口宽度。
+    只把锚点作为需要的日期交给抓取器 —— 若把每一天都列为需要，没有比赛的日期不在任何响应的
+    matchList 里，会被窗口规划器逐日补抓。
+    """
+    lo, hi = window
+    first, last = season_bounds(season)
+    last = min(last, today)
+    tasks = set()
+    anchor = first - timedelta(days=lo)
+    while anchor + timedelta(days=lo) <= last:
+        tasks.add((min(anchor, today).strftime(DATE_FORMAT), comp_id))
+        anchor += timedelta(days=hi - lo + 1)
+    return tasks
+
+
+def probe_windows(fetcher: CompleteMiguFetcher, seasons: List[int], comp_ids: Set[str], engine: Optional[str]):
+    """没有学到窗口的赛事先在赛季中段探测一次，避免平铺退化为逐日请求"""
+    unknown = sorted(c for c in comp_ids if fetcher.planner.window(c) == (0, 0))
+    if not unknown:
+        return
+    season = seasons[-1]
+    probes = {(date(season if month >= fetch_fixtures.SEASON_ROLLOVER_MONTH else season + 1, month, day)
+               .strftime(DATE_FORMAT), comp_id)
+              for comp_id in unknown for month, day in PROBE_DAYS}
+    logger.info(f"🔭 探测 match-list 窗口: 赛事 {', '.join(unknown)} ({len(probes)} 个请求)")
+    journal, fetcher.journal = fetcher.journal, ScanJournal(enabled=False)  # 探测不覆盖回填的断点日志
+    try:
+        fetcher.fetch_all_season(mode="probe", engine=engine, tasks=probes)
+    finally:
+        fetcher.journal = journal
+
+
+def write_season(output_dir: str, season: int, migu: List[Dict], fixtures: Optional[List[Dict]],
+                 clubs: Optional[Dict[str, List[Dict]]] = None):
+    directory = os.path.join(output_dir, season_label(season))
+    os.makedirs(directory, exist_ok=True)
+    atomic_write_json(os.path.join(directory, "migu_videos_complete.json"), migu)
+    summary = f"咪咕 {len(migu)} 条 (录像 {sum(1 for m in migu if m.get('migu_pid'))})"
+    for club, records in (clubs or {}).items():
+        atomic_write_json(os.path.join(directory, club_output_file(club)), records)
+        summary += f" | {club} {len(records)} 条"
+    if fixtures:
+        merged = merge_data.merge_data(fixtures, migu, previous=[])
+        generate_deep_links.process_links(merged, force=True)
+        atomic_write_json(os.path.join(directory, fetch_fixtures.OUTPUT_FILE), fixtures)
+        atomic_write_json(os.path.join(directory, merge_data.OUTPUT_FILE), merged)
+        summary += f" | 赛程 {len(fixtures)} 场，匹配录像 {sum(1 for m in merged if m.get('migu_pid'))} 场"
+    logger.info(f"💾 {season_label(season)}: {summary} -> {directory}")
+
+
+def run_backfill(seasons: List[int], concurrency: int = DEFAULT_CONCURRENCY, fixtures_dir: Optional[str] = None,
+                 output_dir: str = BACKFILL_DIR, engine: Optional[str] = None,
+                 competitions: Optional[List[str]] = None) -> Dict[int, List[Dict]]:
+    budget = max(2, concurrency)
+    list_concurrency = (budget + 1) // 2
+    fetcher = CompleteMiguFetcher(list_concurrency=list_concurrency, replay_concurrency=budget - list_concurrency,
+                                  per_host_limit=budget)
+    overrides = load_competition_overrides()
+    season_comps = {season: competition_ids(season, list(competitions or COMPETITION_MAP), overrides)
+                    for season in seasons}
+    today = datetime.now().date()
+    logger.info(f"🚀 历史回填 | 赛季: {season_label(seasons[0])} ~ {season_label(seasons[-1])} | "
+                f"并发预算: {budget} (list {list_concurrency} / replay {budget - list_concurrency})")
+
+    season_fixtures = {season: load_season_fixtures(season, fixtures_dir) for season in seasons}
+    if any(season_fixtures[s] is None for s in seasons):
+        probe_windows(fetcher, seasons, {c for ids in season_comps.values() for c in ids.values()}, engine)
+
+    tasks: Set[Task] = set()
+    for season in seasons:
+        fixtures = season_fixtures[season]
+        if fixtures is not None:
+            season_tasks = fixture_tasks(fixtures, season_comps[season])
+            source = f"赛程 {len(fixtures)} 场"
+        else:
+            season_tasks = set()
+            for comp_id in set(season_comps[season].values()):
+                season_tasks |= sweep_tasks(season, comp_id, fetcher.planner.window(comp_id), today)
+            source = "无赛程，按窗口平铺"
+        logger.info(f"   📅 {season_label(season)}: {len(season_tasks)} 个 (日期, 赛事) [{source}]")
+        tasks |= season_tasks
+
+    records = fetcher.fetch_all_season(mode="backfill", engine=engine, tasks=tasks)
+
+    by_season: Dict[int, List[Dict]] = {season: [] for season in seasons}
+    for record in records:
+        season = season_of(record.get('date'))
+        if season in by_season:
+            by_season[season].append(record)
+    clubs_by_season: Dict[int, Dict[str, List[Dict]]] = {season: {} for season in seasons}
+    for club, club_records in fetcher.club_results.items():
+        for season in seasons:
+            clubs_by_season[season][club] = []
+        for record in club_records:
+            season = season_of(record.get('date'))
+            if season in clubs_by_season:
+                clubs_by_season[season][club].append(record)
+    for season in seasons:
+        write_season(output_dir, season, by_season[season], season_fixtures[season], clubs_by_season[season])
+    fetcher.journal.clear()
+    fetcher.close()
+    return by_season
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RedLens 多赛季历史回填 (赛程 + 咪咕录像)")
+    parser.add_argument('--seasons', required=True, help="赛季起始年份范围，如 2015-2024 或 2019")
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY, help="全局并发预算 (list + replay)")
+    parser.add_argument('--fixtures-dir', default=None, help="历史赛程页存档目录 ({赛季起始年份}.html)")
+    parser.add_argument('--output-dir', default=BACKFILL_DIR, help="按赛季输出的根目录")
+    parser.add_argument('--engine', default=None, choices=['async', 'sync'], help="咪咕抓取引擎 (默认读取 FETCH_ENGINE)")
+    parser.add_argument('--competitions', nargs='+', default=None, choices=sorted(COMPETITION_MAP),
+                        help="只回填这些赛事 (默认全部)")
+    args = parser.parse_args()
+
+    try:
+        run_backfill(parse_seasons(args.seasons), concurrency=args.concurrency, fixtures_dir=args.fixtures_dir,
+                     output_dir=args.output_dir, engine=args.engine, competitions=args.competitions)
+    except Exception as e:
+        logger.error(f"❌ 回填失败: {e}")
+        sys.exit(1)
+    logger.info("✅ 完成!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""
+RedLens 赛程解析器基准
+功能:
+1. 生成多赛季的 arsenal.com 赛程页存档 (页头/脚本/样式/导航 + 一线队/女足/U21 混合行，
+   含实体、注释、<br>、(H)/(A)、Tickets/Report 等真实页面里的干扰)；也可用 --archive-dir 指向录制的 .html 目录
+2. 校验 快速模式 (流式只取 <tr>) / bs4 模式 / 原实现 三者在每一页上的输出完全一致；
+   另用随机拼接的干扰词片段 (互相紧贴、首尾交叠) 逐条比对 remove_noise_terms 与原先的逐词替换
+3. 对比三者的吞吐 (页/秒、行/秒、MB/秒)
+
+用法: python3 DataFactory/bench_fixture_parser.py [--seasons 10] [--repeat 5] [--fuzz 200000] [--archive-dir DataFactory/standin_fixtures]
+"""
+
+import argparse
+import glob
+import logging
+import os
+import random
+import re
+import time
+from datetime import date, datetime, timedelta
+from typing import Callable, List, Tuple
+
+from bs4 import BeautifulSoup
+
+import fetch_fixtures
+from fetch_fixtures import parse_arsenal_date, parse_fixtures_html
+
+logger = logging.getLogger(__name__)
+
+OPPONENTS = [
+    'Aston Villa', 'Bournemouth', 'Brentford', 'Brighton &amp; Hove Albion', 'Burnley', 'Chelsea', 'Crystal Palace',
+    'Everton', 'Fulham', 'Leeds United', 'Liverpool', 'Manchester City', 'Manchester United', 'Newcastle United',
+    'Nottingham Forest', 'Sunderland', 'Tottenham Hotspur', 'West Ham United', 'Wolves', 'Athletic Club',
+    'Atletico Madrid', 'Bayern Munich', 'Club Brugge', 'Inter Milan', 'Olympiacos', 'Slavia Prague', 'Port Vale',
+    'Portsmouth', 'Wigan Athletic',
+]
+COMPETITIONS = ['Premier League'] * 6 + ['UEFA Champions League'] * 2 + ['FA Cup', 'Carabao Cup']
+FIXTURES_PER_SEASON = 60
+EXTRA_ROWS_PER_SEASON = 40      # 女足 / U21 / 表头等不会被提取的行
+SCRIPT_KB = 120                 # 每页内联脚本体积 (真实页面有大量埋点与 JSON)
+
+
+def legacy_remove_noise_terms(text, competition):
+    """原实现的干扰词移除: 按列表顺序逐个不区分大小写替换"""
+    remove_list = [
+        competition, "Arsenal", "Home", "Away", 
+        "Carabao Cup", "League Cup", "Premier League", "Champions League", "UEFA", "FA Cup",
+        "Mens", "Women", "Tickets", "Report", "Highlights",
+        "(H)", "(A)", " V ", " v ", " vs " # 移除 " V "
+    ]
+    for term in remove_list:
+        # 使用不区分大小写的替换
+        pattern = re.compile(re.escape(term), re.IGNORECASE)
+        text = pattern.sub("", text)
+    return text
+
+
+def fuzz_noise_terms(count: int, seed: int) -> int:
+    """随机拼接干扰词及其前后缀片段 (不加空格)，返回 remove_noise_terms 与原实现不一致的条数"""
+    rng = random.Random(seed)
+    competitions = sorted(set(COMPETITIONS) | {'League Cup'})
+    terms = list(fetch_fixtures.REMOVE_TERMS) + competitions
+    fragments = terms + [t[:k] for t in terms for k in range(1, len(t))] + [t[k:] for t in terms for k in range(1, len(t))]
+    fragments += list("abcxyzUE ()-vV") + ['Chelsea', 'Womens']
+    mismatches = 0
+    for _ in range(count):
+        text = "".join(rng.choice(fragments) for _ in range(rng.randint(1, 8)))
+        competition = rng.choice(competitions)
+        if fetch_fixtures.remove_noise_terms(text, competition) != legacy_remove_noise_terms(text, competition):
+            mismatches += 1
+            if mismatches <= 5:
+                print(f"❌ 干扰词移除不一致: {text!r} ({competition})")
+    return mismatches
+
+
+def legacy_parse_fixtures_html(content):
+    """原 fetch_arsenal_fixtures 中的解析实现 (逐字保留，仅作对照；日志改为 debug)"""
+    soup = BeautifulSoup(content, 'html.parser')
+    matches = []
+
+    rows = soup.find_all('tr')
+    logger.debug(f"🔍 扫描到 {len(rows)} 行数据，开始深度清洗...")
+
+    for row in rows:
+        # 获取原始文本
+        original_text = row.get_text(" ", strip=True)
+
+        # 必须包含 Arsenal
+        if "Arsenal" not in original_text: continue
+
+        # --- 步骤 1: 提取并移除 日期/时间 (关键修复) ---
+        # 模式: Mon Jan 14 - 20:00
+        # 我们先找到这个模式，提取数据，然后把它从文本里删掉！防止干扰比分
+
+        date_str = ""
+        time_str = "00:00"
+
+        # 匹配日期+时间段 (Wed Jan 14 - 20:00)
+        # 正则解释: 星期+空格+月+空格+日+空格+横杠+空格+时间
+        datetime_pattern = r'([A-Za-z]{3}\s+[A-Za-z]{3}\s+\d{1,2})\s*-\s*(\d{1,2}:\d{2})'
+        dt_match = re.search(datetime_pattern, original_text)
+
+        clean_text = original_text # 用于后续处理的文本
+
+        if dt_match:
+            # 提取
+            raw_date = dt_match.group(1) # Wed Jan 14
+            time_str = dt_match.group(2) # 20:00
+            date_str = parse_arsenal_date(raw_date)
+
+            # 【关键】从文本中移除这段日期时间字符串
+            clean_text = clean_text.replace(dt_match.group(0), "")
+        else:
+            # 兜底：如果找不到完整的时间组合，尝试单独找日期
+            date_only_match = re.search(r'([A-Za-z]{3}\s+[A-Za-z]{3}\s+\d{1,2})', original_text)
+            if date_only_match:
+                date_str = parse_arsenal_date(date_only_match.group(1))
+                clean_text = clean_text.replace(date_only_match.group(0), "")
+
+        if not date_str: continue
+
+        # --- 步骤 2: 提取赛事 ---
+        competition = "Unknown"
+        # 定义映射关系，不仅用于提取，也用于后续清理
+        comp_keywords = {
+            "Champions League": "UEFA Champions League",
+            "Premier League": "Premier League",
+            "FA Cup": "FA Cup",
+            "League Cup": "League Cup",
+            "Carabao Cup": "League Cup", # 别名
+            "Friendly": "Friendly"
+        }
+
+        for k, v in comp_keywords.items():
+            if k in original_text:
+                competition = v
+                break
+
+        if competition == "Unknown" and "U21" not in original_text:
+            continue
+
+        # --- 步骤 3: 提取比分 (在去除了时间之后) ---
+        # 此时 clean_text 里已经没有 "20 - 20:00" 这种干扰项了
+        status = 'U'
+        score = ""
+        # 找类似 "2 - 0" 或 "2-0"
+        score_match = re.search(r'(\d+)\s*-\s*(\d+)', clean_text)
+
+        # 只有当日期是今天或过去，才信任比分 (防止未来日期的误判)
+        is_past = False
+        try:
+            match_date_obj = datetime.strptime(date_str, "%Y-%m-%d")
+            if match_date_obj.date() <= datetime.now().date():
+                is_past = True
+        except: pass
+
+        if score_match and is_past:
+            status = 'C'
+            score = score_match.group(0)
+            # 从文本中移除比分，方便后续提取对手
+            clean_text = clean_text.replace(score, "")
+
+        # --- 步骤 4: 提取对手 (大扫除) ---
+        # 移除所有干扰词
+        opponent_text = legacy_remove_noise_terms(clean_text, competition)
+
+        # 移除多余符号
+        opponent_text = opponent_text.replace("-", "").strip()
+        # 移除连续空格
+        opponent = " ".join(opponent_text.split())
+
+        # 最终检查: 如果剩下一个单字母 "V"，也去掉
+        if opponent.lower() == "v": continue
+        if len(opponent) < 2: continue
+
+        # --- 步骤 5: 主客场 ---
+        # 简单的逻辑：如果原始文本里 Arsenal 在对手前面?
+        # 或者看是否有 (H) / (A) 标记，或者 Home/Away
+        is_home = True
+        if "(A)" in original_text or "Away" in original_text:
+            is_home = False
+        elif "(H)" in original_text or "Home" in original_text:
+            is_home = True
+        else:
+            # 位置判断法
+            # 原始文本通常是: Date Time Home v Away
+            # 如果 Arsenal 的 index 小于 Opponent 的 index -> 主场
+            try:
+                idx_ars = original_text.find("Arsenal")
+                idx_opp = original_text.find(opponent)
+                if idx_ars > -1 and idx_opp > -1:
+                    if idx_ars > idx_opp:
+                        is_home = False
+            except: pass
+
+        matches.append({
+            "date": date_str,
+            "time": time_str,
+            "opponent": opponent,
+            "competition": competition,
+            "is_home": is_home,
+            "status": status,
+            "score": score
+        })
+
+    # 去重
+    unique_matches = []
+    seen = set()
+    for m in matches:
+        key = f"{m['date']}_{m['opponent']}"
+        if key not in seen:
+            seen.add(key)
+            unique_matches.append(m)
+
+    unique_matches.sort(key=lambda x: x['date'])
+
+    logger.debug(f"✅ 成功提取 {len(unique_matches)} 场比赛")
+    return unique_matches
+
+
+class ArchiveGenerator:
+    """按赛季生成赛程页 HTML"""
+
+    def __init__(self, seed: int):
+        self.rng = random.Random(seed)
+
+    def _fixture_row(self, day: date, today: date) -> str:
+        rng = self.rng
+        opponent = rng.choice(OPPONENTS)
+        competition = rng.choice(COMPETITIONS)
+        home = rng.random() < 0.5
+        when = f"{day.strftime('%a %b')} {day.day} - {rng.choice(['12:30', '15:00', '17:30', '20:00'])}"
+        teams = ('Arsenal', opponent) if home else (opponent, 'Arsenal')
+        venue = rng.choice(['', ' (H)' if home else ' (A)', '<span class="venue">Home</span>' if home else '<span class="venue">Away</span>'])
+        if day <= today:
+            middle = f'<td class="fixture__score"><span>{rng.randint(0, 4)}</span> - <span>{rng.randint(0, 4)}</span></td>'
+            links = '<a href="/report">Report</a><br><a href="/highlights">Highlights</a>'
+        else:
+            middle = '<td class="fixture__score">V</td>'
+            links = '<a class="btn" href="/tickets">Tickets</a>'
+        return (
+            f'<tr class="fixture-row"><!-- fixture -->\n'
+            f'  <td class="fixture__date"><time datetime="{day.isoformat()}">{when}</time></td>\n'
+            f'  <td class="fixture__competition"><img src="/c.png" alt=""><span>{competition}</span>&nbsp;<span class="gender">Mens</span></td>\n'
+            f'  <td class="team team--home"><span class="team__name">{teams[0]}</span></td>{middle}\n'
+            f'  <td class="team team--away"><span class="team__name">{teams[1]}</span>{venue}</td>\n'
+            f'  <td class="fixture__links">{links}</td>\n'
+            f'</tr>\n'
+        )
+
+    def _extra_row(self, day: date) -> str:
+        rng = self.rng
+        kind = rng.random()
+        when = f"{day.strftime('%a %b')} {day.day}"
+        if kind < 0.4:
+            return (f'<tr class="fixture-row"><td>{when} - 19:00</td><td>Barclays Women&#39;s Super League</td>'
+                    f'<td>Arsenal Women</td><td>V</td><td>{rng.choice(OPPONENTS)} Women</td></tr>\n')
+        if kind < 0.7:
+            return (f'<tr class="fixture-row"><td>{when} - 14:00</td><td>Premier League 2</td>'
+                    f'<td>Arsenal U21</td><td>1 - 1</td><td>{rng.choice(OPPONENTS)} U21</td></tr>\n')
+        return '<tr class="table-header"><th>Date</th><th>Competition</th><th>Home</th><th></th><th>Away</th></tr>\n'
+
+    def season_page(self, season_start: int, today: date) -> str:
+        rng = self.rng
+        start = date(season_start, 8, 10)
+        days = sorted(rng.sample(range(290), FIXTURES_PER_SEASON + EXTRA_ROWS_PER_SEASON))
+        rows = []
+        for i, offset in enumerate(days):
+            day = start + timedelta(days=offset)
+            rows.append(self._fixture_row(day, today) if i % 5 else self._extra_row(day))
+        blob = ''.join(f'{{"k{i}":"{rng.random():.12f}"}},' for i in range(SCRIPT_KB * 1024 // 24))
+        nav = ''.join(f'<li><a href="/n{i}">Arsenal link {i}</a></li>' for i in range(200))
+        return (
+            '<!DOCTYPE html>\n<html lang="en"><head><meta charset="utf-8"><title>Arsenal Fixtures</title>\n'
+            f'<style>.fixture-row td{{padding:4px}} .x{{color:red}}</style>\n<script>window.__DATA__=[{blob}];</script>\n'
+            f'</head><body><nav><ul>{nav}</ul></nav>\n<main><h1>Fixtures &amp; Results {season_start}/{season_start + 1}</h1>\n'
+            '<table class="fixture-list"><tbody>\n' + ''.join(rows) + '</tbody></table></main>\n'
+            '<footer><p>&copy; Arsenal</p><script>track("page")</script></footer></body></html>\n'
+        )
+
+
+def load_archive(args) -> List[Tuple[str, bytes]]:
+    pages = []
+    if args.archive_dir:
+        for path in sorted(glob.glob(os.path.join(args.archive_dir, '**', '*.html'), recursive=True)):
+            with open(path, 'rb') as f:
+                pages.append((os.path.relpath(path, args.archive_dir), f.read()))
+    generator = ArchiveGenerator(args.seed)
+    today = datetime.now().date()
+    for season in range(args.first_season, args.first_season + args.seasons):
+        pages.append((f"synthetic-{season}", generator.season_page(season, today).encode('utf-8')))
+    return pages
+
+
+def time_it(fn: Callable, pages: List[bytes], repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for body in pages:
+            fn(body)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="赛程解析器基准")
+    parser.add_argument('--seasons', type=int, default=10, help="合成赛季数")
+    parser.add_argument('--first-season', type=int, default=2015)
+    parser.add_argument('--archive-dir', default=None, help="额外加入的录制页面目录 (递归查找 .html)")
+    parser.add_argument('--repeat', type=int, default=5, help="计时重复次数 (取最快)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--fuzz', type=int, default=200000, help="干扰词移除的随机比对条数 (0 跳过)")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    pages = load_archive(args)
+    bodies = [body for _, body in pages]
+    total_mb = sum(len(b) for b in bodies) / (1024 * 1024)
+    total_rows = sum(len(fetch_fixtures._row_texts_fast(b)) for b in bodies)
+
+    mismatches = 0
+    for name, body in pages:
+        expected = legacy_parse_fixtures_html(body)
+        for mode in ('fast', 'bs4'):
+            # 入库时附加的时区字段 (kickoff_utc / source_tz) 原实现没有，不参与比较
+            parsed = [{k: v for k, v in m.items() if k not in ('kickoff_utc', 'source_tz')}
+                      for m in parse_fixtures_html(body, parser=mode)]
+            if parsed != expected:
+                mismatches += 1
+                print(f"❌ 不一致: {name} ({mode})")
+    print(f"🔍 一致性校验: {len(pages)} 页 / {total_rows} 行 / {total_mb:.1f} MB, 不一致 {mismatches} 处")
+    if args.fuzz:
+        fuzz_mismatches = fuzz_noise_terms(args.fuzz, args.seed)
+        print(f"🎲 干扰词移除随机比对: {args.fuzz} 条, 不一致 {fuzz_mismatches} 条")
+        mismatches += fuzz_mismatches
+
+    results = [
+        ('原实现', time_it(legacy_parse_fixtures_html, bodies, args.repeat)),
+        ('bs4 模式', time_it(lambda b: parse_fixtures_html(b, parser='bs4'), bodies, args.repeat)),
+        ('快速模式', time_it(lambda b: parse_fixtures_html(b, parser='fast'), bodies, args.repeat)),
+    ]
+    baseline = results[0][1]
+    print(f"{'实现':<8} | {'ms/页':>8} | {'页/秒':>7} | {'行/秒':>9} | {'MB/秒':>6} | {'加速比':>6}")
+    for label, seconds in results:
+        print(f"{label:<8} | {seconds / len(bodies) * 1000:>8.2f} | {len(bodies) / seconds:>7.1f} | "
+              f"{total_rows / seconds:>9,.0f} | {total_mb / seconds:>6.1f} | {baseline / seconds:>5.1f}x")
+
+    if mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
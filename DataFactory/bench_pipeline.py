@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+RedLens 数据工厂端到端基准 (合成数据)
+功能:
+1. 按规模 (1k - 100k 场比赛) 生成合成的赛程 HTML、咪咕 match-list / all-view-list 响应、队名映射
+2. 分阶段计时: 赛程解析 -> 咪咕响应解析 -> merge_data.merge_data -> generate_deep_links.process_links
+3. 输出吞吐、每场耗时、峰值 RSS，写入机器可读的 JSON 报告，便于在上线前发现融合复杂度或 JSON 处理的退化
+
+用法: python3 DataFactory/bench_pipeline.py --scales 1000 10000 100000 [--repeat 3] [--output bench_pipeline_report.json]
+"""
+
+import argparse
+import json
+import logging
+import platform
+import random
+import resource
+import statistics
+import sys
+import time
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List, Tuple
+
+import fetch_fixtures
+import generate_deep_links
+import merge_data
+from fetch_all_migu_videos import CompleteMiguFetcher
+from replay_ranker import rank_replays
+
+DEFAULT_OUTPUT = "bench_pipeline_report.json"
+COMPETITIONS = [("Premier League", "英超"), ("UEFA Champions League", "欧冠"), ("FA Cup", "足总杯"), ("League Cup", "联赛杯")]
+MATCHES_PER_DAY = 4        # 合成数据里同一天的场次 (模拟多俱乐部/多赛事)
+DAYS_PER_RESPONSE = 7      # 每个 match-list 响应覆盖的天数 (与咪咕接口一致)
+REPLAYS_PER_MATCH = 12
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 单位是 KB，macOS 是字节
+    return round(peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024, 1)
+
+
+class SyntheticDataset:
+    """按规模生成的一整套合成输入"""
+
+    def __init__(self, scale: int, seed: int):
+        rng = random.Random(seed)
+        team_count = max(40, scale // 50)
+        self.team_mapping = {f"Synth City {i}": f"合成城{i}队" for i in range(team_count)}
+        teams = list(self.team_mapping.items())
+
+        start = date(2000, 8, 1)
+        self.fixtures: List[Dict] = []
+        self.migu_records: List[Dict] = []
+        self.match_lists: List[Tuple[str, Dict]] = []
+        self.replay_lists: Dict[str, List[Dict]] = {}
+
+        day_buckets: Dict[str, List[Dict]] = {}
+        for i in range(scale):
+            day = start + timedelta(days=i // MATCHES_PER_DAY)
+            en, cn = teams[i % team_count]
+            comp_en, comp_cn = COMPETITIONS[i % len(COMPETITIONS)]
+            is_home = rng.random() < 0.5
+            home_goals, away_goals = rng.randint(0, 4), rng.randint(0, 4)
+            self.fixtures.append({
+                "date": day.strftime('%Y-%m-%d'), "time": f"{rng.choice([12, 15, 17, 20])}:{rng.choice(['00', '30'])}",
+                "opponent": en, "competition": comp_en, "is_home": is_home,
+                "status": "C", "score": f"{home_goals} - {away_goals}",
+            })
+
+            # 咪咕按北京时间记录，约 1/3 的比赛跨到次日
+            migu_day = day + timedelta(days=1 if rng.random() < 0.33 else 0)
+            mgdb_id = f"12{i:010d}"
+            arsenal, other = {"name": "阿森纳", "score": home_goals}, {"name": cn, "score": away_goals}
+            raw = {
+                "pkInfoTitle": f"{'阿森纳 vs ' + cn if is_home else cn + ' vs 阿森纳'}",
+                "confrontTeams": [arsenal, other] if is_home else [other, arsenal],
+                "matchStatus": "2", "mgdbId": mgdb_id, "pID": str(900000000 + i), "competitionName": comp_cn,
+            }
+            day_buckets.setdefault(migu_day.strftime('%Y%m%d'), []).append(raw)
+            self.replay_lists[mgdb_id] = [self._replay(rng, i, k) for k in range(REPLAYS_PER_MATCH)]
+
+        days = sorted(day_buckets)
+        for offset in range(0, len(days), DAYS_PER_RESPONSE):
+            window = days[offset:offset + DAYS_PER_RESPONSE]
+            body = {"code": 200, "body": {"matchList": {d: day_buckets[d] for d in window}}}
+            self.match_lists.append((window[-1], body))
+
+        # 咪咕记录由解析阶段产出，这里先按同样规则构造，供 merge 阶段独立计时
+        fetcher = CompleteMiguFetcher.__new__(CompleteMiguFetcher)
+        self.migu_records = [fetcher.parse_match(raw, d, replay_pids={}) for d, raws in day_buckets.items() for raw in raws]
+
+        self.fixtures_html = self._fixtures_html()
+
+    @staticmethod
+    def _replay(rng: random.Random, i: int, k: int) -> Dict:
+        if k == 0:
+            return {"name": "全场回放（詹俊、张路、李子琪）", "duration": "01:58:12", "pID": str(950000000 + i), "type": "1"}
+        name = rng.choice(["精彩集锦", "赛后采访", "全场回放 粤语（陈凯冬、何辉）", "上半场", "全场回放 English (Drury)"])
+        return {"name": name, "duration": f"{rng.randint(0, 2):02d}:{rng.randint(0, 59):02d}:00",
+                "pID": str(rng.randint(900000000, 999999999)), "type": rng.choice(["1", "4"])}
+
+    def _fixtures_html(self) -> str:
+        rows = []
+        for m in self.fixtures:
+            day = datetime.strptime(m['date'], '%Y-%m-%d')
+            home, away = ("Arsenal", m['opponent']) if m['is_home'] else (m['opponent'], "Arsenal")
+            rows.append(
+                f"<tr><td>{day.strftime('%a %b')} {day.day} - {m['time']}</td><td>{m['competition']}</td>"
+                f"<td>Mens</td><td>{home}</td><td>{m['score']}</td><td>{away}</td><td><a>Report</a></td></tr>"
+            )
+        return "<html><body><table>" + "".join(rows) + "</table></body></html>"
+
+
+def run_stage(name: str, fn: Callable[[], int], repeat: int) -> Dict:
+    """重复执行同一阶段，返回耗时统计 (fn 返回处理的条目数)"""
+    timings = []
+    items = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        items = fn()
+        timings.append(time.perf_counter() - start)
+    best = min(timings)
+    return {
+        'stage': name,
+        'items': items,
+        'seconds_min': round(best, 4),
+        'seconds_median': round(statistics.median(timings), 4),
+        'seconds_max': round(max(timings), 4),
+        'items_per_second': round(items / best, 1) if best > 0 else None,
+        'us_per_item': round(best / items * 1e6, 2) if items else None,
+        'peak_rss_mb': peak_rss_mb(),  # 进程级峰值，阶段结束时采样
+    }
+
+
+def bench_scale(scale: int, repeat: int, seed: int) -> Dict:
+    gen_start = time.perf_counter()
+    data = SyntheticDataset(scale, seed)
+    generate_seconds = time.perf_counter() - gen_start
+    fetcher = CompleteMiguFetcher.__new__(CompleteMiguFetcher)  # 只用解析逻辑，不建立网络会话
+
+    def stage_fixtures():
+        # 赛程页只有月/日，跨多年的合成行会在去重时合并，吞吐按输入行数计
+        fetch_fixtures.parse_fixtures_html(data.fixtures_html)
+        return len(data.fixtures)
+
+    def stage_migu_parse():
+        count = 0
+        for anchor, body in data.match_lists:
+            payload = json.loads(json.dumps(body, ensure_ascii=False))  # 含 JSON 解码成本
+            for date_key, raw in fetcher._iter_match_list(payload, anchor):
+                pids = rank_replays(data.replay_lists[raw['mgdbId']]) or {}
+                if fetcher.parse_match(raw, date_key, replay_pids=pids):
+                    count += 1
+        return count
+
+    merged_holder: Dict[str, List[Dict]] = {}
+
+    def stage_merge():
+        merged_holder['merged'] = merge_data.merge_data(data.fixtures, data.migu_records, data.team_mapping, previous=[])
+        return len(merged_holder['merged'])
+
+    def stage_deep_links():
+        # process_links 原地覆盖 scheme 字段，force=True 保证重复执行的工作量相同
+        return len(generate_deep_links.process_links(merged_holder['merged'], force=True) or [])
+
+    stages = [
+        run_stage('fixtures_parse', stage_fixtures, repeat),
+        run_stage('migu_parse', stage_migu_parse, repeat),
+        run_stage('merge', stage_merge, repeat),
+        run_stage('deep_links', stage_deep_links, repeat),
+    ]
+    matched = sum(1 for m in merged_holder['merged'] if m.get('migu_pid'))
+    return {
+        'scale': scale,
+        'generate_seconds': round(generate_seconds, 3),
+        'match_rate': round(matched / scale, 4) if scale else 0.0,
+        'stages': stages,
+        'total_seconds_min': round(sum(s['seconds_min'] for s in stages), 4),
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RedLens 数据工厂合成规模基准")
+    parser.add_argument('--scales', type=int, nargs='+', default=[1000, 10000], help="合成比赛场数")
+    parser.add_argument('--repeat', type=int, default=3, help="每个阶段重复次数")
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help="JSON 报告路径")
+    parser.add_argument('--verbose', action='store_true', help="保留各阶段的 INFO 日志 (大规模时会显著拖慢)")
+    args = parser.parse_args()
+
+    if not args.verbose:
+        logging.disable(logging.INFO)
+
+    report = {
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'repeat': args.repeat,
+        'seed': args.seed,
+        'results': [],
+    }
+    for scale in args.scales:
+        result = bench_scale(scale, args.repeat, args.seed)
+        report['results'].append(result)
+        print(f"📏 规模 {scale} (匹配率 {result['match_rate']:.1%}, 峰值 RSS {result['peak_rss_mb']} MB)")
+        for s in result['stages']:
+            print(f"   {s['stage']:<15} {s['seconds_min']:>9.3f}s  {s['items_per_second'] or 0:>12,.0f}/s  "
+                  f"{s['us_per_item'] or 0:>9.1f}µs/场")
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"💾 报告已写入 {args.output}")
+
+
+if __name__ == "__main__":
+    main()
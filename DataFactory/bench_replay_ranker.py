@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+RedLens 回放排序器微基准
+功能:
+1. 随机生成含数百个视频的 replayList (回放/集锦/多语言/多解说/空 PID/type=4 混合)
+2. 校验 replay_ranker.rank_replays 与原五轮扫描实现的结果完全一致
+3. 对比两者在不同列表长度下的耗时
+
+用法: python3 DataFactory/bench_replay_ranker.py [--sizes 100 300 1000] [--lists 200] [--seed 42]
+"""
+
+import argparse
+import logging
+import random
+import time
+from typing import Dict, List, Optional
+
+from replay_ranker import rank_replays
+
+logger = logging.getLogger(__name__)
+
+COMMENTATOR_POOL = ['詹俊', '张路', '李子琪', '苏东', '黄健翔', '陈凯冬', '何辉', '黄镇', '罗毅', 'Peter Drury', 'Jim Beglin']
+TEAM_POOL = ['阿森纳', '曼城', '曼联', '切尔西', '利物浦', '托特纳姆热刺', '纽卡斯尔联', '阿斯顿维拉', '布莱顿', '西汉姆联',
+             '水晶宫', '富勒姆', '狼队', '埃弗顿', '布伦特福德', '诺丁汉森林', '伯恩茅斯', '利兹联', '伯恩利', '桑德兰']
+NAME_TEMPLATES = [
+    '{home}vs{away} 全场回放', '{home}vs{away} 全场回放（{names}）', '{home}vs{away} 全场回放 粤语（{names}）',
+    '{home}vs{away} 全场回放 English ({names})', '{home}vs{away} 集锦', '{home}vs{away} 精彩时刻',
+    '{home}vs{away} 国语回放', '{home}vs{away} 中文解说', '{home}vs{away} 赛后采访', '{home}vs{away} 上半场（{names}）',
+]
+
+
+def legacy_rank_replays(replay_list: List[Dict], mgdb_id: str = 'bench') -> Optional[Dict]:
+    """原 fetch_full_match_replay 中的五轮扫描实现 (逐字保留，仅作对照)"""
+    if not replay_list: return None
+
+    def duration_to_seconds(duration_str):
+        try:
+            parts = duration_str.split(':')
+            if len(parts) == 2: return int(parts[0]) * 60 + int(parts[1])
+            elif len(parts) == 3: return int(parts[0]) * 3600 + int(parts[1]) * 60 + int(parts[2])
+            return 0
+        except: return 0
+
+    def is_definitely_highlight(video_name):
+        """判断是否一定是集锦"""
+        return '集锦' in video_name or '精彩' in video_name
+
+    def detect_language_commentators(video_name):
+        """
+        检测视频的语言和解说人数
+        返回: (language, num_commentators, priority)
+        language: 'mandarin', 'cantonese', 'english', 'unknown'
+        num_commentators: 实际的解说人数 (从括号中的名字推断)
+        priority: 用于排序的优先级 (越高越优先)
+        """
+        import re
+
+        # 统计括号中的人名数（用逗号和顿号分割）
+        commentator_pattern = r'[（(]([^)）]+)[)）]'
+        match = re.search(commentator_pattern, video_name)
+        num_commentators = 0
+
+        if match:
+            names = match.group(1)
+            # 统计人数：逗号、顿号、and、&作为分隔符
+            num_commentators = names.count('、') + names.count(',') + names.count('and') + names.count('&') + 1
+
+        # 检测粤语标记（粤语多数是2人）
+        if '粤' in video_name or any(name in video_name for name in ['陈凯冬', '何辉', '黄镇', '罗毅']):
+            return 'cantonese', max(num_commentators, 2), 1  # 粤语优先级最低
+
+        # 检测英文标记
+        if 'English' in video_name or '英文' in video_name:
+            return 'english', max(num_commentators, 1), 2
+
+        # 检测中文标记 - 使用括号内的名字来判断
+        if num_commentators >= 3:
+            # 3人及以上的中文解说
+            return 'mandarin', num_commentators, 10 + num_commentators  # 3人版本最优（优先级最高）
+        elif num_commentators == 1:
+            # 1人解说（单人评论员）
+            return 'mandarin', 1, 3
+        elif num_commentators == 2:
+            # 2人中文解说
+            return 'mandarin', 2, 5
+
+        # 其他情况
+        if '中文' in video_name or '国语' in video_name:
+            return 'mandarin', max(num_commentators, 2), 4
+
+        return 'unknown', num_commentators if num_commentators > 0 else 2, 0
+
+    # 日志记录可用的视频
+    logger.debug(f"   📹 检查 mgdbId={mgdb_id} 的视频列表: {len(replay_list)} 个")
+    for idx, v in enumerate(replay_list[:8]):  # 记录前8个，便于分析语言
+        dur_sec = duration_to_seconds(v.get('duration', '00:00'))
+        lang, commentators, priority = detect_language_commentators(v.get('name', ''))
+        logger.debug(f"     [{idx+1}] {v.get('name')} | 时长={v.get('duration')} | 语言={lang} | {commentators}人 | 优先级={priority}")
+
+    # 【优先级1】查找中文全场回放（优先选择3人解说）
+    full_replays_with_lang = []
+    for v in replay_list:
+        if is_definitely_highlight(v.get('name', '')):
+            continue
+        lang, commentators, priority = detect_language_commentators(v.get('name', ''))
+        dur_sec = duration_to_seconds(v.get('duration', '00:00'))
+
+        # 只考虑"回放"标记的视频和时长足够长的视频
+        if '回放' in v.get('name', '') and dur_sec > 3600:  # 1小时以上的回放
+            full_replays_with_lang.append({
+                'video': v,
+                'duration_sec': dur_sec,
+                'language': lang,
+                'commentators': commentators,
+                'priority': priority,
+                'is_replay_labeled': True
+            })
+
+    # 收集所有语言版本的 PID
+    replay_pids = {
+        'mandarin': None,     # 中文 PID
+        'cantonese': None,    # 粤语 PID
+        'other': None         # 其他 PID
+    }
+
+    if full_replays_with_lang:
+        # 按优先级排序
+        sorted_replays = sorted(
+            full_replays_with_lang,
+            key=lambda x: (x['priority'], x['duration_sec']),
+            reverse=True
+        )
+
+        # 【重要】遍历所有视频，收集所有语言的 PID（不仅是最优的）
+        best = sorted_replays[0]  # 最优选择（用于 primary）
+
+        for idx, item in enumerate(sorted_replays):  # 遍历所有，不限 3 个
+            lang = item['language']
+            pid = item['video'].get('pID', '')
+            name = item['video'].get('name', '')
+            dur_min = item['duration_sec'] // 60
+            priority = item['priority']
+
+            # 记录日志（前5个）
+            if idx < 5:
+                logger.debug(f"   [{idx+1}] {lang:10} | 优先级={priority:2d} | {name} ({dur_min}分钟, PID: {pid})")
+
+            # 保存各语言的 PID（最高优先级的版本）
+            if lang == 'mandarin' and not replay_pids['mandarin']:
+                replay_pids['mandarin'] = pid
+            elif lang == 'cantonese' and not replay_pids['cantonese']:
+                replay_pids['cantonese'] = pid
+            elif not replay_pids['other']:
+                replay_pids['other'] = pid
+
+        best_pid = best['video'].get('pID', '')
+        if best_pid:
+            logger.debug(f"   ✅ 最优选择(优先级={best['priority']}): {best['video'].get('name')} (PID: {best_pid})")
+            replay_pids['primary'] = best_pid  # 主 PID（优先级最高的）
+            return replay_pids
+
+    # 【优先级2】查找任何非集锦的回放视频（不限语言）
+    replay_candidates = [
+        v for v in replay_list 
+        if '回放' in v.get('name', '') and not is_definitely_highlight(v.get('name', '')) and duration_to_seconds(v.get('duration', '00:00')) > 3600
+    ]
+    if replay_candidates:
+        longest = max(replay_candidates, key=lambda x: duration_to_seconds(x.get('duration', '00:00')))
+        pid = longest.get('pID', '')
+        if pid:
+            lang, _, _ = detect_language_commentators(longest.get('name', ''))
+            logger.debug(f"   ✅ 优先级2(回放标签): {longest.get('name')} ({lang}, PID: {pid})")
+            replay_pids['primary'] = pid
+            if lang == 'mandarin':
+                replay_pids['mandarin'] = pid
+            elif lang == 'cantonese':
+                replay_pids['cantonese'] = pid
+            return replay_pids
+
+    # 【优先级3】从所有视频中找时长最长且可能是完整比赛的（>90分钟）
+    full_match_candidates = [
+        v for v in replay_list 
+        if not is_definitely_highlight(v.get('name', '')) and duration_to_seconds(v.get('duration', '00:00')) > 5400
+    ]
+    if full_match_candidates:
+        longest = max(full_match_candidates, key=lambda x: duration_to_seconds(x.get('duration', '00:00')))
+        dur_sec = duration_to_seconds(longest.get('duration', '00:00'))
+        pid = longest.get('pID', '')
+        if pid:
+            logger.debug(f"   ✅ 优先级3(长时间): {longest.get('name')} ({int(dur_sec/60)}分钟, PID: {pid})")
+            replay_pids['primary'] = pid
+            return replay_pids
+
+    # 【优先级4】type=4 的视频中找最长的（可能是官方版本）
+    type4_videos = [r for r in replay_list if r.get('type', '') == '4']
+    if type4_videos:
+        longest = max(type4_videos, key=lambda x: duration_to_seconds(x.get('duration', '00:00')))
+        dur_sec = duration_to_seconds(longest.get('duration', '00:00'))
+        if not is_definitely_highlight(longest.get('name', '')):
+            pid = longest.get('pID', '')
+            if pid:
+                logger.debug(f"   ✅ 优先级4(type=4): {longest.get('name')} ({int(dur_sec/60)}分钟, PID: {pid})")
+                replay_pids['primary'] = pid
+                return replay_pids
+
+    # 【优先级5】兜底: 所有视频中找最长的非集锦视频
+    non_highlight_videos = [v for v in replay_list if not is_definitely_highlight(v.get('name', ''))]
+    if non_highlight_videos:
+        longest = max(non_highlight_videos, key=lambda x: duration_to_seconds(x.get('duration', '00:00')))
+        dur_sec = duration_to_seconds(longest.get('duration', '00:00'))
+        pid = longest.get('pID', '')
+        if pid and dur_sec > 1800:  # 至少30分钟
+            logger.debug(f"   ⚠️ 优先级5(兜底): {longest.get('name')} ({int(dur_sec/60)}分钟, PID: {pid})")
+            replay_pids['primary'] = pid
+            return replay_pids
+
+    logger.debug(f"   ❌ 未找到合适的全场回放视频")
+    return None if not any(replay_pids.values()) else replay_pids
+
+
+def random_video(rng: random.Random, templates: List[str] = NAME_TEMPLATES) -> Dict:
+    names = rng.sample(COMMENTATOR_POOL, rng.randint(1, 4))
+    sep = rng.choice(['、', ',', ' and ', ' & '])
+    home, away = rng.sample(TEAM_POOL, 2)
+    name = rng.choice(templates).format(home=home, away=away, names=sep.join(names))
+    seconds = rng.choice([rng.randint(60, 900), rng.randint(1500, 4000), rng.randint(5000, 8000), 7200])
+    if rng.random() < 0.5:
+        duration = f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+    else:
+        duration = f"{seconds // 60:02d}:{seconds % 60:02d}"
+    return {
+        'name': name,
+        'duration': duration if rng.random() > 0.02 else 'N/A',
+        'pID': str(rng.randint(900000000, 999999999)) if rng.random() > 0.05 else '',
+        'type': rng.choice(['1', '4', '4', '8']),
+    }
+
+
+def normalize(result: Optional[Dict]) -> Optional[Dict]:
+    # 原实现里"已处理但 PID 为空"的槽位是 ''，新实现统一为 None，二者对调用方等价
+    return None if result is None else {k: (v or None) for k, v in result.items()}
+
+
+def check_equivalence(rng: random.Random, count: int) -> int:
+    mismatches = 0
+    for _ in range(count):
+        replay_list = [random_video(rng) for _ in range(rng.randint(0, 40))]
+        if normalize(legacy_rank_replays(replay_list)) != normalize(rank_replays(replay_list)):
+            mismatches += 1
+    return mismatches
+
+
+def time_it(fn, lists: List[List[Dict]], repeat: int) -> float:
+    """取 repeat 次中最快的一次，降低噪声"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for replay_list in lists:
+            fn(replay_list)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="回放排序器微基准")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 300, 1000], help="每个 replayList 的视频数")
+    parser.add_argument('--lists', type=int, default=200, help="每种长度生成的列表数")
+    parser.add_argument('--checks', type=int, default=5000, help="随机一致性校验次数")
+    parser.add_argument('--repeat', type=int, default=5, help="计时重复次数 (取最快)")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    mismatches = check_equivalence(rng, args.checks)
+    print(f"🔍 一致性校验: {args.checks} 个随机列表, 不一致 {mismatches} 个")
+
+    # "无回放标记" 场景会让原实现一路扫到优先级 3-5
+    scenarios = [('混合', NAME_TEMPLATES), ('无回放标记', [t for t in NAME_TEMPLATES if '回放' not in t])]
+    print(f"{'场景':<8} | {'视频数':>6} | {'原实现 ms/列表':>14} | {'新实现 ms/列表':>14} | {'加速比':>6}")
+    for label, templates in scenarios:
+        for size in args.sizes:
+            lists = [[random_video(rng, templates) for _ in range(size)] for _ in range(args.lists)]
+            legacy = time_it(legacy_rank_replays, lists, args.repeat)
+            ranked = time_it(rank_replays, lists, args.repeat)
+            print(f"{label:<8} | {size:>6} | {legacy / args.lists * 1000:>14.3f} | "
+                  f"{ranked / args.lists * 1000:>14.3f} | {legacy / ranked:>5.1f}x")
+
+    if mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
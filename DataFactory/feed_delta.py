@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+RedLens 数据工厂 - feed 增量 (版本 N-1 -> N)
+功能:
+1. 以比赛键 ({date}_{opponent}) 对齐前后两版融合结果，生成紧凑的字段级增量:
+   set (变化/新增的字段)、unset (删掉的字段)、add (新比赛整条)、remove (删掉的比赛)，
+   顺序有变化时附带 order (全部比赛键的新顺序)
+2. apply_delta 是客户端应用增量的参考实现；生成后先在本地回放一遍，结果与新版本不一致时不发布这个增量
+3. 比赛键不唯一时无法表达，返回 None，客户端回退到全量分片
+"""
+
+from typing import Dict, List, Optional
+
+from match_store import record_key
+
+
+def _index(matches: List[Dict]) -> Optional[Dict[str, Dict]]:
+    index = {}
+    for match in matches:
+        key = record_key(match)
+        if key in index:
+            return None
+        index[key] = match
+    return index
+
+
+def diff(previous: List[Dict], current: List[Dict]) -> Optional[Dict]:
+    """两版之间的增量 (不含版本号)；完全相同时各项为空"""
+    before, after = _index(previous), _index(current)
+    if before is None or after is None:
+        return None
+    delta: Dict = {'set': {}, 'unset': {}, 'add': [], 'remove': [k for k in before if k not in after]}
+    for key, match in after.items():
+        old = before.get(key)
+        if old is None:
+            delta['add'].append(match)
+            continue
+        changed = {field: value for field, value in match.items() if field not in old or old[field] != value}
+        removed = [field for field in old if field not in match]
+        if changed:
+            delta['set'][key] = changed
+        if removed:
+            delta['unset'][key] = removed
+    if list(after) != _apply_order(list(before), delta):
+        delta['order'] = list(after)
+    return {k: v for k, v in delta.items() if v}
+
+
+def _apply_order(keys: List[str], delta: Dict) -> List[str]:
+    """不带 order 时的默认顺序: 原顺序去掉 remove，新增的按 add 的顺序接在末尾"""
+    removed = set(delta.get('remove', []))
+    return [k for k in keys if k not in removed] + [record_key(m) for m in delta.get('add', [])]
+
+
+def apply_delta(previous: List[Dict], delta: Dict) -> List[Dict]:
+    """把增量应用到上一版 (不修改传入的列表)，返回新版本"""
+    index = {record_key(m): dict(m) for m in previous}
+    for key in delta.get('remove', []):
+        index.pop(key, None)
+    for key, fields in delta.get('set', {}).items():
+        index[key].update(fields)
+    for key, fields in delta.get('unset', {}).items():
+        for field in fields:
+            index[key].pop(field, None)
+    for match in delta.get('add', []):
+        index[record_key(match)] = dict(match)
+    order = delta.get('order') or _apply_order([record_key(m) for m in previous], delta)
+    return [index[key] for key in order]
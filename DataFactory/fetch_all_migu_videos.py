@@ -5,29 +5,64 @@ RedLens 数据工厂 - 智能咪咕视频抓取器 (直播+录像版)
 1. 获取已完赛场次的【全场回放】(PID)
 2. 获取未完赛场次的【直播间链接】(Live URL)
 支持: 英超(5), 足总杯(10000495), 联赛杯(7), 欧冠(200)
+keep_alive=True 时 (流水线常驻模式) 同步 Session 与 aiohttp 连接池跨轮次复用，用完调用 close()
+每完成一个任务写入断点日志 (scan_journal)，中途失败后以相同任务重跑会跳过已完成的任务
+可同时跟踪多个俱乐部 (MIGU_TRACKED_CLUBS): 每个 (日期, 赛事) 只请求一次，从同一个响应里提取所有跟踪俱乐部的比赛，
+阿森纳写入 OUTPUT_FILE / 状态库，其余俱乐部各自输出到 club_output_file()
+输出前应用 PID 修正表 (PID_CORRECTIONS_FILE，由 audit_pids.py 生成或手工维护)
+单独运行时同样把直播间 / 录像 PID 的首次出现时间记入 publish_delays 日志 (流水线在落盘阶段自己记录)
 """
 
+import asyncio
 import json
 import logging
 import os
-import sys
+import time
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional, Set, Tuple
-import requests
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 import urllib3
 
+from http_cache import CACHE_ENABLED, CACHE_FILE, CachedSession, ResponseCache, ttl_for_list_anchor, ttl_for_match
+from io_utils import atomic_write_json
+from kickoff_time import MIGU_TIMEZONE, matchday_start_utc
+import merge_data
+import metrics
+from match_store import open_store
+from publish_delays import FirstSeenLog
+from refresh_scheduler import kickoff_epoch
+from resilience import CircuitOpenError, Resilience
+from replay_ranker import rank_replays
+from scan_journal import ScanJournal, scan_id
+from team_resolver import MAPPING_FILE, TeamResolver, chinese_names, load_aliases, slugify
+from window_planner import WindowPlanner, response_dates
+
+try:
+    import aiohttp
+except ImportError:  # 未安装 aiohttp 时回退到同步引擎
+    aiohttp = None
+
 # 禁用 SSL 警告
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
 # ===== 配置区 =====
 OUTPUT_FILE = "migu_videos_complete.json"
 FIXTURES_FILE = "matches.json"             # 最新赛程
-HISTORY_FILE = "matches_with_videos.json"  # 历史存档 (用于去重)
-MIGU_API_BASE = "https://vms-sc.miguvideo.com/vms-match/v6/staticcache/basic/match-list/normal-match-list"
+MIGU_BASE_URL = os.getenv("MIGU_BASE_URL", "https://vms-sc.miguvideo.com").rstrip('/')  # 可指向本地替身服务
+MIGU_API_BASE = f"{MIGU_BASE_URL}/vms-match/v6/staticcache/basic/match-list/normal-match-list"
+MIGU_REPLAY_API_BASE = f"{MIGU_BASE_URL}/vms-match/v5/staticcache/basic/all-view-list"
 SPORT_ID = "1"  # 足球
+PRIMARY_CLUB = "Arsenal"                   # 主俱乐部: 写入 OUTPUT_FILE 与状态库，始终跟踪
+# 额外跟踪的俱乐部 (英文名，逗号分隔，须在 team_name_mapping.json 中)，如 "Chelsea,Liverpool"
+TRACKED_CLUBS = [c.strip() for c in os.getenv("MIGU_TRACKED_CLUBS", PRIMARY_CLUB).split(',') if c.strip()]
+PID_CORRECTIONS_FILE = os.getenv("MIGU_PID_CORRECTIONS", "pid_corrections.json")  # PID 修正表 (不存在时跳过)
+
+# ⚡ 抓取引擎: async (aiohttp 并发) / sync (requests 逐个请求)
+FETCH_ENGINE = os.getenv("FETCH_ENGINE", "async")
+MIGU_LIST_CONCURRENCY = int(os.getenv("MIGU_LIST_CONCURRENCY", "4"))      # 阶段1: match-list 并发数
+MIGU_REPLAY_CONCURRENCY = int(os.getenv("MIGU_REPLAY_CONCURRENCY", "4"))  # 阶段2: all-view-list 并发数
+MIGU_REPLAY_QUEUE_SIZE = int(os.getenv("MIGU_REPLAY_QUEUE_SIZE", "32"))   # 两阶段之间 mgdbId 队列容量
+MIGU_PER_HOST_LIMIT = int(os.getenv("MIGU_PER_HOST_LIMIT", "4"))  # 每个域名的连接数上限
+# 限速 / 重试 / 熔断参数见 resilience.py (MIGU_RATE_PER_SECOND、MIGU_MAX_RETRIES、MIGU_BREAKER_THRESHOLD 等)
 
 # 🏆 赛事 ID 映射表
 COMPETITION_MAP = {
@@ -46,61 +81,228 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+# PID 字段 -> 对应的详情页字段
+PID_FIELDS = {
+    'migu_pid': 'migu_detail_url',
+    'migu_pid_mandarin': 'migu_detail_url_mandarin',
+    'migu_pid_cantonese': 'migu_detail_url_cantonese',
+}
+
+
+def club_output_file(club: str) -> str:
+    """非主俱乐部的输出文件: migu_videos_{slug}.json"""
+    return f"migu_videos_{slugify(club)}.json"
+
+
+def load_pid_corrections(path: str = PID_CORRECTIONS_FILE) -> List[Dict]:
+    """PID 修正表: [{date, opponent, field, pid, was?, club?, reason?}]；文件不存在或损坏时为空"""
+    if not os.path.exists(path):
+        return []
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"⚠️ {path} 读取失败，跳过 PID 修正: {e}")
+        return []
+
+
+def apply_pid_corrections(records: List[Dict], corrections: List[Dict], club: Optional[str] = None) -> int:
+    """
+    把修正表中属于 club (None = 主俱乐部) 的条目应用到记录上 (原地修改)，返回修正的字段数。
+    只替换已有的 PID；带 was 的条目只在当前值仍是 was 时生效，抓取器之后自己选出新 PID 的不覆盖
+    """
+    index: Dict[Tuple[str, str], List[Dict]] = {}
+    for c in corrections:
+        if c.get('club') == club and c.get('field', 'migu_pid') in PID_FIELDS and c.get('pid'):
+            index.setdefault((c.get('date'), c.get('opponent')), []).append(c)
+    applied = 0
+    for match in records:
+        for c in index.get((match.get('date'), match.get('opponent')), []):
+            field = c.get('field', 'migu_pid')
+            current = match.get(field)
+            if not current or current == c['pid'] or (c.get('was') and current != c['was']):
+                continue
+            logger.info(f"🔧 修正: {match['date']} {match['opponent']} {field}: {current} → {c['pid']}")
+            match[field] = c['pid']
+            match[PID_FIELDS[field]] = f"https://www.miguvideo.com/p/detail/{c['pid']}"
+            applied += 1
+    return applied
+
+
+class PipelineStats:
+    """异步流水线计数器: mgdbId 队列深度 + 各阶段吞吐，用于调节两阶段的并发配比"""
+
+    def __init__(self):
+        self.stages = {
+            'list': {'items': 0, 'failed': 0, 'started': None, 'finished': None},
+            'replay': {'items': 0, 'failed': 0, 'started': None, 'finished': None},
+        }
+        self.queue_max_depth = 0
+        self.queue_depth_total = 0
+        self.queue_samples = 0
+
+    def record(self, stage: str, ok: bool):
+        now = time.monotonic()
+        s = self.stages[stage]
+        if s['started'] is None: s['started'] = now
+        s['finished'] = now
+        s['items' if ok else 'failed'] += 1
+
+    def mark_start(self, stage: str):
+        if self.stages[stage]['started'] is None:
+            self.stages[stage]['started'] = time.monotonic()
+
+    def sample_queue(self, depth: int):
+        self.queue_max_depth = max(self.queue_max_depth, depth)
+        self.queue_depth_total += depth
+        self.queue_samples += 1
+
+    def summary(self) -> Dict:
+        result = {}
+        for name, s in self.stages.items():
+            elapsed = (s['finished'] - s['started']) if s['started'] is not None and s['finished'] is not None else 0.0
+            done = s['items'] + s['failed']
+            result[name] = {
+                'items': s['items'], 'failed': s['failed'], 'seconds': round(elapsed, 3),
+                'per_second': round(done / elapsed, 2) if elapsed > 0 else float(done),
+            }
+        result['queue'] = {
+            'max_depth': self.queue_max_depth,
+            'avg_depth': round(self.queue_depth_total / self.queue_samples, 2) if self.queue_samples else 0.0,
+        }
+        return result
+
+
 class CompleteMiguFetcher:
     """完整的咪咕视频抓取器 - 支持多赛事动态 ID"""
     
-    def __init__(self):
+    def __init__(self, list_concurrency: int = MIGU_LIST_CONCURRENCY,
+                 replay_concurrency: int = MIGU_REPLAY_CONCURRENCY,
+                 per_host_limit: int = MIGU_PER_HOST_LIMIT,
+                 replay_queue_size: int = MIGU_REPLAY_QUEUE_SIZE,
+                 keep_alive: bool = False, checkpoint: bool = True,
+                 clubs: Optional[List[str]] = None, persist: bool = True):
+        """persist=False (流水线 --dry-run): 不写任何本地状态 (响应缓存只读、不保存窗口、不写断点日志)"""
+        self.persist = persist
+        self.list_concurrency = max(1, list_concurrency)
+        self.replay_concurrency = max(1, replay_concurrency)
+        self.per_host_limit = max(1, per_host_limit)
+        self.replay_queue_size = max(1, replay_queue_size)
+        self.keep_alive = keep_alive
+        self._loop: Optional[asyncio.AbstractEventLoop] = None   # keep_alive 时复用的事件循环与连接池
+        self._aio_session = None
+        self.pipeline_stats: Optional[PipelineStats] = None
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36',
             'Referer': 'https://www.miguvideo.com/',
             'Accept': 'application/json'
         }
+        self.cache = self._create_cache(read_only=not persist)
+        self.resilience = Resilience()  # 同步/异步引擎共用同一套限速、重试与熔断状态
         self.session = self._create_session()
         self.tasks: Set[Tuple[str, str]] = set()
+        self.planner = WindowPlanner()
+        self.journal = ScanJournal(enabled=checkpoint and persist)  # 关闭时只读
+        self.store = open_store()
+        self.list_responses: Dict[Tuple[str, str], Optional[Dict]] = {}  # (锚点日期, 赛事) -> match-list 响应
+        self.replay_failures = 0  # 同步引擎 all-view-list 请求失败次数 (有失败的任务不写断点日志)
+        self.resolver: Optional[TeamResolver] = None   # confrontTeams 队名 -> 球队 ID
+        self.club_ids: Dict[str, Optional[str]] = {}    # 跟踪俱乐部 -> 球队 ID
+        self.clubs = self._load_clubs(TRACKED_CLUBS if clubs is None else clubs)  # 英文名 -> 中文写法
+        self.club_results: Dict[str, List[Dict]] = {}  # 上一次抓取中非主俱乐部的记录
     
+    def _load_clubs(self, names: List[str]) -> Dict[str, Tuple[str, ...]]:
+        """
+        跟踪的俱乐部 -> 咪咕侧的中文写法 (team_name_mapping.json + team_aliases.json)，主俱乐部排第一；
+        同时建好队名解析器与各俱乐部的球队 ID，识别比赛时按 ID 精确比较
+        """
+        try:
+            with open(MAPPING_FILE, 'r', encoding='utf-8') as f:
+                mapping = json.load(f)
+        except (OSError, ValueError):
+            mapping = {}
+        aliases = load_aliases()
+        self.resolver = TeamResolver(mapping, aliases)
+        clubs = {PRIMARY_CLUB: tuple(chinese_names(PRIMARY_CLUB, mapping, aliases)) or ('阿森纳',)}
+        for name in names:
+            if name in clubs:
+                continue
+            cn = chinese_names(name, mapping, aliases)
+            if cn:
+                clubs[name] = tuple(cn)
+            else:
+                logger.warning(f"⚠️ 跟踪俱乐部 {name} 在 {MAPPING_FILE} 中没有中文名，已忽略")
+        self.club_ids = {club: self.resolver.resolve(club) for club in clubs}
+        if len(clubs) > 1:
+            logger.info(f"👥 跟踪俱乐部: {', '.join(clubs)}")
+        return clubs
+
+    @staticmethod
+    def _create_cache(read_only: bool = False) -> Optional[ResponseCache]:
+        if not CACHE_ENABLED: return None
+        if read_only and not os.path.exists(CACHE_FILE): return None
+        try:
+            return ResponseCache(read_only=read_only)
+        except Exception as e:
+            logger.warning(f"⚠️ 响应缓存不可用，直接回源: {e}")
+            return None
+
     def _create_session(self):
-        session = requests.Session()
-        retry_strategy = Retry(
-            total=3, backoff_factor=1, status_forcelist=[429, 500, 502, 503, 504]
-        )
-        adapter = HTTPAdapter(max_retries=retry_strategy)
-        session.mount("http://", adapter)
-        session.mount("https://", adapter)
-        return session
+        # 重试交给 resilience 层，不再挂 urllib3 Retry (避免两层重试叠加、尾延迟不可控)
+        return CachedSession(self.cache, self.resilience)
     
-    def _analyze_smart_mode_targets(self) -> Set[Tuple[str, str]]:
+    def _run_async(self, coro):
+        if not self.keep_alive:
+            return asyncio.run(coro)
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+        return self._loop.run_until_complete(coro)
+
+    def _new_aio_session(self):
+        connector = aiohttp.TCPConnector(limit=self.list_concurrency + self.replay_concurrency,
+                                         limit_per_host=self.per_host_limit, ssl=False)
+        return aiohttp.ClientSession(connector=connector, headers=self.headers)
+
+    def close(self):
+        """关闭常驻的连接池与事件循环"""
+        if self._aio_session is not None and not self._aio_session.closed:
+            self._run_async(self._aio_session.close())
+        self._aio_session = None
+        if self._loop is not None:
+            self._loop.close()
+            self._loop = None
+        self.session.close()
+
+    def _load_fixtures(self) -> Optional[List[Dict]]:
+        """状态库里的赛程 (库为空时会先从 FIXTURES_FILE 导入)"""
+        fixtures = self.store.records('fixtures')
+        if not fixtures:
+            logger.warning(f"⚠️ 未找到 {FIXTURES_FILE}")
+            return None
+        return fixtures
+
+    def _analyze_smart_mode_targets(self, fixtures: Optional[List[Dict]] = None) -> Set[Tuple[str, str]]:
         """
         智能分析: 
         1. 过去的比赛 -> 没录像的要抓
         2. 未来的比赛 -> 没直播链接的要抓
+        目标由状态库的索引查询给出 (赛程 LEFT JOIN 上次融合结果)；
+        fixtures 为内存中的新赛程 (流水线传入)，先写入状态库 (未提交) 再查询。
+        已开球、但按发布延迟统计录像还不太可能上架的比赛先跳过
         """
         tasks = set()
+        first_seen = FirstSeenLog()
+        now = time.time()
         
-        if not os.path.exists(FIXTURES_FILE):
-            logger.warning(f"⚠️ 未找到 {FIXTURES_FILE}")
+        if fixtures is not None:
+            self.store.replace('fixtures', fixtures)
+        elif self._load_fixtures() is None:
             return set()
-            
-        with open(FIXTURES_FILE, 'r', encoding='utf-8') as f:
-            fixtures = json.load(f)
-            
-        # 读取现有数据的状态
-        existing_status = {} # key -> {'has_pid': bool, 'has_live': bool}
-        if os.path.exists(HISTORY_FILE):
-            try:
-                with open(HISTORY_FILE, 'r', encoding='utf-8') as f:
-                    history = json.load(f)
-                for h in history:
-                    key = f"{h.get('date')}_{h.get('opponent')}"
-                    existing_status[key] = {
-                        'has_pid': bool(h.get('migu_pid')),
-                        'has_live': bool(h.get('migu_live_url'))
-                    }
-            except: pass
         
-        logger.info(f"📊 智能分析中... (历史记录: {len(existing_status)} 条)")
+        logger.info(f"📊 智能分析中... (历史记录: {self.store.count('merged')} 条)")
         
         fetch_count = 0
-        for match in fixtures:
+        for match in self.store.smart_targets():
             status = match.get('status', 'U') # C=完赛, U=未赛
             date_str = match.get('date', '')
             opponent = match.get('opponent', '')
@@ -108,36 +310,27 @@ class CompleteMiguFetcher:
             
             # 获取对应的咪咕栏目 ID
             comp_id = COMPETITION_MAP.get(comp_name, "5") # 默认英超
-
-            key = f"{date_str}_{opponent}"
-            current_state = existing_status.get(key, {'has_pid': False, 'has_live': False})
-            
-            needs_fetch = False
             
             # 策略 A: 已完赛，但没有录像 PID -> 抓！
-            if status == 'C' and not current_state['has_pid']:
-                needs_fetch = True
+            # 策略 B: 未完赛，但没有直播链接 -> 抓！(已有 live_url 的为节省资源跳过)
+            kickoff = kickoff_epoch(match)
+            if status == 'C' and kickoff is not None and kickoff <= now:
+                earliest = kickoff + first_seen.earliest_replay(comp_id) * 60
+                if now < earliest:
+                    logger.info(f"   ⏳ 录像预计 {datetime.fromtimestamp(earliest).strftime('%H:%M')} 后上架，"
+                                f"暂不抓取: {date_str} vs {opponent}")
+                    continue
+            if status == 'C':
                 logger.info(f"   📼 补录像: {date_str} vs {opponent}")
-                
-            # 策略 B: 未完赛，但没有直播链接 -> 抓！
-            # (通常所有未完赛的我们都可以扫一遍，确保拿到最新的 ID)
-            elif status == 'U':
-                # 哪怕已经有了 live_url，也建议刷新一下，万一 ID 变了呢
-                # 但为了节省资源，如果有了可以跳过。这里我们选择：如果没有 live_url 必须抓
-                if not current_state['has_live']:
-                    needs_fetch = True
-                    logger.info(f"   📡 抓直播: {date_str} vs {opponent}")
-                else:
-                    # 可选：如果想强制刷新所有未来比赛，把这里也设为 True
-                    pass
-
-            if needs_fetch:
-                try:
-                    date_obj = datetime.strptime(date_str, '%Y-%m-%d')
-                    migu_date = date_obj.strftime('%Y%m%d')
-                    tasks.add((migu_date, comp_id))
-                    fetch_count += 1
-                except: pass
+            else:
+                logger.info(f"   📡 抓直播: {date_str} vs {opponent}")
+
+            try:
+                date_obj = datetime.strptime(date_str, '%Y-%m-%d')
+                migu_date = date_obj.strftime('%Y%m%d')
+                tasks.add((migu_date, comp_id))
+                fetch_count += 1
+            except: pass
         
         if fetch_count == 0:
             logger.info("🟢 所有数据均为最新，无需抓取。")
@@ -146,15 +339,14 @@ class CompleteMiguFetcher:
             
         return tasks
     
-    def _get_default_tasks(self) -> Set[Tuple[str, str]]:
+    def _get_default_tasks(self, fixtures: Optional[List[Dict]] = None) -> Set[Tuple[str, str]]:
         """Force模式: 强力扫描所有日期"""
         logger.info("💪 FORCE 模式：不分析差异，直接扫描所有比赛日期")
         tasks = set()
         
-        if not os.path.exists(FIXTURES_FILE): return set()
-        
-        with open(FIXTURES_FILE, 'r', encoding='utf-8') as f:
-            fixtures = json.load(f)
+        if fixtures is None:
+            fixtures = self._load_fixtures()
+            if fixtures is None: return set()
             
         for match in fixtures:
             try:
@@ -169,236 +361,164 @@ class CompleteMiguFetcher:
             
         return tasks
 
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=1, max=5), retry=retry_if_exception_type(Exception), reraise=False)
-    def fetch_full_match_replay(self, mgdb_id: str) -> Optional[Dict]:
-        # 查详情页找 PID
-        url = f"https://vms-sc.miguvideo.com/vms-match/v5/staticcache/basic/all-view-list/{mgdb_id}/2/miguvideo"
+    def fetch_view_list(self, mgdb_id: str, match_date: str = '', is_finished: bool = True) -> Optional[Dict]:
+        """all-view-list 原始响应 (按比赛状态走响应缓存)，失败返回 None"""
+        url = f"{MIGU_REPLAY_API_BASE}/{mgdb_id}/2/miguvideo"
         try:
-            response = self.session.get(url, headers=self.headers, timeout=10, verify=False)
+            response = self.session.get(url, headers=self.headers, timeout=10, verify=False,
+                                        cache_ttl=ttl_for_match(match_date, is_finished))
             if response.status_code != 200: return None
-            data = response.json()
+            return response.json()
+        except Exception as e:
+            logger.warning(f"获取全场回放失败: {e}")
+            return None
+
+    def fetch_full_match_replay(self, mgdb_id: str, match_date: str = '', is_finished: bool = True) -> Optional[Dict]:
+        # 查详情页找 PID
+        data = self.fetch_view_list(mgdb_id, match_date, is_finished)
+        if not self._view_list_ok(data):
+            self.replay_failures += 1
+            return None
+        return self._select_replay_pids(mgdb_id, data)
+
+    @staticmethod
+    def _view_list_ok(data: Optional[Dict]) -> bool:
+        """all-view-list 请求成功 (回放列表为空也算成功；失败的要在下次恢复时重试)"""
+        return isinstance(data, dict) and data.get('code') == 200
+
+    def _select_replay_pids(self, mgdb_id: str, data: Dict) -> Optional[Dict]:
+        """从 all-view-list 响应中挑选全场回放 PID (同步/异步引擎共用)"""
+        try:
             replay_list = data.get('body', {}).get('replayList', [])
-            
-            if not replay_list: return None
-            
-            def duration_to_seconds(duration_str):
-                try:
-                    parts = duration_str.split(':')
-                    if len(parts) == 2: return int(parts[0]) * 60 + int(parts[1])
-                    elif len(parts) == 3: return int(parts[0]) * 3600 + int(parts[1]) * 60 + int(parts[2])
-                    return 0
-                except: return 0
-            
-            def is_definitely_highlight(video_name):
-                """判断是否一定是集锦"""
-                return '集锦' in video_name or '精彩' in video_name
-            
-            def detect_language_commentators(video_name):
-                """
-                检测视频的语言和解说人数
-                返回: (language, num_commentators, priority)
-                language: 'mandarin', 'cantonese', 'english', 'unknown'
-                num_commentators: 实际的解说人数 (从括号中的名字推断)
-                priority: 用于排序的优先级 (越高越优先)
-                """
-                import re
-                
-                # 统计括号中的人名数（用逗号和顿号分割）
-                commentator_pattern = r'[（(]([^)）]+)[)）]'
-                match = re.search(commentator_pattern, video_name)
-                num_commentators = 0
-                
-                if match:
-                    names = match.group(1)
-                    # 统计人数：逗号、顿号、and、&作为分隔符
-                    num_commentators = names.count('、') + names.count(',') + names.count('and') + names.count('&') + 1
-                
-                # 检测粤语标记（粤语多数是2人）
-                if '粤' in video_name or any(name in video_name for name in ['陈凯冬', '何辉', '黄镇', '罗毅']):
-                    return 'cantonese', max(num_commentators, 2), 1  # 粤语优先级最低
-                
-                # 检测英文标记
-                if 'English' in video_name or '英文' in video_name:
-                    return 'english', max(num_commentators, 1), 2
-                
-                # 检测中文标记 - 使用括号内的名字来判断
-                if num_commentators >= 3:
-                    # 3人及以上的中文解说
-                    return 'mandarin', num_commentators, 10 + num_commentators  # 3人版本最优（优先级最高）
-                elif num_commentators == 1:
-                    # 1人解说（单人评论员）
-                    return 'mandarin', 1, 3
-                elif num_commentators == 2:
-                    # 2人中文解说
-                    return 'mandarin', 2, 5
-                
-                # 其他情况
-                if '中文' in video_name or '国语' in video_name:
-                    return 'mandarin', max(num_commentators, 2), 4
-                
-                return 'unknown', num_commentators if num_commentators > 0 else 2, 0
-
-            # 日志记录可用的视频
-            logger.debug(f"   📹 检查 mgdbId={mgdb_id} 的视频列表: {len(replay_list)} 个")
-            for idx, v in enumerate(replay_list[:8]):  # 记录前8个，便于分析语言
-                dur_sec = duration_to_seconds(v.get('duration', '00:00'))
-                lang, commentators, priority = detect_language_commentators(v.get('name', ''))
-                logger.debug(f"     [{idx+1}] {v.get('name')} | 时长={v.get('duration')} | 语言={lang} | {commentators}人 | 优先级={priority}")
-
-            # 【优先级1】查找中文全场回放（优先选择3人解说）
-            full_replays_with_lang = []
-            for v in replay_list:
-                if is_definitely_highlight(v.get('name', '')):
-                    continue
-                lang, commentators, priority = detect_language_commentators(v.get('name', ''))
-                dur_sec = duration_to_seconds(v.get('duration', '00:00'))
-                
-                # 只考虑"回放"标记的视频和时长足够长的视频
-                if '回放' in v.get('name', '') and dur_sec > 3600:  # 1小时以上的回放
-                    full_replays_with_lang.append({
-                        'video': v,
-                        'duration_sec': dur_sec,
-                        'language': lang,
-                        'commentators': commentators,
-                        'priority': priority,
-                        'is_replay_labeled': True
-                    })
-            
-            # 收集所有语言版本的 PID
-            replay_pids = {
-                'mandarin': None,     # 中文 PID
-                'cantonese': None,    # 粤语 PID
-                'other': None         # 其他 PID
-            }
-            
-            if full_replays_with_lang:
-                # 按优先级排序
-                sorted_replays = sorted(
-                    full_replays_with_lang,
-                    key=lambda x: (x['priority'], x['duration_sec']),
-                    reverse=True
-                )
-                
-                # 【重要】遍历所有视频，收集所有语言的 PID（不仅是最优的）
-                best = sorted_replays[0]  # 最优选择（用于 primary）
-                
-                for idx, item in enumerate(sorted_replays):  # 遍历所有，不限 3 个
-                    lang = item['language']
-                    pid = item['video'].get('pID', '')
-                    name = item['video'].get('name', '')
-                    dur_min = item['duration_sec'] // 60
-                    priority = item['priority']
-                    
-                    # 记录日志（前5个）
-                    if idx < 5:
-                        logger.debug(f"   [{idx+1}] {lang:10} | 优先级={priority:2d} | {name} ({dur_min}分钟, PID: {pid})")
-                    
-                    # 保存各语言的 PID（最高优先级的版本）
-                    if lang == 'mandarin' and not replay_pids['mandarin']:
-                        replay_pids['mandarin'] = pid
-                    elif lang == 'cantonese' and not replay_pids['cantonese']:
-                        replay_pids['cantonese'] = pid
-                    elif not replay_pids['other']:
-                        replay_pids['other'] = pid
-                
-                best_pid = best['video'].get('pID', '')
-                if best_pid:
-                    logger.debug(f"   ✅ 最优选择(优先级={best['priority']}): {best['video'].get('name')} (PID: {best_pid})")
-                    replay_pids['primary'] = best_pid  # 主 PID（优先级最高的）
-                    return replay_pids
-            
-            # 【优先级2】查找任何非集锦的回放视频（不限语言）
-            replay_candidates = [
-                v for v in replay_list 
-                if '回放' in v.get('name', '') and not is_definitely_highlight(v.get('name', '')) and duration_to_seconds(v.get('duration', '00:00')) > 3600
-            ]
-            if replay_candidates:
-                longest = max(replay_candidates, key=lambda x: duration_to_seconds(x.get('duration', '00:00')))
-                pid = longest.get('pID', '')
-                if pid:
-                    lang, _, _ = detect_language_commentators(longest.get('name', ''))
-                    logger.debug(f"   ✅ 优先级2(回放标签): {longest.get('name')} ({lang}, PID: {pid})")
-                    replay_pids['primary'] = pid
-                    if lang == 'mandarin':
-                        replay_pids['mandarin'] = pid
-                    elif lang == 'cantonese':
-                        replay_pids['cantonese'] = pid
-                    return replay_pids
-            
-            # 【优先级3】从所有视频中找时长最长且可能是完整比赛的（>90分钟）
-            full_match_candidates = [
-                v for v in replay_list 
-                if not is_definitely_highlight(v.get('name', '')) and duration_to_seconds(v.get('duration', '00:00')) > 5400
-            ]
-            if full_match_candidates:
-                longest = max(full_match_candidates, key=lambda x: duration_to_seconds(x.get('duration', '00:00')))
-                dur_sec = duration_to_seconds(longest.get('duration', '00:00'))
-                pid = longest.get('pID', '')
-                if pid:
-                    logger.debug(f"   ✅ 优先级3(长时间): {longest.get('name')} ({int(dur_sec/60)}分钟, PID: {pid})")
-                    replay_pids['primary'] = pid
-                    return replay_pids
-            
-            # 【优先级4】type=4 的视频中找最长的（可能是官方版本）
-            type4_videos = [r for r in replay_list if r.get('type', '') == '4']
-            if type4_videos:
-                longest = max(type4_videos, key=lambda x: duration_to_seconds(x.get('duration', '00:00')))
-                dur_sec = duration_to_seconds(longest.get('duration', '00:00'))
-                if not is_definitely_highlight(longest.get('name', '')):
-                    pid = longest.get('pID', '')
-                    if pid:
-                        logger.debug(f"   ✅ 优先级4(type=4): {longest.get('name')} ({int(dur_sec/60)}分钟, PID: {pid})")
-                        replay_pids['primary'] = pid
-                        return replay_pids
-            
-            # 【优先级5】兜底: 所有视频中找最长的非集锦视频
-            non_highlight_videos = [v for v in replay_list if not is_definitely_highlight(v.get('name', ''))]
-            if non_highlight_videos:
-                longest = max(non_highlight_videos, key=lambda x: duration_to_seconds(x.get('duration', '00:00')))
-                dur_sec = duration_to_seconds(longest.get('duration', '00:00'))
-                pid = longest.get('pID', '')
-                if pid and dur_sec > 1800:  # 至少30分钟
-                    logger.debug(f"   ⚠️ 优先级5(兜底): {longest.get('name')} ({int(dur_sec/60)}分钟, PID: {pid})")
-                    replay_pids['primary'] = pid
-                    return replay_pids
-            
-            logger.debug(f"   ❌ 未找到合适的全场回放视频")
-            return None if not any(replay_pids.values()) else replay_pids
+            replay_pids = rank_replays(replay_list)
+            if replay_pids and replay_pids.get('primary'):
+                logger.debug(f"   ✅ mgdbId={mgdb_id} 最优选择: PID {replay_pids['primary']} "
+                             f"(中文: {replay_pids.get('mandarin')}, 粤语: {replay_pids.get('cantonese')})")
+            elif replay_list:
+                logger.debug(f"   ❌ mgdbId={mgdb_id} 未找到合适的全场回放视频 ({len(replay_list)} 个视频)")
+            return replay_pids
         except Exception as e:
             logger.warning(f"获取全场回放失败: {e}")
             return None
 
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=1, max=5), retry=retry_if_exception_type(Exception), reraise=False)
     def fetch_api(self, date_str: str, comp_id: str) -> Optional[Dict]:
         url = f"{MIGU_API_BASE}/{date_str}/{comp_id}/up/{SPORT_ID}/miguvideo"
         try:
-            response = self.session.get(url, headers=self.headers, timeout=30, verify=False)
+            response = self.session.get(url, headers=self.headers, timeout=30, verify=False,
+                                        cache_ttl=ttl_for_list_anchor(date_str))
             return response.json() if response.status_code == 200 else None
-        except: return None
+        except Exception: return None  # 重试/熔断已在 resilience 层处理
+
+    async def _get_json_async(self, session, url: str, timeout: int, cache_ttl: int = 0) -> Optional[Dict]:
+        """异步 GET + 本地缓存；回源经过 resilience 层 (限速 / 有限次抖动退避重试 / 熔断)，失败返回 None"""
+        cache = self.cache if cache_ttl else None
+        entry = cache.lookup(url) if cache else None
+        if entry and cache.is_fresh(entry, cache_ttl):
+            cache.hit(url)
+            return json.loads(entry['body'])
+        if self.cache and not cache:
+            self.cache.bypassed += 1
+
+        async def send():
+            async with session.get(url, timeout=aiohttp.ClientTimeout(total=timeout),
+                                   headers=ResponseCache.conditional_headers(entry)) as response:
+                return response.status, response.headers, await response.read()
+
+        try:
+            status, headers, body = await self.resilience.call_async(
+                url, send, status_of=lambda r: r[0], headers_of=lambda r: r[1], size_of=lambda r: len(r[2]),
+                retry_on=(aiohttp.ClientError, asyncio.TimeoutError))
+        except (CircuitOpenError, aiohttp.ClientError, asyncio.TimeoutError):
+            return None
 
-    def parse_match(self, match: Dict, date_key: str) -> Optional[Dict]:
+        if status == 304 and entry:
+            cache.hit(url, revalidated=True)
+            return json.loads(entry['body'])
+        if cache: cache.misses += 1
+        if status != 200:
+            return None
+        try:
+            data = json.loads(body)
+        except ValueError:
+            return None
+        if cache:
+            cache.store(url, body, headers.get('ETag'), headers.get('Last-Modified'))
+        return data
+
+    async def fetch_api_async(self, session, date_str: str, comp_id: str) -> Optional[Dict]:
+        url = f"{MIGU_API_BASE}/{date_str}/{comp_id}/up/{SPORT_ID}/miguvideo"
+        return await self._get_json_async(session, url, timeout=30, cache_ttl=ttl_for_list_anchor(date_str))
+
+    async def fetch_view_list_async(self, session, mgdb_id: str, match_date: str = '',
+                                    is_finished: bool = True) -> Optional[Dict]:
+        url = f"{MIGU_REPLAY_API_BASE}/{mgdb_id}/2/miguvideo"
+        return await self._get_json_async(session, url, timeout=10, cache_ttl=ttl_for_match(match_date, is_finished))
+
+    def _is_club(self, team_name: str, club: str) -> bool:
+        """confrontTeams 里的队名是否就是该俱乐部: 解析出的球队 ID 相同 (别名 "维拉"、变体 "曼联女足" 不会误配)"""
+        team_id = self.club_ids.get(club)
+        if team_id is None:  # 映射表不可用: 只认中文全名
+            return team_name in self.clubs.get(club, ())[:1]
+        return self.resolver.resolve(team_name) == team_id
+
+    def _locate_club(self, match: Dict, club: str = PRIMARY_CLUB) -> Tuple[bool, bool, str]:
+        """识别某俱乐部的比赛，返回 (是否该俱乐部, 是否主场, 对手)"""
+        title = match.get('pkInfoTitle', '') or match.get('title', '')
+        confront_teams = match.get('confrontTeams', [])
+        is_club_home = False
+        opponent = "Unknown"
+        
+        has_club = False
+        if confront_teams and len(confront_teams) == 2:
+            name1 = confront_teams[0].get('name', '')
+            name2 = confront_teams[1].get('name', '')
+            
+            if self._is_club(name1, club):
+                has_club = True
+                is_club_home = True
+                opponent = name2
+            elif self._is_club(name2, club):
+                has_club = True
+                is_club_home = False
+                opponent = name1
+        elif club == PRIMARY_CLUB:
+            # 没有对阵双方信息时，按标题兜底，只认主俱乐部的中文全名 (与原来的 '阿森纳' in title 一致)
+            has_club = self.clubs[PRIMARY_CLUB][0] in title
+        return has_club, is_club_home, opponent
+
+    def _tracked_clubs_in(self, match: Dict) -> List[str]:
+        """这场比赛涉及的跟踪俱乐部 (两支跟踪俱乐部交手时两个都有)"""
+        try:
+            return [club for club in self.clubs if self._locate_club(match, club)[0]]
+        except Exception:
+            return []
+
+    def _needs_replay(self, match: Dict) -> bool:
+        """已完赛且有 mgdbId 的跟踪俱乐部比赛需要深度抓取回放"""
+        return (bool(self._tracked_clubs_in(match)) and match.get('matchStatus', '') in ['2', '3']
+                and bool(match.get('mgdbId', '')))
+
+    def parse_tracked(self, match: Dict, date_key: str, replay_pids: Optional[Dict] = None) -> List[Dict]:
+        """按每个涉及的跟踪俱乐部各解析一条记录；回放只抓一次，各俱乐部共用"""
+        clubs = self._tracked_clubs_in(match)
+        if len(clubs) > 1 and replay_pids is None and self._needs_replay(match):
+            replay_pids = self.fetch_full_match_replay(match.get('mgdbId'), match_date=date_key) or {}
+        parsed = (self.parse_match(match, date_key, replay_pids=replay_pids, club=club) for club in clubs)
+        return [p for p in parsed if p]
+
+    def parse_match(self, match: Dict, date_key: str, replay_pids: Optional[Dict] = None,
+                    club: str = PRIMARY_CLUB) -> Optional[Dict]:
+        """
+        解析单场比赛 (以 club 的视角: is_home / opponent / arsenal_score 都相对 club)。
+        replay_pids 为 None 时对已完赛场次同步深度抓取回放；
+        异步引擎会预先并发抓好并传入 (未找到时传 {})。
+        非主俱乐部的记录带 'club' 字段，抓取结束时按俱乐部拆分。
+        """
         try:
             # 宽容匹配
             title = match.get('pkInfoTitle', '') or match.get('title', '')
             confront_teams = match.get('confrontTeams', [])
-            is_arsenal_home = False
-            opponent = "Unknown"
-            
-            has_arsenal = False
-            if '阿森纳' in title: has_arsenal = True
-            
-            if confront_teams and len(confront_teams) == 2:
-                name1 = confront_teams[0].get('name', '')
-                name2 = confront_teams[1].get('name', '')
-                
-                if '阿森纳' in name1:
-                    has_arsenal = True
-                    is_arsenal_home = True
-                    opponent = name2
-                elif '阿森纳' in name2:
-                    has_arsenal = True
-                    is_arsenal_home = False
-                    opponent = name1
+            has_arsenal, is_arsenal_home, opponent = self._locate_club(match, club)
             
             if not has_arsenal: return None
 
@@ -412,9 +532,11 @@ class CompleteMiguFetcher:
             # 【关键修改】对于已完赛的比赛，深度抓取并验证PID
             # 这是为了确保我们获取全场回放而非集锦
             # 现在支持返回多语言的 PID
+            verified_pids = replay_pids
             replay_pids = {}  # {'mandarin': pid, 'cantonese': pid, 'primary': pid}
             if is_finished and mgdb_id:
-                verified_pids = self.fetch_full_match_replay(mgdb_id)
+                if verified_pids is None:
+                    verified_pids = self.fetch_full_match_replay(mgdb_id, match_date=date_key)
                 if verified_pids:
                     replay_pids = verified_pids  # 获取多语言 PID 字典
                     pid = verified_pids.get('primary', pid)  # 使用优先级最高的 PID
@@ -428,8 +550,12 @@ class CompleteMiguFetcher:
             result = {
                 'date': formatted_date, 'opponent': opponent, 'is_home': is_arsenal_home,
                 'title': title, 'match_status': match_status, 'is_finished': is_finished,
-                'competition': comp_name
+                'competition': comp_name,
+                # matchList 的日期键是北京时间: 记下时区与该比赛日起点，融合时按 UTC 比赛日精确连接
+                'source_tz': MIGU_TIMEZONE, 'matchday_start_utc': matchday_start_utc(formatted_date, MIGU_TIMEZONE)
             }
+            if club != PRIMARY_CLUB:
+                result['club'] = club
             
             # 填充录像信息 - 支持多语言 PID
             if pid:
@@ -460,98 +586,336 @@ class CompleteMiguFetcher:
             logger.warning(f"解析出错: {e}")
             return None
 
-    def fetch_all_season(self, mode="smart") -> List[Dict]:
+    @staticmethod
+    def _iter_match_list(data: Dict, date_str: str):
+        """展开 matchList (可能是 {日期: [...]} 或 [...])，逐个产出 (date_key, match)"""
+        match_list_raw = data.get('body', {}).get('matchList', {})
+        match_dict = {}
+        if isinstance(match_list_raw, dict): match_dict = match_list_raw
+        elif isinstance(match_list_raw, list): match_dict = {date_str: match_list_raw}
+        
+        for date_key, matches in match_dict.items():
+            if not isinstance(matches, list): continue
+            for match in matches:
+                if isinstance(match, dict):
+                    yield date_key, match
+
+    @staticmethod
+    def _log_parsed(parsed: Dict):
+        status_icon = "📼" if parsed.get('pid') else ("📡" if parsed.get('live_url') else "📄")
+        club = f"[{parsed['club']}] " if parsed.get('club') else ""
+        logger.info(f"     ✅ {status_icon} 获取: {parsed['date']} {club}{parsed['opponent']}")
+
+    @staticmethod
+    def _dedupe(all_matches: List[Dict]) -> List[Dict]:
+        # 去重
+        seen = set()
+        unique_matches = []
+        for match in sorted(all_matches, key=lambda x: x['date']):
+            key = (match.get('club'), match['date'], match['opponent'])
+            if key not in seen:
+                seen.add(key)
+                unique_matches.append(match)
+                
+        return unique_matches
+
+    def fetch_all_season(self, mode="smart", engine: Optional[str] = None,
+                         fixtures: Optional[List[Dict]] = None,
+                         tasks: Optional[Set[Tuple[str, str]]] = None) -> List[Dict]:
+        """
+        fixtures: 内存中的赛程 (流水线传入)；为空时读取 FIXTURES_FILE。没有任务时返回空列表
+        tasks: 调度器给出的到期任务 (mode="scheduled")，直接使用，不再按模式推导
+        """
         logger.info(f"🚀 启动抓取 | 模式: {mode.upper()}")
+        self.list_responses = {}
+        self.planner.reset()
         
-        if mode == "force":
-            self.tasks = self._get_default_tasks()
+        if tasks is not None:
+            self.tasks = set(tasks)
+            if not self.tasks:
+                logger.info("💤 调度: 本轮没有到期的比赛。")
+                return []
+        elif mode == "force":
+            self.tasks = self._get_default_tasks(fixtures)
         else:
-            self.tasks = self._analyze_smart_mode_targets()
+            self.tasks = self._analyze_smart_mode_targets(fixtures)
             if not self.tasks:
                 logger.info("💤 没有需要更新的比赛。")
-                sys.exit(0)
+                return []
         
-        logger.info(f"🎯 任务数: {len(self.tasks)} 个 API 请求")
+        logger.info(f"🎯 任务数: {len(self.tasks)} 个 (日期, 赛事)")
+        completed = self.journal.begin(scan_id('+'.join([mode, *self.clubs]), self.tasks))
+
+        engine = (engine or FETCH_ENGINE).lower()
+        if engine == "async" and aiohttp is None:
+            logger.warning("⚠️ 未安装 aiohttp，回退到同步引擎")
+            engine = "sync"
+
+        # 一个 match-list 响应覆盖一段日期: 先按已学窗口合并出最少的锚点，再对没覆盖到的日期补抓
+        # 断点日志里已完成的任务: 直接并入记录并计入覆盖 (不更新窗口估计)，只为还没覆盖到的任务规划锚点
+        result = []
+        for (anchor, comp_id), entry in completed.items():
+            result += entry['records']
+            self.planner.requested.add((anchor, comp_id))
+            self.planner.record_coverage(anchor, comp_id, entry['dates'], learn=False)
+        remaining = self.planner.uncovered(self.tasks)
+        wave = self.planner.plan(remaining) if remaining else []
+        while wave:
+            wave = [t for t in wave if t not in completed]
+            logger.info(f"🗓️ 第 {self.planner.waves} 轮: {len(wave)} 个 API 请求")
+            if wave and engine == "async":
+                result += self._run_async(self._fetch_all_season_async(wave))
+            elif wave:
+                result += self._fetch_all_season_sync(wave)
+            for anchor, comp_id in wave:
+                self.planner.observe(anchor, comp_id, self.list_responses.get((anchor, comp_id)))
+            wave = self.planner.follow_up(self.tasks)
+        result = self._dedupe(result)
+        self.planner.log_savings(len(self.tasks))
+        if self.persist:
+            self.planner.save()
+
+        metrics.record_records('migu', tasks=len(self.tasks), list_requests=len(self.planner.requested) - len(completed),
+                               resumed=len(completed), parsed=len(result))
+        result = self._split_clubs(result)
+        self.resilience.log_stats()
+        self.resilience.export_metrics()
+        if self.cache:
+            self.cache.log_stats()
+            self.cache.export_metrics()
+            self.cache.evict()
+        return result
+
+    def _fetch_all_season_sync(self, tasks: List[Tuple[str, str]]) -> List[Dict]:
         all_matches = []
         
-        for date_str, comp_id in sorted(list(self.tasks)):
+        for date_str, comp_id in tasks:
             logger.info(f"   🔍 扫描: {date_str} [ID={comp_id}]")
             
             data = self.fetch_api(date_str, comp_id)
+            self.list_responses[(date_str, comp_id)] = data
             if not data or data.get('code') != 200: continue
             
-            match_list_raw = data.get('body', {}).get('matchList', {})
-            match_dict = {}
-            if isinstance(match_list_raw, dict): match_dict = match_list_raw
-            elif isinstance(match_list_raw, list): match_dict = {date_str: match_list_raw}
-            
-            for date_key, matches in match_dict.items():
-                if not isinstance(matches, list): continue
-                for match in matches:
-                    parsed = self.parse_match(match, date_key)
-                    
-                    # 【关键修改】只要抓到了(有PID或有LiveURL或纯比赛信息)都保存
-                    if parsed:
-                        all_matches.append(parsed)
-                        # 日志优化
-                        status_icon = "📼" if parsed.get('pid') else ("📡" if parsed.get('live_url') else "📄")
-                        logger.info(f"     ✅ {status_icon} 获取: {parsed['date']} {parsed['opponent']}")
+            records = []
+            failures = self.replay_failures
+            for date_key, match in self._iter_match_list(data, date_str):
+                # 【关键修改】只要抓到了(有PID或有LiveURL或纯比赛信息)都保存
+                for parsed in self.parse_tracked(match, date_key):
+                    records.append(parsed)
+                    self._log_parsed(parsed)
+            self._checkpoint(date_str, comp_id, data, records, complete=self.replay_failures == failures)
+            all_matches += records
         
-        # 去重
-        seen = set()
-        unique_matches = []
-        for match in sorted(all_matches, key=lambda x: x['date']):
-            key = (match['date'], match['opponent'])
-            if key not in seen:
-                seen.add(key)
-                unique_matches.append(match)
-                
-        return unique_matches
+        return self._dedupe(all_matches)
+
+    def _checkpoint(self, date_str: str, comp_id: str, data: Dict, records: List[Dict], complete: bool = True):
+        """complete=False: 有回放请求失败，记录里用的是列表 pID，不写日志，恢复时整个任务重抓"""
+        if not complete:
+            logger.debug(f"   ⏭️ {date_str} [ID={comp_id}] 有回放请求失败，不写断点日志")
+            return
+        self.journal.record(date_str, comp_id, response_dates(data, date_str), records)
 
-    def save_to_json(self, matches: List[Dict]):
-        if not matches: return
+    async def _fetch_all_season_async(self, tasks: List[Tuple[str, str]]) -> List[Dict]:
+        """
+        两阶段流水线:
+          阶段1 (list)   - match-list 请求，解析出需要回放的 mgdbId 投入有界队列
+          阶段2 (replay) - 独立 worker 池消费队列，请求 all-view-list
+        两阶段并行推进、各有并发上限；每个任务的列表与回放都就绪后立即解析并写断点日志，
+        最后按原任务顺序汇总，结果与同步引擎一致。
+        """
+        logger.info(f"⚡ 异步流水线 | list 并发: {self.list_concurrency} | replay 并发: {self.replay_concurrency} | "
+                    f"队列容量: {self.replay_queue_size} | 单域名连接: {self.per_host_limit}")
+        stats = PipelineStats()
+        self.pipeline_stats = stats
+
+        task_queue: asyncio.Queue = asyncio.Queue()
+        for idx, task in enumerate(tasks):
+            task_queue.put_nowait((idx, task))
+        replay_queue: asyncio.Queue = asyncio.Queue(maxsize=self.replay_queue_size)
+
+        responses: Dict[int, Tuple[str, Optional[Dict]]] = {}
+        replay_map: Dict[str, Optional[Dict]] = {}
+        replay_failed: Set[str] = set()     # all-view-list 请求失败的 mgdbId
+        task_replays: Dict[int, Set[str]] = {}  # 任务 -> 需要的全部回放 mgdbId
+        scheduled: Set[str] = set()  # 同一场比赛可能出现在多个日期窗口里，mgdbId 只深度抓取一次
+        task_records: Dict[int, List[Dict]] = {}
+        pending: Dict[int, Set[str]] = {}   # 任务 -> 还没抓完的回放 mgdbId
+        waiting: Dict[str, Set[int]] = {}   # mgdbId -> 等待它的任务
+
+        def finish(idx: int):
+            """任务的列表与回放都已就绪: 解析记录并写断点日志"""
+            if idx in task_records:
+                return
+            date_str, data = responses[idx]
+            records = []
+            for date_key, match in self._iter_match_list(data, date_str):
+                records += self.parse_tracked(match, date_key, replay_pids=replay_map.get(match.get('mgdbId')) or {})
+            task_records[idx] = records
+            self._checkpoint(date_str, tasks[idx][1], data, records,
+                             complete=not task_replays.get(idx, set()) & replay_failed)
+
+        session = self._aio_session
+        if session is None or session.closed:
+            session = self._new_aio_session()
+            if self.keep_alive:
+                self._aio_session = session  # 常驻模式: 连接池留给下一轮
         try:
-            # 读取旧数据进行增量更新
-            old_matches = []
-            if os.path.exists(OUTPUT_FILE):
-                with open(OUTPUT_FILE, 'r', encoding='utf-8') as f:
-                    old_matches = json.load(f)
-            
-            merged_map = {f"{m['date']}_{m['opponent']}": m for m in old_matches}
-            for m in matches:
-                merged_map[f"{m['date']}_{m['opponent']}"] = m
-                
-            final_list = sorted(merged_map.values(), key=lambda x: x['date'])
-            
-            # 【手動修正】已知錯誤的 PID 映射 - 某些比賽的 API 返回錯誤 PID
-            pid_corrections = {
-                ('2026-01-11', '朴茨茅斯'): '962347145',  # Portsmouth FA Cup - 原 PID 不存在
-            }
-            
-            # 應用修正
-            for match in final_list:
-                key = (match.get('date'), match.get('opponent'))
-                if key in pid_corrections:
-                    correct_pid = pid_corrections[key]
-                    if match.get('pid') and match.get('pid') != correct_pid:
-                        logger.info(f"🔧 修正: {key[0]} {key[1]} PID: {match.get('pid')} → {correct_pid}")
-                        match['pid'] = correct_pid
-                        match['detail_url'] = f"https://www.miguvideo.com/p/detail/{correct_pid}"
-
-            with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
-                json.dump(final_list, f, ensure_ascii=False, indent=2)
-            logger.info(f"💾 数据已更新至 {OUTPUT_FILE} (共 {len(final_list)} 条)")
+            async def list_worker():
+                while True:
+                    try:
+                        idx, (date_str, comp_id) = task_queue.get_nowait()
+                    except asyncio.QueueEmpty:
+                        return
+                    logger.info(f"   🔍 扫描: {date_str} [ID={comp_id}]")
+                    stats.mark_start('list')
+                    data = await self.fetch_api_async(session, date_str, comp_id)
+                    responses[idx] = (date_str, data)
+                    self.list_responses[(date_str, comp_id)] = data
+                    ok = bool(data) and data.get('code') == 200
+                    stats.record('list', ok)
+                    if not ok: continue
+                    needed = [(match.get('mgdbId'), date_key) for date_key, match in self._iter_match_list(data, date_str)
+                              if self._needs_replay(match)]
+                    task_replays[idx] = {mgdb_id for mgdb_id, _ in needed}
+                    pending[idx] = {mgdb_id for mgdb_id in task_replays[idx] if mgdb_id not in replay_map}
+                    for mgdb_id in pending[idx]:
+                        waiting.setdefault(mgdb_id, set()).add(idx)
+                    for mgdb_id, date_key in needed:
+                        if mgdb_id in scheduled: continue
+                        scheduled.add(mgdb_id)
+                        await replay_queue.put((mgdb_id, date_key))
+                        stats.sample_queue(replay_queue.qsize())
+                    if not pending[idx]:
+                        finish(idx)
+
+            async def replay_worker():
+                while True:
+                    item = await replay_queue.get()
+                    if item is None:
+                        return
+                    mgdb_id, date_key = item
+                    stats.mark_start('replay')
+                    data = await self.fetch_view_list_async(session, mgdb_id, match_date=date_key)
+                    if self._view_list_ok(data):
+                        replay_map[mgdb_id] = self._select_replay_pids(mgdb_id, data)
+                    else:
+                        replay_map[mgdb_id] = None
+                        replay_failed.add(mgdb_id)
+                    stats.record('replay', replay_map[mgdb_id] is not None)
+                    for idx in waiting.pop(mgdb_id, ()):
+                        pending[idx].discard(mgdb_id)
+                        if not pending[idx]:
+                            finish(idx)
+
+            replay_workers = [asyncio.ensure_future(replay_worker()) for _ in range(self.replay_concurrency)]
+            await asyncio.gather(*(list_worker() for _ in range(self.list_concurrency)))
+            for _ in replay_workers:
+                await replay_queue.put(None)
+            await asyncio.gather(*replay_workers)
+        finally:
+            if session is not self._aio_session:
+                await session.close()
+
+        summary = stats.summary()
+        logger.info(f"📈 流水线统计 | list: {summary['list']['items']}✓/{summary['list']['failed']}✗ "
+                    f"{summary['list']['per_second']}/s | replay: {summary['replay']['items']}✓/{summary['replay']['failed']}✗ "
+                    f"{summary['replay']['per_second']}/s | 队列深度 max={summary['queue']['max_depth']} "
+                    f"avg={summary['queue']['avg_depth']}")
+
+        all_matches = []
+        for idx in range(len(tasks)):
+            for parsed in task_records.get(idx, []):
+                all_matches.append(parsed)
+                self._log_parsed(parsed)
+
+        return self._dedupe(all_matches)
+
+    def _split_clubs(self, records: List[Dict]) -> List[Dict]:
+        """主俱乐部的记录作为返回值，其余按俱乐部存入 club_results (去掉 'club' 字段)"""
+        self.club_results = {club: [] for club in self.clubs if club != PRIMARY_CLUB}
+        primary = []
+        for record in records:
+            club = record.get('club')
+            if club is None:
+                primary.append(record)
+            else:
+                self.club_results.setdefault(club, []).append({k: v for k, v in record.items() if k != 'club'})
+        if self.club_results:
+            logger.info("👥 其他俱乐部: " + ", ".join(f"{club} {len(recs)} 条" for club, recs in self.club_results.items()))
+        return primary
+
+    def save_club_outputs(self):
+        """非主俱乐部: 本次记录按 (日期, 对手) 覆盖到各自的输出文件里"""
+        for club, records in self.club_results.items():
+            if not records:
+                continue
+            path = club_output_file(club)
+            history = []
+            if os.path.exists(path):
+                try:
+                    with open(path, 'r', encoding='utf-8') as f:
+                        history = json.load(f)
+                except (OSError, ValueError) as e:
+                    logger.warning(f"⚠️ {path} 读取失败，重新生成: {e}")
+            merged = {(m.get('date'), m.get('opponent')): m for m in history}
+            merged.update({(m['date'], m['opponent']): m for m in records})
+            final_list = sorted(merged.values(), key=lambda m: m.get('date') or '')
+            apply_pid_corrections(final_list, load_pid_corrections(), club=club)
+            atomic_write_json(path, final_list)
+            logger.info(f"💾 {club}: 已更新至 {path} (共 {len(final_list)} 条)")
+
+    def merge_with_history(self, matches: List[Dict]) -> List[Dict]:
+        """把本次抓取结果 upsert 进状态库的咪咕表 (增量更新)，返回完整列表 (按日期排序)"""
+        self.store.upsert('migu', matches)
+        final_list = self.store.records('migu')
+        
+        # 【修正】已知錯誤的 PID (API 返回錯誤 PID)，見 PID_CORRECTIONS_FILE / audit_pids.py
+        apply_pid_corrections(final_list, load_pid_corrections())
+        return final_list
+
+    def save_to_json(self, matches: List[Dict], final_list: Optional[List[Dict]] = None):
+        """
+        final_list 为已合并好的完整列表 (流水线传入)，为空时现场与历史合并；写回状态库并导出 OUTPUT_FILE。
+        导出成功 (或本次没有新记录) 后清空断点日志；非主俱乐部写各自的输出文件
+        """
+        try:
+            self.save_club_outputs()
+        except Exception as e:
+            logger.error(f"❌ 俱乐部输出保存失败: {e}")
+        if not matches:
+            self.journal.clear()
+            return
+        try:
+            if final_list is None:
+                final_list = self.merge_with_history(matches)
+
+            if self.store.export('migu', final_list, OUTPUT_FILE):
+                logger.info(f"💾 数据已更新至 {OUTPUT_FILE} (共 {len(final_list)} 条)")
+            self.journal.clear()
         except Exception as e:
             logger.error(f"❌ 保存失败: {e}")
 
+    def record_first_seen(self, final_list: List[Dict]):
+        """
+        把完整的咪咕记录与状态库里的赛程融合后记入首次出现日志。
+        以融合结果为准，与流水线记录的键和开球时间一致 (咪咕记录的日期是北京时间，本身没有开球时间)
+        """
+        try:
+            merged = merge_data.merge_data(migu_matches=final_list)
+            FirstSeenLog().observe(merged, COMPETITION_MAP)
+        except Exception as e:
+            logger.warning(f"⚠️ 首次出现时间记录失败: {e}")
+
 def main():
     try:
         # 默认使用 force 模式扫一遍所有日期，确保抓到未来比赛
         run_mode = os.getenv("RUN_MODE", "force") 
         fetcher = CompleteMiguFetcher()
         matches = fetcher.fetch_all_season(mode=run_mode)
-        fetcher.save_to_json(matches)
-    except SystemExit: pass
+        final_list = fetcher.merge_with_history(matches) if matches else None
+        fetcher.save_to_json(matches, final_list=final_list)
+        if final_list:
+            fetcher.record_first_seen(final_list)
     except Exception as e:
         logger.error(f"❌ 执行失败: {str(e)}")
 
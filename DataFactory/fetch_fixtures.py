@@ -5,24 +5,86 @@ RedLens 赛程抓取器 - 终极清洗版 (Table Parser v3)
 1. 误将 "日期-时间" (Jan 20 - 20:00) 识别为比分的问题
 2. 清理 "V", "Carabao Cup" 等残留字符
 3. 增加朴茨茅斯等中文队名映射支持预埋
+4. 快速解析模式 (默认): 流式扫描只收集 <tr> 文本，不建整棵 DOM 树；
+   正则全部预编译，干扰词按赛事缓存逐词正则 (结果与 BeautifulSoup 模式一致)
+5. 条件请求 (ETag / Last-Modified) + 表格区域指纹: 源站未变化时跳过解析，沿用上次的 matches.json
+6. 赛程写入本地状态库 (match_store)，matches.json 由状态库导出
+7. 赛程页请求的状态码、耗时、字节数与解析条数记入 metrics
+8. 日期的年份按赛季推断 (SEASON 起始年份，默认 2025 即 2025/26 赛季)，回填历史赛季时逐季传入
+9. date / time 是赛程页上的伦敦当地时间；解析时一并算出 kickoff_utc (Unix 秒) 并标注 source_tz
 """
 
 import requests
 from bs4 import BeautifulSoup
+from bs4.dammit import UnicodeDammit
+import hashlib
 import json
 import logging
+import os
 from datetime import datetime
+from functools import lru_cache
+from html.parser import HTMLParser
 import re
+import time
+
+import metrics
+from io_utils import atomic_write_bytes, atomic_write_json
+from kickoff_time import FIXTURE_TIMEZONE, UNKNOWN_KICKOFF, local_to_utc
+from match_store import open_store
 
 OUTPUT_FILE = "matches.json"
-SOURCE_URL = "https://www.arsenal.com/results-and-fixtures-list"
+ARSENAL_BASE_URL = os.getenv("ARSENAL_BASE_URL", "https://www.arsenal.com").rstrip('/')  # 可指向本地替身服务
+SOURCE_URL = f"{ARSENAL_BASE_URL}/results-and-fixtures-list"
+FIXTURE_PARSER = os.getenv("FIXTURE_PARSER", "fast")   # fast (流式只取 <tr>) / bs4 (BeautifulSoup 全量解析)
+SEASON = int(os.getenv("ARSENAL_SEASON", "2025"))      # 当前赛季的起始年份 (2025 = 2025/26)
+SEASON_ROLLOVER_MONTH = 8                              # 8 月及以后属于起始年份，1-7 月属于下一年
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+}
+
+# 📦 页面状态 (条件请求 + 指纹)，放在本地状态目录，不入库
+STATE_DIR = os.getenv("REDLENS_STATE_DIR", ".cache")
+PAGE_STATE_FILE = os.path.join(STATE_DIR, "fixtures_page_state.json")
+PAGE_BODY_FILE = os.path.join(STATE_DIR, "fixtures_page.html")   # 304 但日期已变时用来重新解析
+CONDITIONAL_FETCH = os.getenv("FIXTURES_CONDITIONAL", "1") != "0"
+FINGERPRINT_VERSION = 1   # 解析逻辑有变化时 +1，强制下一次重新解析
+TABLE_REGION_PATTERN = re.compile(rb'<table.*</table>', re.IGNORECASE | re.DOTALL)
+
+# ===== 预编译规则 =====
+# 日期+时间段 (Wed Jan 14 - 20:00): 星期+空格+月+空格+日+空格+横杠+空格+时间
+DATETIME_PATTERN = re.compile(r'([A-Za-z]{3}\s+[A-Za-z]{3}\s+\d{1,2})\s*-\s*(\d{1,2}:\d{2})')
+DATE_PATTERN = re.compile(r'([A-Za-z]{3}\s+[A-Za-z]{3}\s+\d{1,2})')
+SCORE_PATTERN = re.compile(r'(\d+)\s*-\s*(\d+)')
+
+# 赛事关键词 -> 赛事名，不仅用于提取，也用于后续清理
+COMP_KEYWORDS = {
+    "Champions League": "UEFA Champions League",
+    "Premier League": "Premier League",
+    "FA Cup": "FA Cup",
+    "League Cup": "League Cup",
+    "Carabao Cup": "League Cup", # 别名
+    "Friendly": "Friendly"
+}
+
+# 提取对手时移除的干扰词 (排在本行赛事名之后，按顺序逐个移除；顺序影响结果，不要合并成一条交替正则)
+REMOVE_TERMS = (
+    "Arsenal", "Home", "Away",
+    "Carabao Cup", "League Cup", "Premier League", "Champions League", "UEFA", "FA Cup",
+    "Mens", "Women", "Tickets", "Report", "Highlights",
+    "(H)", "(A)", " V ", " v ", " vs " # 移除 " V "
+)
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(message)s')
 logger = logging.getLogger(__name__)
 
-def parse_arsenal_date(date_text):
+def season_year(month_num, season=SEASON):
+    """赛季跨年逻辑：8-12 月是赛季起始年份，1-7 月是下一年"""
+    return season if month_num >= SEASON_ROLLOVER_MONTH else season + 1
+
+@lru_cache(maxsize=4096)
+def parse_arsenal_date(date_text, season=SEASON):
     """
-    解析类似 "Wed Oct 1" 的日期，智能推断年份
+    解析类似 "Wed Oct 1" 的日期，按赛季推断年份 (season: 赛季起始年份)
     """
     try:
         parts = date_text.strip().split()
@@ -31,191 +93,357 @@ def parse_arsenal_date(date_text):
         month_str = parts[-2]
         day_str = parts[-1]
         
-        now = datetime.now()
         month_num = datetime.strptime(month_str, "%b").month
-        
-        # 赛季跨年逻辑：8-12月是2025，1-7月是2026
-        if month_num >= 8:
-            year = 2025
-        else:
-            year = 2026
+        year = season_year(month_num, season)
 
         dt = datetime.strptime(f"{year} {month_str} {day_str}", "%Y %b %d")
         return dt.strftime('%Y-%m-%d')
     except Exception:
         return ""
 
+def _get_page(headers, url=SOURCE_URL):
+    """请求赛程页并记录请求指标"""
+    start = time.perf_counter()
+    try:
+        response = requests.get(url, headers=headers, timeout=15)
+    except Exception as e:
+        metrics.record_request(url, type(e).__name__, time.perf_counter() - start)
+        raise
+    metrics.record_request(url, response.status_code, time.perf_counter() - start, len(response.content))
+    return response
+
 def fetch_arsenal_fixtures():
+    """无条件抓取并解析赛程页"""
     logger.info("🚀 启动赛程抓取 (Smart Cleaner Mode)...")
     
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-    }
-    
     try:
-        response = requests.get(SOURCE_URL, headers=headers, timeout=15)
-        soup = BeautifulSoup(response.content, 'html.parser')
-        matches = []
-        
-        rows = soup.find_all('tr')
-        logger.info(f"🔍 扫描到 {len(rows)} 行数据，开始深度清洗...")
-
-        for row in rows:
-            # 获取原始文本
-            original_text = row.get_text(" ", strip=True)
-            
-            # 必须包含 Arsenal
-            if "Arsenal" not in original_text: continue
-            
-            # --- 步骤 1: 提取并移除 日期/时间 (关键修复) ---
-            # 模式: Mon Jan 14 - 20:00
-            # 我们先找到这个模式，提取数据，然后把它从文本里删掉！防止干扰比分
-            
-            date_str = ""
-            time_str = "00:00"
-            
-            # 匹配日期+时间段 (Wed Jan 14 - 20:00)
-            # 正则解释: 星期+空格+月+空格+日+空格+横杠+空格+时间
-            datetime_pattern = r'([A-Za-z]{3}\s+[A-Za-z]{3}\s+\d{1,2})\s*-\s*(\d{1,2}:\d{2})'
-            dt_match = re.search(datetime_pattern, original_text)
-            
-            clean_text = original_text # 用于后续处理的文本
-            
-            if dt_match:
-                # 提取
-                raw_date = dt_match.group(1) # Wed Jan 14
-                time_str = dt_match.group(2) # 20:00
-                date_str = parse_arsenal_date(raw_date)
-                
-                # 【关键】从文本中移除这段日期时间字符串
-                clean_text = clean_text.replace(dt_match.group(0), "")
-            else:
-                # 兜底：如果找不到完整的时间组合，尝试单独找日期
-                date_only_match = re.search(r'([A-Za-z]{3}\s+[A-Za-z]{3}\s+\d{1,2})', original_text)
-                if date_only_match:
-                    date_str = parse_arsenal_date(date_only_match.group(1))
-                    clean_text = clean_text.replace(date_only_match.group(0), "")
-
-            if not date_str: continue
-
-            # --- 步骤 2: 提取赛事 ---
-            competition = "Unknown"
-            # 定义映射关系，不仅用于提取，也用于后续清理
-            comp_keywords = {
-                "Champions League": "UEFA Champions League",
-                "Premier League": "Premier League",
-                "FA Cup": "FA Cup",
-                "League Cup": "League Cup",
-                "Carabao Cup": "League Cup", # 别名
-                "Friendly": "Friendly"
-            }
-            
-            for k, v in comp_keywords.items():
-                if k in original_text:
-                    competition = v
-                    break
-            
-            if competition == "Unknown" and "U21" not in original_text:
-                continue
-
-            # --- 步骤 3: 提取比分 (在去除了时间之后) ---
-            # 此时 clean_text 里已经没有 "20 - 20:00" 这种干扰项了
-            status = 'U'
-            score = ""
-            # 找类似 "2 - 0" 或 "2-0"
-            score_match = re.search(r'(\d+)\s*-\s*(\d+)', clean_text)
-            
-            # 只有当日期是今天或过去，才信任比分 (防止未来日期的误判)
-            is_past = False
-            try:
-                match_date_obj = datetime.strptime(date_str, "%Y-%m-%d")
-                if match_date_obj.date() <= datetime.now().date():
-                    is_past = True
-            except: pass
-
-            if score_match and is_past:
-                status = 'C'
-                score = score_match.group(0)
-                # 从文本中移除比分，方便后续提取对手
-                clean_text = clean_text.replace(score, "")
-
-            # --- 步骤 4: 提取对手 (大扫除) ---
-            # 移除所有干扰词
-            remove_list = [
-                competition, "Arsenal", "Home", "Away", 
-                "Carabao Cup", "League Cup", "Premier League", "Champions League", "UEFA", "FA Cup",
-                "Mens", "Women", "Tickets", "Report", "Highlights",
-                "(H)", "(A)", " V ", " v ", " vs " # 移除 " V "
-            ]
-            
-            opponent_text = clean_text
-            for term in remove_list:
-                # 使用不区分大小写的替换
-                pattern = re.compile(re.escape(term), re.IGNORECASE)
-                opponent_text = pattern.sub("", opponent_text)
-            
-            # 移除多余符号
-            opponent_text = opponent_text.replace("-", "").strip()
-            # 移除连续空格
-            opponent = " ".join(opponent_text.split())
-            
-            # 最终检查: 如果剩下一个单字母 "V"，也去掉
-            if opponent.lower() == "v": continue
-            if len(opponent) < 2: continue
-
-            # --- 步骤 5: 主客场 ---
-            # 简单的逻辑：如果原始文本里 Arsenal 在对手前面?
-            # 或者看是否有 (H) / (A) 标记，或者 Home/Away
-            is_home = True
-            if "(A)" in original_text or "Away" in original_text:
-                is_home = False
-            elif "(H)" in original_text or "Home" in original_text:
-                is_home = True
-            else:
-                # 位置判断法
-                # 原始文本通常是: Date Time Home v Away
-                # 如果 Arsenal 的 index 小于 Opponent 的 index -> 主场
-                try:
-                    idx_ars = original_text.find("Arsenal")
-                    idx_opp = original_text.find(opponent)
-                    if idx_ars > -1 and idx_opp > -1:
-                        if idx_ars > idx_opp:
-                            is_home = False
-                except: pass
-
-            matches.append({
-                "date": date_str,
-                "time": time_str,
-                "opponent": opponent,
-                "competition": competition,
-                "is_home": is_home,
-                "status": status,
-                "score": score
-            })
-
-        # 去重
-        unique_matches = []
-        seen = set()
-        for m in matches:
-            key = f"{m['date']}_{m['opponent']}"
-            if key not in seen:
-                seen.add(key)
-                unique_matches.append(m)
-        
-        unique_matches.sort(key=lambda x: x['date'])
-        
-        logger.info(f"✅ 成功提取 {len(unique_matches)} 场比赛")
-        return unique_matches
-
+        response = _get_page(HEADERS)
+        matches = parse_fixtures_html(response.content)
+        metrics.record_records('fixtures', parsed=len(matches))
+        return matches
     except Exception as e:
         logger.error(f"❌ 错误: {e}")
         return []
 
+def page_fingerprint(content, today):
+    """
+    赛程表格区域 (第一个 <table 到最后一个 </table>) 的指纹。
+    解析结果 (完赛/未赛) 依赖当天日期，所以日期也计入指纹。
+    """
+    match = TABLE_REGION_PATTERN.search(content)
+    digest = hashlib.sha1(match.group(0) if match else content)
+    digest.update(f"|{today.isoformat()}|v{FINGERPRINT_VERSION}".encode('utf-8'))
+    return digest.hexdigest()
+
+def load_fixtures_file():
+    """上次的赛程 (状态库为空时会先从 OUTPUT_FILE 导入)"""
+    return open_store().records('fixtures') or None
+
+def load_page_state():
+    if not os.path.exists(PAGE_STATE_FILE):
+        return {}
+    try:
+        with open(PAGE_STATE_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_page_state(state):
+    """写入页面状态；state 中的 '_body' 单独存为 PAGE_BODY_FILE"""
+    state = dict(state)
+    body = state.pop('_body', None)
+    os.makedirs(STATE_DIR, exist_ok=True)
+    if body is not None:
+        atomic_write_bytes(PAGE_BODY_FILE, body)
+    atomic_write_json(PAGE_STATE_FILE, state)
+
+def _cached_page_body():
+    if not os.path.exists(PAGE_BODY_FILE):
+        return None
+    with open(PAGE_BODY_FILE, 'rb') as f:
+        return f.read()
+
+def fetch_fixtures_incremental():
+    """
+    条件请求 + 表格区域指纹，返回 (比赛列表, 是否有变化, 新的页面状态)。
+    - 源站返回 304 或表格指纹与上次一致: 不解析，直接沿用 OUTPUT_FILE
+    - 抓取失败: ([], False, None)
+    新状态由 save_fixtures 在结果落盘后再提交，避免 dry-run 或中途失败时状态领先于文件
+    """
+    logger.info("🚀 启动赛程抓取 (Smart Cleaner Mode)...")
+    previous = load_fixtures_file()
+    state = load_page_state() if CONDITIONAL_FETCH and previous else {}
+    if state.get('url') != SOURCE_URL:
+        state = {}
+    
+    headers = dict(HEADERS)
+    if state.get('etag'):
+        headers['If-None-Match'] = state['etag']
+    if state.get('last_modified'):
+        headers['If-Modified-Since'] = state['last_modified']
+    
+    try:
+        response = _get_page(headers)
+        content = response.content
+        if response.status_code == 304:
+            content = _cached_page_body()
+            if content is None:
+                # 本地没有页面副本，无法在日期变化后重新解析: 退回无条件请求
+                response = _get_page(HEADERS)
+                content = response.content
+    except Exception as e:
+        logger.error(f"❌ 错误: {e}")
+        return [], False, None
+    
+    if response.status_code >= 400:
+        logger.error(f"❌ 赛程页返回 HTTP {response.status_code}")
+        return [], False, None
+    
+    not_modified = response.status_code == 304
+    fingerprint = page_fingerprint(content, datetime.now().date())
+    new_state = {
+        'url': SOURCE_URL,
+        'etag': response.headers.get('ETag') or (state.get('etag') if not_modified else None),
+        'last_modified': response.headers.get('Last-Modified') or (state.get('last_modified') if not_modified else None),
+        'fingerprint': fingerprint,
+        'checked_at': datetime.now().isoformat(timespec='seconds'),
+    }
+    if not not_modified:
+        new_state['_body'] = content
+    
+    if state.get('fingerprint') == fingerprint:
+        logger.info(f"⏭️ 赛程页未变化 ({'304' if not_modified else '指纹一致'})，跳过解析，沿用 {OUTPUT_FILE} ({len(previous)} 场)")
+        metrics.record_records('fixtures', reused=len(previous))
+        return previous, False, new_state
+    
+    matches = parse_fixtures_html(content)
+    metrics.record_records('fixtures', parsed=len(matches))
+    if not matches:
+        return [], False, None   # 解析不出比赛时不提交状态，下次仍会重新解析
+    return matches, True, new_state
+
+class RowTextCollector(HTMLParser):
+    """
+    流式收集每个 <tr> 的文本 (对应 bs4 的 row.get_text(" ", strip=True))，不建 DOM 树:
+    未闭合的 <tr> 嵌套计入外层行、随 </table> 结束；script/style 里的文本不计入
+    """
+
+    SKIP_TAGS = frozenset(('script', 'style'))
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.rows = []          # 每行一个文本片段列表，按 <tr> 出现顺序
+        self._open_rows = []
+        self._skip = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'tr':
+            parts = []
+            self.rows.append(parts)
+            self._open_rows.append(parts)
+        elif tag in self.SKIP_TAGS:
+            self._skip += 1
+
+    def handle_endtag(self, tag):
+        if tag == 'tr' and self._open_rows:
+            self._open_rows.pop()
+        elif tag == 'table':
+            self._open_rows.clear()
+        elif tag in self.SKIP_TAGS and self._skip:
+            self._skip -= 1
+
+    def handle_data(self, data):
+        text = data.strip()
+        if text and self._open_rows and not self._skip:
+            for parts in self._open_rows:
+                parts.append(text)
+
+
+def _decode_markup(content):
+    """与 bs4 一致: bytes 经 UnicodeDammit 推断编码 (BOM / meta charset / 探测)"""
+    if isinstance(content, str):
+        return content
+    return UnicodeDammit(content, is_html=True).unicode_markup
+
+
+def _row_texts_fast(content):
+    collector = RowTextCollector()
+    collector.feed(_decode_markup(content))
+    collector.close()
+    return [" ".join(parts) for parts in collector.rows]
+
+
+def _row_texts_bs4(content):
+    soup = BeautifulSoup(content, 'html.parser')
+    return [row.get_text(" ", strip=True) for row in soup.find_all('tr')]
+
+
+@lru_cache(maxsize=None)
+def _remove_patterns(competition):
+    """按赛事缓存预编译的逐词正则 (本行赛事名在前，然后是 REMOVE_TERMS)"""
+    return tuple(re.compile(re.escape(term), re.IGNORECASE) for term in (competition,) + REMOVE_TERMS)
+
+
+def remove_noise_terms(text, competition):
+    """按顺序逐个移除干扰词 (不区分大小写)，与原先的逐词替换一致，只是正则不再每行重新编译"""
+    for pattern in _remove_patterns(competition):
+        text = pattern.sub("", text)
+    return text
+
+
+def parse_fixture_row(original_text, today=None, season=SEASON):
+    """解析一行赛程文本，返回比赛字典；不是阿森纳比赛或无法识别时返回 None"""
+    # 必须包含 Arsenal
+    if "Arsenal" not in original_text: return None
+
+    # --- 步骤 1: 提取并移除 日期/时间 (关键修复) ---
+    # 模式: Mon Jan 14 - 20:00
+    # 我们先找到这个模式，提取数据，然后把它从文本里删掉！防止干扰比分
+
+    date_str = ""
+    time_str = UNKNOWN_KICKOFF   # 页面没给开球时间时的占位，kickoff_utc 记为 None
+
+    # 匹配日期+时间段 (Wed Jan 14 - 20:00)
+    dt_match = DATETIME_PATTERN.search(original_text)
+
+    clean_text = original_text # 用于后续处理的文本
+
+    if dt_match:
+        # 提取
+        raw_date = dt_match.group(1) # Wed Jan 14
+        time_str = dt_match.group(2) # 20:00
+        date_str = parse_arsenal_date(raw_date, season)
+
+        # 【关键】从文本中移除这段日期时间字符串
+        clean_text = clean_text.replace(dt_match.group(0), "")
+    else:
+        # 兜底：如果找不到完整的时间组合，尝试单独找日期
+        date_only_match = DATE_PATTERN.search(original_text)
+        if date_only_match:
+            date_str = parse_arsenal_date(date_only_match.group(1), season)
+            clean_text = clean_text.replace(date_only_match.group(0), "")
+
+    if not date_str: return None
+
+    # --- 步骤 2: 提取赛事 ---
+    competition = "Unknown"
+    for k, v in COMP_KEYWORDS.items():
+        if k in original_text:
+            competition = v
+            break
+
+    if competition == "Unknown" and "U21" not in original_text:
+        return None
+
+    # --- 步骤 3: 提取比分 (在去除了时间之后) ---
+    # 此时 clean_text 里已经没有 "20 - 20:00" 这种干扰项了
+    status = 'U'
+    score = ""
+    # 找类似 "2 - 0" 或 "2-0"
+    score_match = SCORE_PATTERN.search(clean_text)
+
+    # 只有当日期是今天或过去，才信任比分 (防止未来日期的误判)
+    is_past = False
+    try:
+        match_date_obj = datetime.strptime(date_str, "%Y-%m-%d")
+        if match_date_obj.date() <= (today or datetime.now().date()):
+            is_past = True
+    except: pass
+
+    if score_match and is_past:
+        status = 'C'
+        score = score_match.group(0)
+        # 从文本中移除比分，方便后续提取对手
+        clean_text = clean_text.replace(score, "")
+
+    # --- 步骤 4: 提取对手 (大扫除) ---
+    # 移除所有干扰词 (本行赛事名 + REMOVE_TERMS)
+    opponent_text = remove_noise_terms(clean_text, competition)
+
+    # 移除多余符号
+    opponent_text = opponent_text.replace("-", "").strip()
+    # 移除连续空格
+    opponent = " ".join(opponent_text.split())
+
+    # 最终检查: 如果剩下一个单字母 "V"，也去掉
+    if opponent.lower() == "v": return None
+    if len(opponent) < 2: return None
+
+    # --- 步骤 5: 主客场 ---
+    # 简单的逻辑：如果原始文本里 Arsenal 在对手前面?
+    # 或者看是否有 (H) / (A) 标记，或者 Home/Away
+    is_home = True
+    if "(A)" in original_text or "Away" in original_text:
+        is_home = False
+    elif "(H)" in original_text or "Home" in original_text:
+        is_home = True
+    else:
+        # 位置判断法
+        # 原始文本通常是: Date Time Home v Away
+        # 如果 Arsenal 的 index 小于 Opponent 的 index -> 主场
+        try:
+            idx_ars = original_text.find("Arsenal")
+            idx_opp = original_text.find(opponent)
+            if idx_ars > -1 and idx_opp > -1:
+                if idx_ars > idx_opp:
+                    is_home = False
+        except: pass
+
+    return {
+        "date": date_str,
+        "time": time_str,
+        "opponent": opponent,
+        "competition": competition,
+        "is_home": is_home,
+        "status": status,
+        "score": score,
+        "kickoff_utc": local_to_utc(date_str, time_str, FIXTURE_TIMEZONE) if dt_match else None,
+        "source_tz": FIXTURE_TIMEZONE
+    }
+
+
+def parse_fixtures_html(content, parser=None, season=SEASON):
+    """
+    解析赛程页 HTML (bytes 或 str)，返回去重排序后的比赛列表
+    parser: fast (默认，流式) / bs4 (BeautifulSoup)；为空时读取 FIXTURE_PARSER
+    season: 赛季起始年份 (决定日期的年份)
+    """
+    parser = (parser or FIXTURE_PARSER).lower()
+    row_texts = _row_texts_bs4(content) if parser == "bs4" else _row_texts_fast(content)
+    logger.info(f"🔍 扫描到 {len(row_texts)} 行数据，开始深度清洗...")
+
+    today = datetime.now().date()
+    matches = []
+    for original_text in row_texts:
+        match = parse_fixture_row(original_text, today, season)
+        if match:
+            matches.append(match)
+
+    # 去重
+    unique_matches = []
+    seen = set()
+    for m in matches:
+        key = f"{m['date']}_{m['opponent']}"
+        if key not in seen:
+            seen.add(key)
+            unique_matches.append(m)
+
+    unique_matches.sort(key=lambda x: x['date'])
+
+    logger.info(f"✅ 成功提取 {len(unique_matches)} 场比赛")
+    return unique_matches
+
+def save_fixtures(data, page_state=None):
+    """写出赛程；page_state (来自 fetch_fixtures_incremental) 在赛程落盘后提交"""
+    if data:
+        open_store().export('fixtures', data, OUTPUT_FILE)
+    if page_state:
+        save_page_state(page_state)
+
 if __name__ == "__main__":
-    data = fetch_arsenal_fixtures()
+    data, changed, page_state = fetch_fixtures_incremental()
     if data:
-        with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        save_fixtures(data, page_state)
         
         # 简单校验打印
         for m in data[-5:]: # 打印最后5场看看未来赛程是否正常
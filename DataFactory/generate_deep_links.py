@@ -5,16 +5,20 @@ RedLens Deep Link Generator (修复版)
 1. 为已完赛且有录像的比赛生成 VOD Scheme (WORLDCUP_DETAIL + PID)
 2. 为未完赛的比赛生成 Live Scheme (WORLDCUP_DETAIL + MgdbID)
 3. 修复: 直播 Scheme 采用与 H5 抓包一致的 WORLDCUP_DETAIL 结构
+4. 增量: merge_data 按 input_hash 复用的记录已带 scheme，直接跳过 (修改 scheme 规则后用 --force 全量重算)
 """
 
 import json
 import logging
 import urllib.parse
 import re
+import sys
+
+import metrics
+from match_store import open_store
 
 # 配置
-INPUT_FILE = "matches_with_videos.json"
-OUTPUT_FILE = "matches_with_videos.json" # 覆写自身
+OUTPUT_FILE = "matches_with_videos.json" # 从状态库导出，覆写自身
 
 # 日志配置
 logging.basicConfig(
@@ -105,19 +109,30 @@ def generate_scheme(match):
     
     return schemes
 
-def process_links():
+def process_links(matches=None, force=False):
+    """
+    为每场比赛写入 scheme_url。
+    未传入 matches 时从状态库读取融合结果，处理后写回状态库并导出 OUTPUT_FILE；传入时只在内存中处理。
+    带 input_hash 且已有 scheme_url 的记录视为未变化并跳过，force=True 时全部重算。
+    返回处理后的比赛列表 (失败返回 None)。
+    """
     logger.info("🔗 开始生成 Deep Links (多语言版)...")
     
     try:
-        with open(INPUT_FILE, 'r', encoding='utf-8') as f:
-            matches = json.load(f)
+        persist = matches is None
+        if persist:
+            matches = open_store().records('merged')
             
         updated_count = 0
         live_count = 0
         vod_count = 0
         multilang_count = 0
+        skipped_count = 0
         
         for match in matches:
+            if not force and match.get('input_hash') and 'scheme_url' in match:
+                skipped_count += 1
+                continue
             schemes = generate_scheme(match)
             
             # 更新主 scheme
@@ -141,17 +156,22 @@ def process_links():
                     vod_count += 1
 
         # 保存回文件
-        with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
-            json.dump(matches, f, ensure_ascii=False, indent=2)
+        if persist:
+            open_store().export('merged', matches, OUTPUT_FILE)
             
         logger.info(f"✅ 处理完成!")
         logger.info(f"   总链接数: {updated_count}")
         logger.info(f"   📼 录像链接: {vod_count}")
         logger.info(f"   🔴 直播链接: {live_count}")
         logger.info(f"   🌐 多语言支持: {multilang_count} (中文/粤语)")
+        logger.info(f"   ♻️ 未变化跳过: {skipped_count}")
+        metrics.record_records('deep_links', vod=vod_count, live=live_count, multilang=multilang_count,
+                               skipped=skipped_count)
+        return matches
         
     except Exception as e:
         logger.error(f"❌ 失败: {e}")
+        return None
 
 if __name__ == "__main__":
-    process_links()
\ No newline at end of file
+    process_links(force='--force' in sys.argv[1:])
\ No newline at end of file
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+RedLens 数据工厂 - 首页摘要
+功能:
+1. 从融合结果里挑出首页需要的几场比赛: 最近一场完赛 (last_finished)、下一场 (next)、
+   接下来三场 (upcoming，含 next)，与 App 里 MatchStore.processMatches 的取法一致
+2. 每场比赛只保留首页展示用到的字段 (SUMMARY_FIELDS)，并附带已经换算好的开球时间:
+   kickoff_utc (Unix 秒) 与北京时间 bj_date / bj_time，客户端首屏不需要排序，也不需要逐行做伦敦 -> 北京的时区换算
+3. published_at 为摘要内容最近一次变化的时间；highlight_until = 最近完赛的比赛日期 (北京时间 0 点) + 48 小时，
+   与 processMatches 计算 defaultHomeTab 的基准相同，客户端当前时间早于它时默认展示 "最近比赛" 页签
+4. 内容不变时不重写 home_summary.json (git 无变动)
+
+用法: python3 DataFactory/home_summary.py [--input matches_with_videos.json] [--output home_summary.json]
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import pytz
+
+from io_utils import atomic_write_json
+from kickoff_time import MIGU_TIMEZONE, fixture_kickoff_utc, matchday_start_utc
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
+logger = logging.getLogger(__name__)
+
+# ===== 配置区 =====
+OUTPUT_FILE = "home_summary.json"
+DISPLAY_TIMEZONE = pytz.timezone(MIGU_TIMEZONE)
+UPCOMING_COUNT = 3
+HIGHLIGHT_HOURS = 48     # 完赛后多久之内首页默认展示这场比赛
+SUMMARY_VERSION = 2
+# 首页卡片用到的字段 (对应 App 的 Match 模型)；PID / 直播间 / input_hash 等不进摘要
+SUMMARY_FIELDS = ('date', 'time', 'opponent', 'competition', 'status', 'score', 'is_home', 'scheme_url')
+
+
+def resolve_kickoff(match: Dict) -> Dict:
+    """开球时间 (赛程为伦敦时间) -> {kickoff_utc, bj_date, bj_time}；时间待定时 kickoff_utc / bj_time 为 None，bj_date 取赛程日期"""
+    kickoff = fixture_kickoff_utc(match)
+    if kickoff is None:
+        return {'kickoff_utc': None, 'bj_date': match.get('date'), 'bj_time': None}
+    local = datetime.fromtimestamp(kickoff, DISPLAY_TIMEZONE)
+    return {'kickoff_utc': kickoff, 'bj_date': local.strftime('%Y-%m-%d'), 'bj_time': local.strftime('%H:%M')}
+
+
+def _entry(match: Optional[Dict]) -> Optional[Dict]:
+    if match is None:
+        return None
+    entry = {field: match[field] for field in SUMMARY_FIELDS if field in match}
+    entry.update(resolve_kickoff(match))
+    return entry
+
+
+def build_summary(merged: List[Dict]) -> Dict:
+    """不含 published_at 的摘要内容"""
+    def order(m: Dict):
+        return m.get('date') or '', m.get('time') or ''
+
+    finished = sorted((m for m in merged if m.get('status') == 'C'), key=order)
+    upcoming = sorted((m for m in merged if m.get('status') != 'C'), key=order)
+    last_finished = _entry(finished[-1] if finished else None)
+    # App 以比赛日期 (设备本地 0 点，用户在北京时间) + 48 小时判断，这里用同一个基准
+    matchday = matchday_start_utc(last_finished['date'], MIGU_TIMEZONE) if last_finished else None
+    highlight_until = matchday + HIGHLIGHT_HOURS * 3600 if matchday is not None else None
+    return {
+        'version': SUMMARY_VERSION,
+        'count': len(merged),
+        'finished_count': len(finished),
+        'last_finished': last_finished,
+        'next': _entry(upcoming[0] if upcoming else None),
+        'upcoming': [_entry(m) for m in upcoming[:UPCOMING_COUNT]],
+        'highlight_until': highlight_until,
+    }
+
+
+def write_summary(merged: List[Dict], path: str = OUTPUT_FILE) -> Dict:
+    """写出首页摘要；内容与上次相同时保留原来的 published_at，不重写文件"""
+    summary = build_summary(merged)
+    previous = None
+    if os.path.exists(path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                previous = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ {path} 读取失败，重新生成: {e}")
+    if previous and {k: v for k, v in previous.items() if k not in ('published_at', 'published_at_utc')} == summary:
+        return previous
+    now = time.time()
+    summary['published_at_utc'] = int(now)
+    summary['published_at'] = datetime.fromtimestamp(now, DISPLAY_TIMEZONE).isoformat(timespec='seconds')
+    atomic_write_json(path, summary)
+    nxt = summary['next']
+    logger.info(f"🏠 首页摘要已更新: 下一场 {nxt['bj_date'] + ' ' + (nxt['bj_time'] or '待定') + ' vs ' + nxt['opponent'] if nxt else '-'}"
+                f" -> {path}")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RedLens 首页摘要 (home_summary.json)")
+    parser.add_argument('--input', default="matches_with_videos.json", help="融合结果文件")
+    parser.add_argument('--output', default=OUTPUT_FILE, help="输出文件")
+    args = parser.parse_args()
+    try:
+        with open(args.input, 'r', encoding='utf-8') as f:
+            merged = json.load(f)
+        write_summary(merged, args.output)
+    except Exception as e:
+        logger.error(f"❌ 首页摘要生成失败: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+RedLens 数据工厂 - 咪咕接口本地响应缓存
+功能:
+1. 按 URL 持久化响应体 + ETag/Last-Modified + 抓取时间 (SQLite 单文件)
+2. 按比赛状态决定 TTL: 完赛超过 N 天视为不可变，近期完赛短 TTL，直播/未赛直接绕过缓存；
+   只缓存 code == 200 的响应，replayList / matchList 为空的响应最多按短 TTL 复用 (当时恰好缺失的回放还会再查)
+3. 过期条目带条件请求头回源，304 时复用本地响应
+4. LRU 淘汰 + 命中/未命中计数
+5. 未命中缓存、需要回源的请求交给 resilience 层 (限速 / 重试 / 熔断)，命中缓存不消耗令牌
+6. read_only=True (流水线 --dry-run) 时以只读方式打开，只查不写: 不存条目、不刷新访问时间、不淘汰
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import time
+import urllib.request
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# ===== 配置区 =====
+STATE_DIR = os.getenv("REDLENS_STATE_DIR", ".cache")                         # 本地状态目录 (不入库)
+CACHE_FILE = os.path.join(STATE_DIR, "migu_http_cache.sqlite")
+CACHE_ENABLED = os.getenv("MIGU_CACHE", "1") != "0"
+IMMUTABLE_AFTER_DAYS = int(os.getenv("MIGU_CACHE_IMMUTABLE_DAYS", "7"))      # 完赛超过 N 天 -> 视为不可变
+RECENT_TTL = int(os.getenv("MIGU_CACHE_RECENT_TTL", "1800"))                # 近期完赛的 TTL (秒)
+IMMUTABLE_TTL = 365 * 24 * 3600
+MAX_ENTRIES = int(os.getenv("MIGU_CACHE_MAX_ENTRIES", "5000"))
+MAX_IDLE_DAYS = 60                                                          # 超过 N 天没被访问的条目直接淘汰
+BYPASS = 0
+
+
+def _parse_date(date_str: str) -> Optional[datetime]:
+    for fmt in ('%Y%m%d', '%Y-%m-%d'):
+        try:
+            return datetime.strptime(date_str, fmt)
+        except (TypeError, ValueError):
+            continue
+    return None
+
+
+def ttl_for_match(match_date: str, is_finished: bool, now: Optional[datetime] = None) -> int:
+    """
+    all-view-list 的 TTL:
+    未完赛/直播中 -> 绕过缓存; 完赛超过 N 天 -> 近似永久; 其余 -> 短 TTL
+    """
+    if not is_finished:
+        return BYPASS
+    day = _parse_date(match_date)
+    if day is None:
+        return RECENT_TTL
+    now = now or datetime.now()
+    if day.date() <= (now - timedelta(days=IMMUTABLE_AFTER_DAYS)).date():
+        return IMMUTABLE_TTL
+    return RECENT_TTL
+
+
+def ttl_for_list_anchor(anchor_date: str, now: Optional[datetime] = None) -> int:
+    """
+    normal-match-list 的 TTL (按请求锚点日期):
+    锚点是今天或未来 (窗口里可能有直播/未赛) -> 绕过缓存; 否则按完赛场次处理
+    """
+    day = _parse_date(anchor_date)
+    now = now or datetime.now()
+    if day is None or day.date() >= now.date():
+        return BYPASS
+    return ttl_for_match(anchor_date, is_finished=True, now=now)
+
+
+def _payload(body: bytes) -> Optional[Dict]:
+    """code == 200 的咪咕响应，其余 (接口报错 / 非 JSON) 返回 None，不缓存"""
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) and data.get('code') == 200 else None
+
+
+def payload_ttl(body: bytes, ttl: int) -> int:
+    """按响应内容修正 TTL: 不可缓存的为 0；没有回放 / 比赛列表的不视为不可变"""
+    data = _payload(body)
+    if data is None:
+        return BYPASS
+    content = data.get('body') or {}
+    if ttl > RECENT_TTL and not (content.get('replayList') or content.get('matchList')):
+        return RECENT_TTL
+    return ttl
+
+
+class ResponseCache:
+    """URL -> 响应体 的 SQLite 缓存"""
+
+    def __init__(self, path: str = CACHE_FILE, max_entries: int = MAX_ENTRIES, read_only: bool = False):
+        self.path = path
+        self.max_entries = max_entries
+        self.read_only = read_only
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.bypassed = 0
+        self._exported: Dict[str, int] = {}
+        if read_only:
+            uri = 'file:' + urllib.request.pathname2url(os.path.abspath(path)) + '?mode=ro'
+            self.conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            return
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                url TEXT PRIMARY KEY,
+                body BLOB NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses(accessed_at)")
+        self.conn.commit()
+
+    def lookup(self, url: str) -> Optional[Dict]:
+        row = self.conn.execute(
+            "SELECT body, etag, last_modified, fetched_at FROM responses WHERE url = ?", (url,)
+        ).fetchone()
+        if not row or _payload(row[0]) is None:
+            return None  # 旧版本存下的错误响应当作未命中，回源后覆盖
+        return {'body': row[0], 'etag': row[1], 'last_modified': row[2], 'fetched_at': row[3]}
+
+    @staticmethod
+    def is_fresh(entry: Dict, ttl: int) -> bool:
+        return time.time() - entry['fetched_at'] < payload_ttl(entry['body'], ttl)
+
+    @staticmethod
+    def conditional_headers(entry: Optional[Dict]) -> Dict[str, str]:
+        headers = {}
+        if entry and entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry and entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def hit(self, url: str, revalidated: bool = False):
+        """记录命中并刷新访问时间；revalidated=True 表示 304 回源确认未变，同时刷新抓取时间"""
+        self.hits += 1
+        if revalidated:
+            self.revalidated += 1
+        if self.read_only:
+            return
+        now = time.time()
+        if revalidated:
+            self.conn.execute("UPDATE responses SET fetched_at = ?, accessed_at = ? WHERE url = ?", (now, now, url))
+        else:
+            self.conn.execute("UPDATE responses SET accessed_at = ? WHERE url = ?", (now, url))
+        self.conn.commit()
+
+    def store(self, url: str, body: bytes, etag: Optional[str] = None, last_modified: Optional[str] = None):
+        if self.read_only or _payload(body) is None:
+            return
+        now = time.time()
+        self.conn.execute(
+            "INSERT OR REPLACE INTO responses (url, body, etag, last_modified, fetched_at, accessed_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (url, body, etag, last_modified, now, now)
+        )
+        self.conn.commit()
+
+    def evict(self) -> int:
+        """淘汰长期未访问的条目，并把总数裁剪到 max_entries (LRU)"""
+        if self.read_only:
+            return 0
+        cutoff = time.time() - MAX_IDLE_DAYS * 24 * 3600
+        removed = self.conn.execute("DELETE FROM responses WHERE accessed_at < ?", (cutoff,)).rowcount
+        removed += self.conn.execute(
+            "DELETE FROM responses WHERE url NOT IN "
+            "(SELECT url FROM responses ORDER BY accessed_at DESC LIMIT ?)", (self.max_entries,)
+        ).rowcount
+        self.conn.commit()
+        return removed
+
+    def export_metrics(self):
+        """把自上次导出以来新增的缓存事件计入 redlens_http_cache_events_total"""
+        current = {'hits': self.hits, 'misses': self.misses, 'revalidated': self.revalidated, 'bypassed': self.bypassed}
+        for result, value in current.items():
+            delta = value - self._exported.get(result, 0)
+            if delta:
+                metrics.inc('redlens_http_cache_events_total', delta, result=result)
+        self._exported = current
+
+    def stats(self) -> Dict[str, int]:
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits, 'misses': self.misses, 'revalidated': self.revalidated,
+            'bypassed': self.bypassed, 'hit_rate': round(self.hits / total, 3) if total else 0.0,
+        }
+
+    def log_stats(self):
+        s = self.stats()
+        logger.info(f"🗄️ 响应缓存 | 命中: {s['hits']} (304 复用: {s['revalidated']}) | "
+                    f"未命中: {s['misses']} | 绕过: {s['bypassed']} | 命中率: {s['hit_rate']:.0%}")
+
+    def close(self):
+        self.conn.close()
+
+
+def cached_response(url: str, body: bytes) -> requests.Response:
+    """把缓存条目包装成 requests.Response，调用方无需区分来源"""
+    response = requests.Response()
+    response.status_code = 200
+    response.reason = 'OK'
+    response.url = url
+    response._content = body
+    response.encoding = 'utf-8'
+    response.headers = CaseInsensitiveDict({'Content-Type': 'application/json', 'X-RedLens-Cache': 'HIT'})
+    return response
+
+
+class CachedSession(requests.Session):
+    """
+    带本地缓存的 Session。
+    调用 get(..., cache_ttl=秒) 启用缓存；不传或传 0 则直接回源 (直播/未赛场景)。
+    resilience 不为空时，所有回源请求都经过它 (限速 / 重试 / 熔断)。
+    """
+
+    def __init__(self, cache: Optional[ResponseCache] = None, resilience=None):
+        super().__init__()
+        self.cache = cache
+        self.resilience = resilience
+
+    def _send(self, method, url, *args, **kwargs):
+        def send():
+            return requests.Session.request(self, method, url, *args, **kwargs)
+        if self.resilience is None:
+            return send()
+        return self.resilience.call(url, send, size_of=lambda r: len(r.content),
+                                    retry_on=(requests.RequestException,))
+
+    def request(self, method, url, *args, cache_ttl: Optional[int] = None, **kwargs):
+        if self.cache is None or method.upper() != 'GET':
+            return self._send(method, url, *args, **kwargs)
+        if not cache_ttl:
+            self.cache.bypassed += 1
+            return self._send(method, url, *args, **kwargs)
+
+        entry = self.cache.lookup(url)
+        if entry and self.cache.is_fresh(entry, cache_ttl):
+            self.cache.hit(url)
+            return cached_response(url, entry['body'])
+
+        headers = dict(kwargs.pop('headers', None) or {})
+        headers.update(self.cache.conditional_headers(entry))
+        response = self._send(method, url, *args, headers=headers, **kwargs)
+
+        if response.status_code == 304 and entry:
+            self.cache.hit(url, revalidated=True)
+            return cached_response(url, entry['body'])
+        self.cache.misses += 1
+        if response.status_code == 200:
+            self.cache.store(url, response.content, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+        return response
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+RedLens 数据工厂 - 文件读写工具
+功能:
+1. content_hash: 对任意 JSON 数据计算稳定的内容哈希 (键排序后序列化)
+2. file_digest: 文件内容摘要 (用于判断输入是否变化)
+3. atomic_write_json: 先写临时文件再 os.replace，避免中途失败留下半个文件；
+   新内容与磁盘上的文件完全一致时直接跳过写入 (不改 mtime，不产生 git 变动)
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+HASH_LENGTH = 16
+
+
+def content_hash(data: Any) -> str:
+    """与字段顺序无关的内容哈希"""
+    payload = json.dumps(data, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:HASH_LENGTH]
+
+
+def file_digest(path: str) -> str:
+    """文件内容的 sha1 (十六进制)"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def atomic_write_bytes(path: str, body: bytes) -> bool:
+    """写入成功返回 True；内容未变化跳过时返回 False"""
+    if os.path.exists(path) and file_digest(path) == hashlib.sha1(body).hexdigest():
+        return False
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix='.' + os.path.basename(path) + '.', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(body)
+            f.flush()
+            os.fsync(f.fileno())
+        if os.path.exists(path):
+            os.chmod(tmp_path, os.stat(path).st_mode & 0o777)
+        else:
+            os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return True
+
+
+def atomic_write_json(path: str, data: Any, indent: int = 2) -> bool:
+    """按仓库统一格式 (ensure_ascii=False, indent=2) 序列化后原子写入；内容未变化时跳过"""
+    body = json.dumps(data, ensure_ascii=False, indent=indent).encode('utf-8')
+    written = atomic_write_bytes(path, body)
+    if not written:
+        logger.info(f"⏭️ {path} 内容未变化，跳过写入")
+    return written
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+RedLens 数据工厂 - 开球时间与时区
+功能:
+1. 两个数据源的本地时间各有明确时区: arsenal.com 赛程是伦敦时间 (FIXTURE_TIMEZONE)，
+   咪咕 matchList 的日期键是北京时间 (MIGU_TIMEZONE)
+2. 入库时换算一次: 赛程记录带 kickoff_utc (Unix 秒，时间待定时为 None，不会把占位的 00:00 当成开球时间)，
+   咪咕记录带 matchday_start_utc (该北京日期 0 点的 Unix 秒)，两者都带 source_tz
+3. 融合按 "开球时刻落在哪个北京比赛日" 做精确连接，不再逐场试探前后三天
+"""
+
+from datetime import datetime
+from typing import Dict, Optional
+
+import pytz
+
+FIXTURE_TIMEZONE = "Europe/London"
+MIGU_TIMEZONE = "Asia/Shanghai"
+UNKNOWN_KICKOFF = "00:00"   # 赛程页没有开球时间时 time 字段的占位值
+
+
+def local_to_utc(date_str: Optional[str], time_str: Optional[str], tz_name: str) -> Optional[int]:
+    """本地日期 + HH:MM -> Unix 秒；格式不对 (如 TBC) 时返回 None"""
+    try:
+        naive = datetime.strptime(f"{date_str} {time_str}", '%Y-%m-%d %H:%M')
+    except (TypeError, ValueError):
+        return None
+    return int(pytz.timezone(tz_name).localize(naive).timestamp())
+
+
+def matchday_start_utc(date_str: Optional[str], tz_name: str = MIGU_TIMEZONE) -> Optional[int]:
+    """本地日期的 0 点 -> Unix 秒 (比赛日窗口 [start, start + 1 天) 的起点)"""
+    return local_to_utc(date_str, "00:00", tz_name)
+
+
+def matchday_of(epoch: float, tz_name: str = MIGU_TIMEZONE) -> str:
+    """某个时刻在 tz_name 下的日期 (YYYY-MM-DD)"""
+    return datetime.fromtimestamp(epoch, pytz.timezone(tz_name)).strftime('%Y-%m-%d')
+
+
+def fixture_kickoff_utc(match: Dict) -> Optional[int]:
+    """赛程记录的开球时刻；入库时已算好就直接用 (旧数据没有该字段时现场换算，占位的 00:00 视为待定)"""
+    if 'kickoff_utc' in match:
+        return match['kickoff_utc']
+    if match.get('time') == UNKNOWN_KICKOFF:
+        return None
+    return local_to_utc(match.get('date'), match.get('time'), match.get('source_tz') or FIXTURE_TIMEZONE)
+
+
+def migu_matchday_utc(record: Dict) -> Optional[int]:
+    """咪咕记录所在北京比赛日的起点"""
+    if record.get('matchday_start_utc') is not None:
+        return record['matchday_start_utc']
+    return matchday_start_utc(record.get('date'), record.get('source_tz') or MIGU_TIMEZONE)
+
+
+def kickoff_matchday_utc(kickoff: float, tz_name: str = MIGU_TIMEZONE) -> Optional[int]:
+    """开球时刻所在比赛日 (tz_name 的自然日) 的起点"""
+    return matchday_start_utc(matchday_of(kickoff, tz_name), tz_name)
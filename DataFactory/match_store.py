@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+RedLens 数据工厂 - 比赛状态库 (SQLite)
+功能:
+1. 赛程 / 咪咕记录 / 融合结果三张表，按 "{date}_{opponent}" 主键 upsert，
+   日期、对手、球队 ID、赛事、状态都建了索引
+2. 智能模式的抓取目标由一条索引查询给出 (赛程 LEFT JOIN 融合结果)，不再每次加载整份 JSON 建字典
+3. matches.json / migu_videos_complete.json / matches_with_videos.json 变成由库导出的产物；
+   库为空或导出文件被外部改动 (摘要与上次导出不一致) 时从 JSON 重新导入
+4. 所有写入在同一个事务里，export() 时才提交；流水线 --dry-run 不提交，库保持不变
+"""
+
+import json
+import logging
+import os
+import sqlite3
+from typing import Dict, List, Optional
+
+from http_cache import STATE_DIR
+from io_utils import atomic_write_json, content_hash, file_digest
+from team_resolver import TeamResolver
+
+logger = logging.getLogger(__name__)
+
+STORE_FILE = os.path.join(STATE_DIR, "redlens_store.sqlite")
+
+# 表名 -> 导出文件 (与各脚本里的文件名一致)
+EXPORT_FILES = {
+    'fixtures': "matches.json",
+    'migu': "migu_videos_complete.json",
+    'merged': "matches_with_videos.json",
+}
+INDEXED_COLUMNS = ('date', 'opponent', 'team_id', 'competition', 'status')
+
+_stores: Dict[str, 'MatchStore'] = {}
+
+
+def record_key(record: Dict) -> str:
+    """与原先 JSON 字典的键一致"""
+    return f"{record.get('date')}_{record.get('opponent')}"
+
+
+def open_store(path: str = STORE_FILE) -> 'MatchStore':
+    """同一进程内共用一个连接，流水线各阶段看到同一个 (未提交的) 事务"""
+    store = _stores.get(path)
+    if store is None:
+        store = _stores[path] = MatchStore(path)
+    return store
+
+
+class MatchStore:
+    """fixtures / migu / merged 三张表，data 列保存原始记录 (JSON)，其余列用于索引查询"""
+
+    def __init__(self, path: str = STORE_FILE, bootstrap: bool = True):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self._resolver: Optional[TeamResolver] = None
+        self._resolver_loaded = False
+        for table in EXPORT_FILES:
+            self.conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS {table} (
+                    key TEXT PRIMARY KEY,
+                    seq INTEGER NOT NULL,
+                    date TEXT,
+                    opponent TEXT,
+                    team_id TEXT,
+                    competition TEXT,
+                    status TEXT,
+                    has_pid INTEGER NOT NULL DEFAULT 0,
+                    has_live INTEGER NOT NULL DEFAULT 0,
+                    hash TEXT NOT NULL,
+                    data TEXT NOT NULL
+                )
+            """)
+            for column in INDEXED_COLUMNS:
+                self.conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_{column} ON {table}({column})")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+        self.conn.commit()
+        if bootstrap:
+            self.sync_from_exports()
+
+    # ---------- 行构造 ----------
+
+    def _team_id(self, name: str) -> Optional[str]:
+        if not self._resolver_loaded:
+            self._resolver_loaded = True
+            try:
+                self._resolver = TeamResolver.from_files()
+            except (OSError, ValueError) as e:
+                logger.warning(f"⚠️ 队名映射不可用，状态库不填 team_id: {e}")
+        return self._resolver.resolve(name) if self._resolver and name else None
+
+    def _row(self, table: str, record: Dict, seq: int) -> tuple:
+        if table == 'migu':
+            status = 'C' if record.get('is_finished') else 'U'
+        else:
+            status = record.get('status', 'U')
+        return (
+            record_key(record), seq, record.get('date'), record.get('opponent'),
+            self._team_id(record.get('opponent', '')), record.get('competition'), status,
+            int(bool(record.get('migu_pid'))), int(bool(record.get('migu_live_url'))),
+            content_hash(record), json.dumps(record, ensure_ascii=False),
+        )
+
+    def _write_rows(self, table: str, rows: List[tuple]):
+        # 内容哈希未变的行不改写
+        self.conn.executemany(f"""
+            INSERT INTO {table} (key, seq, date, opponent, team_id, competition, status, has_pid, has_live, hash, data)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(key) DO UPDATE SET
+                seq = excluded.seq, date = excluded.date, opponent = excluded.opponent, team_id = excluded.team_id,
+                competition = excluded.competition, status = excluded.status, has_pid = excluded.has_pid,
+                has_live = excluded.has_live, hash = excluded.hash, data = excluded.data
+            WHERE {table}.hash != excluded.hash OR {table}.seq != excluded.seq
+        """, rows)
+
+    # ---------- 写入 ----------
+
+    def replace(self, table: str, records: List[Dict]):
+        """整表替换为 records (保留顺序)；只改写变化的行，删除不再出现的键"""
+        rows = [self._row(table, r, seq) for seq, r in enumerate(records)]
+        self._write_rows(table, rows)
+        keep = {row[0] for row in rows}
+        stale = [(k,) for (k,) in self.conn.execute(f"SELECT key FROM {table}") if k not in keep]
+        if stale:
+            self.conn.executemany(f"DELETE FROM {table} WHERE key = ?", stale)
+
+    def upsert(self, table: str, records: List[Dict]):
+        """按键 upsert：已有记录保持原来的位置，新记录追加在末尾"""
+        positions = dict(self.conn.execute(f"SELECT key, seq FROM {table}"))
+        next_seq = max(positions.values(), default=-1) + 1
+        rows = []
+        for r in records:
+            key = record_key(r)
+            if key not in positions:
+                positions[key] = next_seq
+                next_seq += 1
+            rows.append(self._row(table, r, positions[key]))
+        self._write_rows(table, rows)
+
+    def commit(self):
+        self.conn.commit()
+
+    # ---------- 查询 ----------
+
+    def records(self, table: str) -> List[Dict]:
+        """按写入顺序返回整表；咪咕表与原先一样按日期排序 (同日期保持写入顺序)"""
+        order = "date, seq" if table == 'migu' else "seq"
+        return [json.loads(data) for (data,) in self.conn.execute(f"SELECT data FROM {table} ORDER BY {order}")]
+
+    def count(self, table: str) -> int:
+        return self.conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+    def find(self, table: str, **filters) -> List[Dict]:
+        """按索引列等值过滤，如 find('merged', team_id='chelsea', status='C')"""
+        unknown = set(filters) - set(INDEXED_COLUMNS)
+        if unknown:
+            raise ValueError(f"不支持的过滤列: {', '.join(sorted(unknown))}")
+        where = " AND ".join(f"{column} = ?" for column in filters) or "1"
+        sql = f"SELECT data FROM {table} WHERE {where} ORDER BY seq"
+        return [json.loads(data) for (data,) in self.conn.execute(sql, tuple(filters.values()))]
+
+    def smart_targets(self) -> List[Dict]:
+        """
+        智能模式目标 (赛程 LEFT JOIN 上次融合结果):
+        已完赛但没有录像 PID，或未完赛且没有直播链接
+        """
+        rows = self.conn.execute("""
+            SELECT f.data FROM fixtures f LEFT JOIN merged m ON m.key = f.key
+            WHERE (f.status = 'C' AND COALESCE(m.has_pid, 0) = 0)
+               OR (f.status = 'U' AND COALESCE(m.has_live, 0) = 0)
+            ORDER BY f.seq
+        """)
+        return [json.loads(data) for (data,) in rows]
+
+    # ---------- 导入 / 导出 ----------
+
+    def _export_digest(self, table: str) -> Optional[str]:
+        row = self.conn.execute("SELECT value FROM meta WHERE name = ?", (f"export:{table}",)).fetchone()
+        return row[0] if row else None
+
+    def _set_export_digest(self, table: str, digest: str):
+        self.conn.execute("INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)", (f"export:{table}", digest))
+
+    def sync_from_exports(self):
+        """导出文件与上次导出的摘要不一致 (首次运行 / 手工修改 / 状态目录丢失) 时从 JSON 重新导入"""
+        for table, path in EXPORT_FILES.items():
+            if not os.path.exists(path):
+                continue
+            digest = file_digest(path)
+            if digest == self._export_digest(table):
+                continue
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    records = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"⚠️ 无法从 {path} 导入状态库: {e}")
+                continue
+            self.replace(table, records)
+            self._set_export_digest(table, digest)
+            self.commit()
+            logger.info(f"📥 状态库: 从 {path} 导入 {len(records)} 条")
+
+    def export(self, table: str, records: Optional[List[Dict]] = None, path: Optional[str] = None) -> bool:
+        """
+        (可选) 以 records 替换整表，然后导出 JSON 并提交事务。
+        返回导出文件是否有变化。
+        """
+        if records is not None:
+            self.replace(table, records)
+        else:
+            records = self.records(table)
+        path = path or EXPORT_FILES[table]
+        written = atomic_write_json(path, records)
+        if path == EXPORT_FILES[table]:
+            self._set_export_digest(table, file_digest(path))
+        self.commit()
+        return written
@@ -4,13 +4,25 @@ RedLens 数据工厂 - 智能融合模块 (Smart Merge)
 修复: 
 1. 增加 +/- 1 天的日期容错，解决时差导致的不匹配
 2. 增强日志输出，显示匹配失败的具体原因
+3. 队名经 TeamResolver 解析为球队 ID，按 (日期, 球队 ID) 哈希连接，子串匹配仅作兜底
+4. 每条记录带 input_hash (官方赛程 + 匹配到的咪咕字段)，与上次输出一致时直接复用旧记录
+   (连同已生成的 scheme)，输出文件内容不变时跳过写入
+5. 输入与上次结果都从本地状态库 (match_store) 读取，结果写回状态库并导出 OUTPUT_FILE
+6. 主路径按 (开球时刻所在的北京比赛日, 球队 ID) 精确连接 (kickoff_utc / matchday_start_utc 入库时已算好)；
+   开球时间未知或精确键未命中时才回退到 +/- 1 天试探，回退次数单独计数
 """
 
 import json
 import logging
-from typing import List, Dict
+from typing import List, Dict, Optional
 from datetime import datetime, timedelta
 
+import metrics
+from io_utils import content_hash
+from kickoff_time import fixture_kickoff_utc, kickoff_matchday_utc, migu_matchday_utc
+from match_store import open_store
+from team_resolver import TeamResolver, load_aliases
+
 # 日志配置
 logging.basicConfig(
     level=logging.INFO,
@@ -19,12 +31,15 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# 文件路径
-OFFICIAL_FILE = "matches.json"
-MIGU_FILE = "migu_videos_complete.json"
+# 文件路径 (赛程与咪咕记录从状态库读取)
 OUTPUT_FILE = "matches_with_videos.json"
 MAPPING_FILE = "team_name_mapping.json"
 
+# 融合时从咪咕记录带入的字段 (input_hash 只覆盖这些字段 + 官方赛程)
+MIGU_FIELDS = ('migu_pid', 'migu_detail_url', 'migu_live_url',
+               'migu_pid_mandarin', 'migu_detail_url_mandarin',
+               'migu_pid_cantonese', 'migu_detail_url_cantonese')
+
 def get_fuzzy_dates(date_str: str) -> List[str]:
     """生成 [昨天, 今天, 明天] 的日期列表"""
     try:
@@ -37,73 +52,129 @@ def get_fuzzy_dates(date_str: str) -> List[str]:
     except:
         return [date_str]
 
-def merge_data() -> List[Dict]:
+def load_previous() -> List[Dict]:
+    """上一次的融合结果 (用于按 input_hash 复用)"""
+    return open_store().records('merged')
+
+def record_hash(official: Dict, migu: Optional[Dict]) -> str:
+    return content_hash([official, {k: migu.get(k, '') for k in MIGU_FIELDS} if migu else None])
+
+def merge_data(official_matches: Optional[List[Dict]] = None,
+               migu_matches: Optional[List[Dict]] = None,
+               team_mapping: Optional[Dict[str, str]] = None,
+               previous: Optional[List[Dict]] = None) -> List[Dict]:
+    """
+    融合官方赛程与咪咕数据；未传入的赛程/咪咕记录从状态库读取。
+    previous: 上一次的融合结果，为空时从状态库读取；传 [] 表示全部重新计算
+    """
     logger.info("🔄 开始智能融合 (Smart Merge)...")
     
-    with open(OFFICIAL_FILE, 'r', encoding='utf-8') as f:
-        official_matches = json.load(f)
+    if official_matches is None:
+        official_matches = open_store().records('fixtures')
     
-    with open(MIGU_FILE, 'r', encoding='utf-8') as f:
-        migu_matches = json.load(f)
+    if migu_matches is None:
+        migu_matches = open_store().records('migu')
     
-    with open(MAPPING_FILE, 'r', encoding='utf-8') as f:
-        team_mapping = json.load(f)
+    if team_mapping is None:
+        with open(MAPPING_FILE, 'r', encoding='utf-8') as f:
+            team_mapping = json.load(f)
     
-    # 建立咪咕索引
+    if previous is None:
+        previous = load_previous()
+    previous_by_key = {(p.get('date'), p.get('opponent')): p for p in previous if p.get('input_hash')}
+    
+    resolver = TeamResolver(team_mapping, load_aliases())
+    
+    # 建立咪咕索引: (UTC 比赛日起点, 球队ID) -> 记录 用于精确连接；(日期, 球队ID) -> 记录 用于 +/- 1 天兜底 (同键保留第一条)
+    # 队名无法识别的记录按日期另存，只在兜底的子串匹配里使用
+    exact_index = {}
     migu_index = {}
+    migu_by_date = {}
+    unresolved_by_date = {}
     for m in migu_matches:
         d = m['date']
-        if d not in migu_index: migu_index[d] = []
-        migu_index[d].append(m)
+        migu_by_date.setdefault(d, []).append(m)
+        team_id = resolver.resolve(m['opponent'])
+        if team_id is None:
+            unresolved_by_date.setdefault(d, []).append(m)
+        else:
+            migu_index.setdefault((d, team_id), m)
+            exact_index.setdefault((migu_matchday_utc(m), team_id), m)
     
     merged_matches = []
     match_count = 0
+    fallback_count = 0
+    reused_count = 0
+    exact_count = 0
+    probe_count = 0      # 走了 +/- 1 天试探的场次
+    probe_hits = 0
     
     for official in official_matches:
-        merged = official.copy()
         date = official['date']
         opponent = official['opponent']
         opponent_cn = team_mapping.get(opponent, opponent) # 翻译
+        team_id = resolver.resolve(opponent) or resolver.resolve(opponent_cn)
         
-        found = False
-        
-        # 核心修复: 尝试 昨天/今天/明天
-        candidate_dates = get_fuzzy_dates(date)
+        found = None
+
+        # 主路径: 开球时刻落在哪个北京比赛日，就用那一天 + 球队 ID 精确连接
+        kickoff = fixture_kickoff_utc(official)
+        if kickoff is not None and team_id:
+            found = exact_index.get((kickoff_matchday_utc(kickoff), team_id))
+        if found:
+            match_count += 1
+            exact_count += 1
+            logger.info(f"✅ 精准匹配: {date} vs {opponent_cn}")
+
+        # 兜底: 开球时间未知 / 队名无法识别 / 精确键未命中时，尝试 昨天/今天/明天
+        candidate_dates = [] if found else get_fuzzy_dates(date)
+        if candidate_dates:
+            probe_count += 1
         
         for check_date in candidate_dates:
-            if check_date in migu_index:
-                for migu in migu_index[check_date]:
-                    migu_opp = migu['opponent']
-                    
-                    # 模糊匹配队名
+            migu = migu_index.get((check_date, team_id)) if team_id else None
+            if migu is None:
+                # 兜底: 旧的队名子串匹配，只针对无法识别的队名
+                pool = unresolved_by_date.get(check_date, []) if team_id else migu_by_date.get(check_date, [])
+                for candidate in pool:
+                    migu_opp = candidate['opponent']
                     if (opponent_cn in migu_opp or migu_opp in opponent_cn or 
                         opponent.lower() in migu_opp.lower()):
-                        
-                        # 合并所有 migu 数据字段
-                        merged['migu_pid'] = migu.get('migu_pid', '')
-                        merged['migu_detail_url'] = migu.get('migu_detail_url', '')
-                        merged['migu_live_url'] = migu.get('migu_live_url', '')
-                        
-                        # 新增：多语言 PID 支持
-                        if migu.get('migu_pid_mandarin'):
-                            merged['migu_pid_mandarin'] = migu.get('migu_pid_mandarin', '')
-                            merged['migu_detail_url_mandarin'] = migu.get('migu_detail_url_mandarin', '')
-                        if migu.get('migu_pid_cantonese'):
-                            merged['migu_pid_cantonese'] = migu.get('migu_pid_cantonese', '')
-                            merged['migu_detail_url_cantonese'] = migu.get('migu_detail_url_cantonese', '')
-                        
-                        match_count += 1
-                        found = True
-                        
-                        # 如果日期不一致，记录一下
-                        if check_date != date:
-                            logger.info(f"✅ 模糊匹配成功: {date} -> {check_date} | {opponent_cn}")
-                        else:
-                            logger.info(f"✅ 精准匹配: {date} vs {opponent_cn}")
+                        migu = candidate
+                        fallback_count += 1
                         break
-            if found: break
+            if migu is None: continue
+            
+            match_count += 1
+            probe_hits += 1
+            found = migu
+            logger.info(f"✅ 日期试探匹配: {date} -> {check_date} | {opponent_cn}")
+            break
         
-        if not found:
+        # 输入未变化: 直接复用上次的记录 (含 scheme 字段)
+        input_hash = record_hash(official, found)
+        prev = previous_by_key.get((date, opponent))
+        if prev is not None and prev['input_hash'] == input_hash:
+            merged_matches.append(prev)
+            reused_count += 1
+            continue
+        
+        merged = official.copy()
+        if found:
+            migu = found
+            # 合并所有 migu 数据字段
+            merged['migu_pid'] = migu.get('migu_pid', '')
+            merged['migu_detail_url'] = migu.get('migu_detail_url', '')
+            merged['migu_live_url'] = migu.get('migu_live_url', '')
+            
+            # 新增：多语言 PID 支持
+            if migu.get('migu_pid_mandarin'):
+                merged['migu_pid_mandarin'] = migu.get('migu_pid_mandarin', '')
+                merged['migu_detail_url_mandarin'] = migu.get('migu_detail_url_mandarin', '')
+            if migu.get('migu_pid_cantonese'):
+                merged['migu_pid_cantonese'] = migu.get('migu_pid_cantonese', '')
+                merged['migu_detail_url_cantonese'] = migu.get('migu_detail_url_cantonese', '')
+        else:
             # 初始化为空
             merged['migu_pid'] = ''
             merged['migu_detail_url'] = ''
@@ -117,15 +188,22 @@ def merge_data() -> List[Dict]:
             # 调试日志：为什么没匹配上？
             # logger.debug(f"❌ 未匹配: {date} {opponent} (可能原因: 咪咕无数据 或 队名未映射)")
         
+        merged['input_hash'] = input_hash
         merged_matches.append(merged)
     
-    logger.info(f"📊 最终统计: 成功匹配 {match_count} / {len(merged_matches)} 场")
+    logger.info(f"📊 最终统计: 成功匹配 {match_count} / {len(merged_matches)} 场 "
+                f"(子串兜底 {fallback_count} 场, 队名模糊识别 {resolver.fuzzy_hits} 个, 未识别 {resolver.misses} 个)")
+    logger.info(f"🕒 精确连接 {exact_count} 场 | +/- 1 天试探 {probe_count} 场 (命中 {probe_hits} 场)")
+    logger.info(f"♻️ 输入未变化复用: {reused_count} 场 | 重新计算: {len(merged_matches) - reused_count} 场")
+    metrics.record_records('merge', matched=match_count, unmatched=len(merged_matches) - match_count,
+                           fallback=fallback_count, reused=reused_count,
+                           exact=exact_count, date_probes=probe_count, date_probe_hits=probe_hits,
+                           fuzzy_names=resolver.fuzzy_hits, unresolved_names=resolver.misses)
     return merged_matches
 
 def save_merged_data(matches):
-    with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
-        json.dump(matches, f, ensure_ascii=False, indent=2)
-    logger.info(f"💾 已保存至 {OUTPUT_FILE}")
+    if open_store().export('merged', matches, OUTPUT_FILE):
+        logger.info(f"💾 已保存至 {OUTPUT_FILE}")
 
 if __name__ == "__main__":
     data = merge_data()
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+RedLens 数据工厂 - 运行指标
+功能:
+1. 进程内的计数器 / 仪表 / 直方图注册表 (带标签)，各阶段直接调用 inc / set_gauge / observe 记录
+2. 请求指标按接口 (endpoint) 和状态码统计: 次数、耗时直方图、传输字节数
+3. 运行结束导出 Prometheus textfile (node_exporter textfile collector 可直接采集) 与 JSON 运行报告，
+   便于跨运行画图、在匹配率或延迟退化时告警
+"""
+
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from io_utils import atomic_write_bytes, atomic_write_json
+
+logger = logging.getLogger(__name__)
+
+# ===== 配置区 =====
+STATE_DIR = os.getenv("REDLENS_STATE_DIR", ".cache")
+METRICS_TEXTFILE = os.getenv("REDLENS_METRICS_TEXTFILE", os.path.join(STATE_DIR, "redlens.prom"))
+RUN_REPORT_FILE = os.getenv("REDLENS_RUN_REPORT", os.path.join(STATE_DIR, "run_report.json"))
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# 指标名 -> (类型, 说明)
+METRICS = {
+    'redlens_http_requests_total': ('counter', "回源请求次数 (每次重试单独计)，按接口与状态码"),
+    'redlens_http_request_duration_seconds': ('histogram', "单次回源请求耗时"),
+    'redlens_http_response_bytes_total': ('counter', "回源响应体字节数"),
+    'redlens_http_cache_events_total': ('counter', "本地响应缓存事件 (hits/misses/revalidated/bypassed)"),
+    'redlens_resilience_events_total': ('counter', "容错层事件 (重试/放弃/限速/熔断)"),
+    'redlens_records_total': ('counter', "各阶段处理的记录数，按阶段与类别"),
+    'redlens_stage_duration_seconds': ('gauge', "阶段耗时"),
+    'redlens_stage_items': ('gauge', "阶段处理条目数"),
+    'redlens_match_rate': ('gauge', "已完赛场次中匹配到录像 PID 的比例"),
+    'redlens_run_timestamp_seconds': ('gauge', "本次运行结束时间 (Unix 秒)"),
+}
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def endpoint_of(url: str) -> str:
+    path = urlsplit(url).path
+    if 'normal-match-list' in path:
+        return 'match_list'
+    if 'all-view-list' in path:
+        return 'all_view_list'
+    if 'results-and-fixtures' in path:
+        return 'fixtures_page'
+    return 'other'
+
+
+def _label_key(labels: Dict[str, object]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.counters: Dict[str, Dict[LabelKey, float]] = {}
+        self.gauges: Dict[str, Dict[LabelKey, float]] = {}
+        self.histograms: Dict[str, Dict[LabelKey, Dict]] = {}
+        self.lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1, **labels):
+        with self.lock:
+            series = self.counters.setdefault(name, {})
+            key = _label_key(labels)
+            series[key] = series.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels):
+        with self.lock:
+            self.gauges.setdefault(name, {})[_label_key(labels)] = value
+
+    def observe(self, name: str, value: float, buckets: Tuple[float, ...] = LATENCY_BUCKETS, **labels):
+        with self.lock:
+            series = self.histograms.setdefault(name, {})
+            h = series.setdefault(_label_key(labels), {'buckets': list(buckets), 'counts': [0] * len(buckets),
+                                                        'sum': 0.0, 'count': 0})
+            for i, bound in enumerate(h['buckets']):
+                if value <= bound:
+                    h['counts'][i] += 1
+            h['sum'] += value
+            h['count'] += 1
+
+    def reset(self):
+        with self.lock:
+            self.counters.clear()
+            self.gauges.clear()
+            self.histograms.clear()
+
+    # ---------- 读取 ----------
+
+    def counter_total(self, name: str, **labels) -> float:
+        """对满足 labels 的所有序列求和"""
+        wanted = set(_label_key(labels))
+        return sum(v for k, v in self.counters.get(name, {}).items() if wanted <= set(k))
+
+    @staticmethod
+    def quantile(h: Dict, q: float) -> Optional[float]:
+        """按桶线性插值估算分位数 (与 PromQL histogram_quantile 相同的做法)"""
+        if not h['count']:
+            return None
+        rank = q * h['count']
+        lower, prev = 0.0, 0
+        for bound, cumulative in zip(h['buckets'], h['counts']):
+            if cumulative >= rank:
+                in_bucket = cumulative - prev
+                return round(lower + (bound - lower) * ((rank - prev) / in_bucket if in_bucket else 1.0), 4)
+            lower, prev = bound, cumulative
+        return h['buckets'][-1]  # 落在 +Inf 桶里，只能给出最后一个有限上界
+
+    # ---------- 导出 ----------
+
+    def render_prometheus(self) -> str:
+        lines: List[str] = []
+        with self.lock:
+            names = sorted(set(self.counters) | set(self.gauges) | set(self.histograms))
+            for name in names:
+                kind, help_text = METRICS.get(name, ('untyped', ''))
+                if help_text:
+                    lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for key, value in sorted(self.counters.get(name, {}).items()):
+                    lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+                for key, value in sorted(self.gauges.get(name, {}).items()):
+                    lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+                for key, h in sorted(self.histograms.get(name, {}).items()):
+                    for bound, count in zip(h['buckets'], h['counts']):
+                        lines.append(f"{name}_bucket{_format_labels(key, ('le', _format_value(bound)))} {count}")
+                    lines.append(f"{name}_bucket{_format_labels(key, ('le', '+Inf'))} {h['count']}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {_format_value(round(h['sum'], 6))}")
+                    lines.append(f"{name}_count{_format_labels(key)} {h['count']}")
+        return '\n'.join(lines) + '\n'
+
+    def snapshot(self) -> Dict:
+        def series(store):
+            return [{'name': name, 'labels': dict(key), 'value': value}
+                    for name, values in sorted(store.items()) for key, value in sorted(values.items())]
+
+        with self.lock:
+            histograms = []
+            for name, values in sorted(self.histograms.items()):
+                for key, h in sorted(values.items()):
+                    histograms.append({
+                        'name': name, 'labels': dict(key), 'count': h['count'], 'sum': round(h['sum'], 6),
+                        'p50': self.quantile(h, 0.5), 'p95': self.quantile(h, 0.95), 'p99': self.quantile(h, 0.99),
+                        'buckets': dict(zip((_format_value(b) for b in h['buckets']), h['counts'])),
+                    })
+            return {'counters': series(self.counters), 'gauges': series(self.gauges), 'histograms': histograms}
+
+
+REGISTRY = MetricsRegistry()
+
+
+def inc(name: str, value: float = 1, **labels):
+    REGISTRY.inc(name, value, **labels)
+
+
+def set_gauge(name: str, value: float, **labels):
+    REGISTRY.set_gauge(name, value, **labels)
+
+
+def observe(name: str, value: float, **labels):
+    REGISTRY.observe(name, value, **labels)
+
+
+def record_request(url: str, status: object, seconds: float, nbytes: int = 0):
+    """一次回源请求: status 为状态码，网络错误时传异常类名"""
+    endpoint = endpoint_of(url)
+    REGISTRY.inc('redlens_http_requests_total', endpoint=endpoint, status=status)
+    REGISTRY.observe('redlens_http_request_duration_seconds', seconds, endpoint=endpoint)
+    if nbytes:
+        REGISTRY.inc('redlens_http_response_bytes_total', nbytes, endpoint=endpoint)
+
+
+def record_records(stage: str, **counts):
+    """某阶段各类别的记录数，如 record_records('merge', matched=40, unmatched=13)"""
+    for kind, value in counts.items():
+        REGISTRY.inc('redlens_records_total', value, stage=stage, kind=kind)
+
+
+def write_textfile(path: str = METRICS_TEXTFILE) -> bool:
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    return atomic_write_bytes(path, REGISTRY.render_prometheus().encode('utf-8'))
+
+
+def build_report(stages: List[Dict], **run_info) -> Dict:
+    """JSON 运行报告: 运行信息 + 关键摘要 + 全部序列"""
+    snapshot = REGISTRY.snapshot()
+    latency = {h['labels'].get('endpoint', ''): {'count': h['count'], 'p50': h['p50'], 'p95': h['p95'], 'p99': h['p99']}
+               for h in snapshot['histograms'] if h['name'] == 'redlens_http_request_duration_seconds'}
+    match_rate = REGISTRY.gauges.get('redlens_match_rate', {}).get((), None)
+    return {
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'run': run_info,
+        'summary': {
+            'http_requests': int(REGISTRY.counter_total('redlens_http_requests_total')),
+            'http_bytes': int(REGISTRY.counter_total('redlens_http_response_bytes_total')),
+            'retries': int(REGISTRY.counter_total('redlens_resilience_events_total', event='retries')),
+            'cache_hits': int(REGISTRY.counter_total('redlens_http_cache_events_total', result='hits')),
+            'match_rate': match_rate,
+            'latency_seconds': latency,
+            'total_seconds': round(sum(s['seconds'] for s in stages), 3),
+        },
+        'stages': stages,
+        **snapshot,
+    }
+
+
+def write_run_report(stages: List[Dict], path: str = RUN_REPORT_FILE, **run_info) -> Dict:
+    """写出 Prometheus textfile 与 JSON 运行报告，返回报告内容"""
+    for s in stages:
+        REGISTRY.set_gauge('redlens_stage_duration_seconds', s['seconds'], stage=s['stage'])
+        REGISTRY.set_gauge('redlens_stage_items', s['items'], stage=s['stage'])
+    REGISTRY.set_gauge('redlens_run_timestamp_seconds', round(time.time(), 3))
+    report = build_report(stages, **run_info)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    atomic_write_json(path, report)
+    write_textfile()
+    logger.info(f"📏 运行指标已写出: {METRICS_TEXTFILE} / {path}")
+    return report
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+RedLens 数据工厂 - 录像发布延迟模型
+功能:
+1. 追加式日志 .cache/first_seen.jsonl: 每场比赛的咪咕记录、直播间、各语言录像 PID 第一次出现的时间
+   (只追加，不改写；日志丢失只影响统计样本，不影响数据)
+2. 按赛事 × 语言统计 "开球 -> 首次出现" 的延迟 (分钟): 样本数、p10 / p25 / 中位数 / p75 / p90
+3. 智能模式与调度器据此决定何时开始查录像: 太早的请求直接跳过，在通常上架的时间附近密集轮询
+
+说明: 首次出现时间以融合结果为准 (需要赛程上的开球时间)，精度取决于轮询频率，是实际上架时间的上界；
+第一次见到某场比赛时已经存在的字段记为 baseline，不计入统计。
+"""
+
+import json
+import logging
+import os
+import time
+from typing import Dict, List, Optional
+
+from http_cache import STATE_DIR
+from match_store import record_key
+from refresh_scheduler import MATCH_DURATION, kickoff_epoch
+
+logger = logging.getLogger(__name__)
+
+# ===== 配置区 =====
+FIRST_SEEN_FILE = os.path.join(STATE_DIR, "first_seen.jsonl")
+MIN_SAMPLES = int(os.getenv("PUBLISH_DELAY_MIN_SAMPLES", "3"))          # 样本不足时不给估计
+EARLY_QUANTILE = float(os.getenv("PUBLISH_DELAY_EARLY_QUANTILE", "0.1"))  # 从这个分位开始密集查录像
+MAX_DELAY_MINUTES = 7 * 24 * 60                                          # 超过 7 天才出现的视为异常样本
+QUANTILES = (('p10', 0.1), ('p25', 0.25), ('median', 0.5), ('p75', 0.75), ('p90', 0.9))
+
+# 字段名 -> 融合结果里对应的键
+FIELDS = {
+    'entry': None,  # 融合到任意咪咕记录
+    'live': 'migu_live_url',
+    'pid': 'migu_pid',
+    'pid_mandarin': 'migu_pid_mandarin',
+    'pid_cantonese': 'migu_pid_cantonese',
+}
+MIGU_KEYS = ('migu_pid', 'migu_live_url', 'migu_detail_url')
+
+
+def percentile(values: List[float], q: float) -> float:
+    """线性插值分位数，values 需已排序"""
+    if len(values) == 1:
+        return values[0]
+    pos = (len(values) - 1) * q
+    lower = int(pos)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (pos - lower)
+
+
+class FirstSeenLog:
+    def __init__(self, path: str = FIRST_SEEN_FILE):
+        self.path = path
+        self.events: List[Dict] = self._load()
+        self.seen = {(e['key'], e['field']) for e in self.events}
+        self._cached: Optional[Dict] = None
+
+    def _load(self) -> List[Dict]:
+        if not os.path.exists(self.path):
+            return []
+        events = []
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    events.append(json.loads(line))
+                except ValueError:
+                    continue  # 写到一半中断的行
+        return events
+
+    def observe(self, merged: List[Dict], comp_ids: Dict[str, str], now: Optional[float] = None) -> int:
+        """对比融合结果，把第一次出现的字段追加到日志，返回新增事件数"""
+        now = time.time() if now is None else now
+        new_events = []
+        for match in merged:
+            if not any(match.get(k) for k in MIGU_KEYS):
+                continue
+            key = record_key(match)
+            baseline = (key, 'entry') not in self.seen
+            kickoff = kickoff_epoch(match)
+            for field, source in FIELDS.items():
+                if (key, field) in self.seen or (source and not match.get(source)):
+                    continue
+                new_events.append({
+                    'key': key, 'field': field, 'value': match.get(source) if source else None,
+                    'comp': comp_ids.get(match.get('competition', 'Premier League'), "5"),
+                    'kickoff': kickoff, 'seen_at': round(now, 3), 'baseline': baseline,
+                })
+                self.seen.add((key, field))
+        if new_events:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                for event in new_events:
+                    f.write(json.dumps(event, ensure_ascii=False) + '\n')
+            self.events.extend(new_events)
+            self._cached = None
+            usable = sum(1 for e in new_events if not e['baseline'])
+            logger.info(f"🕒 首次出现日志: 新增 {len(new_events)} 条 (可用于延迟统计 {usable} 条)")
+        return len(new_events)
+
+    def _samples(self) -> Dict[str, Dict[str, List[float]]]:
+        """{赛事 ID: {字段: 已排序的延迟 (开球后分钟数)}}"""
+        if self._cached is None:
+            samples: Dict[str, Dict[str, List[float]]] = {}
+            for e in self.events:
+                if e.get('baseline') or e.get('kickoff') is None:
+                    continue
+                delay = (e['seen_at'] - e['kickoff']) / 60
+                if 0 <= delay <= MAX_DELAY_MINUTES:
+                    samples.setdefault(e['comp'], {}).setdefault(e['field'], []).append(delay)
+            for fields in samples.values():
+                for values in fields.values():
+                    values.sort()
+            self._cached = samples
+        return self._cached
+
+    def stats(self) -> Dict[str, Dict[str, Dict]]:
+        """{赛事 ID: {字段: {count, p10, p25, median, p75, p90}}}，单位: 开球后分钟数"""
+        result: Dict[str, Dict[str, Dict]] = {}
+        for comp_id, fields in self._samples().items():
+            for field, values in fields.items():
+                summary = {'count': len(values)}
+                summary.update({name: round(percentile(values, q), 1) for name, q in QUANTILES})
+                result.setdefault(comp_id, {})[field] = summary
+        return result
+
+    def quantile(self, comp_id: str, field: str, q: float) -> Optional[float]:
+        """开球后多少分钟 (样本不足 MIN_SAMPLES 时返回 None)"""
+        values = self._samples().get(comp_id, {}).get(field, [])
+        if len(values) < MIN_SAMPLES:
+            return None
+        return percentile(values, q)
+
+    def earliest_replay(self, comp_id: str) -> float:
+        """开球后多少分钟开始值得查录像: 有足够样本时取 EARLY_QUANTILE 分位，否则为完场时间"""
+        estimate = self.quantile(comp_id, 'pid', EARLY_QUANTILE)
+        return max(MATCH_DURATION, estimate) if estimate is not None else MATCH_DURATION
+
+    def scheduler_delays(self) -> Dict[str, float]:
+        """给调度器的 {赛事 ID: 完场后多少分钟开始密集轮询}，只包含样本足够的赛事"""
+        delays = {}
+        for comp_id in self._samples():
+            estimate = self.quantile(comp_id, 'pid', EARLY_QUANTILE)
+            if estimate is not None:
+                delays[comp_id] = max(0.0, estimate - MATCH_DURATION)
+        return delays
+
+    def log_stats(self):
+        for comp_id, fields in sorted(self.stats().items()):
+            parts = [f"{field} n={s['count']} p50={s['median']:.0f}m p90={s['p90']:.0f}m"
+                     for field, s in sorted(fields.items())]
+            logger.info(f"🕒 发布延迟 [赛事 {comp_id}] " + " | ".join(parts))
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+RedLens 数据工厂 - 分片发布 (客户端增量下载)
+功能:
+1. 把融合结果按月份 (比赛日期的 YYYY-MM) 切成分片，分片为紧凑 JSON (无缩进)，
+   文件名带内容哈希: feed/shards/2025-08.{hash}.json，内容不变文件名就不变，可长期缓存
+2. 每个分片另有预压缩版本: .json.gz (始终生成)、.json.br (安装了 brotli 时生成)
+3. feed/manifest.json 列出全部分片的 key / 路径 / sha256 / 字节数 / 场次数 / 压缩版本，
+   客户端只需下载 manifest，再拉取哈希变化了的分片
+4. 先写分片再写 manifest；分片集合没变时 manifest 不重写 (git 无变动)。
+   只保留当前与上一版 manifest 引用的分片，正在按旧 manifest 下载的客户端不会 404
+5. manifest 每次变化 revision +1，并由上一版分片还原出版本 N-1，生成 N-1 -> N 的增量 (feed_delta)
+   写到 feed/deltas/{N-1}-{N}.json；manifest 保留最近 DELTA_HISTORY 个增量，客户端版本落在链上时
+   只需下载几个增量，否则 (或增量链断开时) 回退到全量分片
+matches_with_videos.json 仍作为兼容导出保留，不受影响。
+
+用法: python3 DataFactory/publish_feed.py [--input matches_with_videos.json] [--feed-dir feed]
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import os
+import sys
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import metrics
+from feed_delta import apply_delta, diff
+from io_utils import HASH_LENGTH, atomic_write_bytes, atomic_write_json, content_hash
+
+try:
+    import brotli
+except ImportError:  # 未安装 brotli 时只生成 gzip 版本
+    brotli = None
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
+logger = logging.getLogger(__name__)
+
+# ===== 配置区 =====
+FEED_DIR = os.getenv("REDLENS_FEED_DIR", "feed")
+MANIFEST_FILE = "manifest.json"
+SHARDS_DIR = "shards"
+DELTAS_DIR = "deltas"
+DELTA_HISTORY = int(os.getenv("REDLENS_FEED_DELTA_HISTORY", "30"))  # manifest 里保留的增量个数
+MANIFEST_VERSION = 1
+UNDATED_SHARD = "undated"   # 日期缺失或格式不对的比赛单独成片
+ENCODING_SUFFIX = {'gzip': '.gz', 'br': '.br'}
+
+
+def shard_key(match: Dict) -> str:
+    date = match.get('date') or ''
+    return date[:7] if len(date) >= 7 and date[4] == '-' else UNDATED_SHARD
+
+
+def encode_shard(matches: List[Dict]) -> bytes:
+    """紧凑 JSON (不缩进、中文不转义)，字段顺序保持融合结果的原样"""
+    return json.dumps(matches, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def compress(body: bytes) -> Dict[str, bytes]:
+    """{编码名: 压缩后字节}；gzip 固定 mtime=0，同样的内容总是得到同样的字节"""
+    encoded = {'gzip': gzip.compress(body, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        encoded['br'] = brotli.compress(body, quality=11)
+    return encoded
+
+
+def build_shards(merged: List[Dict]) -> Dict[str, List[Dict]]:
+    shards: Dict[str, List[Dict]] = {}
+    for match in merged:
+        shards.setdefault(shard_key(match), []).append(match)
+    return dict(sorted(shards.items()))
+
+
+def load_manifest(feed_dir: str) -> Optional[Dict]:
+    path = os.path.join(feed_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"⚠️ manifest 读取失败，重新生成: {e}")
+        return None
+
+
+def _referenced(manifest: Optional[Dict]) -> set:
+    paths = set()
+    for shard in (manifest or {}).get('shards', []):
+        paths.add(shard['path'])
+        paths.update(e['path'] for e in shard.get('encodings', {}).values())
+    return paths
+
+
+def load_dataset(feed_dir: str, manifest: Optional[Dict]) -> Optional[List[Dict]]:
+    """由 manifest 引用的分片还原完整列表；分片缺失或哈希不符时返回 None"""
+    if not manifest:
+        return None
+    matches: List[Dict] = []
+    for shard in manifest.get('shards', []):
+        try:
+            with open(os.path.join(feed_dir, shard['path']), 'rb') as f:
+                body = f.read()
+        except OSError:
+            return None
+        if hashlib.sha256(body).hexdigest() != shard.get('sha256'):
+            return None
+        matches += json.loads(body)
+    return matches
+
+
+def write_delta(feed_dir: str, previous: Optional[Dict], merged: List[Dict], revision: int,
+                feed_hash: str) -> List[Dict]:
+    """生成 revision-1 -> revision 的增量，返回新的增量列表 (最近 DELTA_HISTORY 个)；链断开时返回 []"""
+    before = load_dataset(feed_dir, previous)
+    if before is None:
+        if previous:
+            logger.warning("⚠️ 上一版分片无法还原，本次不生成增量，客户端回退到全量分片")
+        return []
+    delta = diff(before, merged)
+    if delta is None or apply_delta(before, delta) != merged:
+        logger.warning("⚠️ 增量无法准确表达本次变化 (比赛键重复?)，本次不生成增量")
+        return []
+    payload = {'from': revision - 1, 'to': revision, 'feed_hash': feed_hash, 'fallback': MANIFEST_FILE}
+    payload.update(delta)
+    body = encode_shard(payload)
+    path = f"{DELTAS_DIR}/{revision - 1}-{revision}.json"
+    os.makedirs(os.path.join(feed_dir, DELTAS_DIR), exist_ok=True)
+    atomic_write_bytes(os.path.join(feed_dir, path), body)
+    entry = {'from': revision - 1, 'to': revision, 'path': path, 'size': len(body),
+             'sha256': hashlib.sha256(body).hexdigest()}
+    logger.info(f"🩹 增量 r{revision - 1} -> r{revision}: 新增 {len(delta.get('add', []))} / "
+                f"修改 {len(delta.get('set', {}))} / 删除 {len(delta.get('remove', []))} 场，{len(body)} 字节")
+    return (previous.get('deltas', []) + [entry])[-DELTA_HISTORY:] if DELTA_HISTORY > 0 else []
+
+
+def _prune(directory: str, prefix: str, keep: set) -> int:
+    """删除目录里不在 keep 中的文件，返回删除个数"""
+    if not os.path.isdir(directory):
+        return 0
+    removed = 0
+    for name in os.listdir(directory):
+        if f"{prefix}/{name}" not in keep and not name.startswith('.'):
+            os.remove(os.path.join(directory, name))
+            removed += 1
+    return removed
+
+
+def publish(merged: List[Dict], feed_dir: str = FEED_DIR) -> Dict:
+    """写出分片与 manifest，返回 manifest"""
+    os.makedirs(os.path.join(feed_dir, SHARDS_DIR), exist_ok=True)
+    previous = load_manifest(feed_dir)
+    entries = []
+    written = 0
+    total_bytes = 0
+    shards = build_shards(merged)
+    for key, matches in shards.items():
+        body = encode_shard(matches)
+        sha256 = hashlib.sha256(body).hexdigest()
+        path = f"{SHARDS_DIR}/{key}.{sha256[:HASH_LENGTH]}.json"
+        entry = {'key': key, 'path': path, 'sha256': sha256, 'size': len(body), 'count': len(matches),
+                 'encodings': {}}
+        if not os.path.exists(os.path.join(feed_dir, path)):
+            atomic_write_bytes(os.path.join(feed_dir, path), body)
+            written += 1
+        for encoding, data in compress(body).items():
+            encoded_path = path + ENCODING_SUFFIX[encoding]
+            if not os.path.exists(os.path.join(feed_dir, encoded_path)):
+                atomic_write_bytes(os.path.join(feed_dir, encoded_path), data)
+            entry['encodings'][encoding] = {'path': encoded_path, 'size': len(data)}
+        total_bytes += len(body)
+        entries.append(entry)
+
+    feed_hash = content_hash([e['sha256'] for e in entries])
+    if previous and previous.get('shards') == entries:
+        manifest = previous
+        logger.info(f"⏭️ 分片未变化 ({len(entries)} 个)，manifest 保持不变")
+    else:
+        revision = (previous or {}).get('revision', 0) + 1
+        manifest = {
+            'version': MANIFEST_VERSION,
+            'revision': revision,
+            'feed_hash': feed_hash,
+            'generated_at': datetime.now().astimezone().isoformat(timespec='seconds'),
+            'count': len(merged),
+            'shards': entries,
+            # 客户端拿到的列表是各分片按 key 顺序拼接的结果，增量也以这个顺序为准
+            'deltas': write_delta(feed_dir, previous, [m for ms in shards.values() for m in ms], revision, feed_hash),
+        }
+        atomic_write_json(os.path.join(feed_dir, MANIFEST_FILE), manifest)
+        changed = len({e['sha256'] for e in entries} - {s.get('sha256') for s in (previous or {}).get('shards', [])})
+        logger.info(f"📦 分片发布: {len(entries)} 个分片 (变化 {changed} 个)，{total_bytes / 1024:.1f} KB -> {feed_dir}/")
+
+    # 清理两版 manifest 都不再引用的分片，以及滑出历史窗口的增量
+    removed = _prune(os.path.join(feed_dir, SHARDS_DIR), SHARDS_DIR, _referenced(manifest) | _referenced(previous))
+    _prune(os.path.join(feed_dir, DELTAS_DIR), DELTAS_DIR, {d['path'] for d in manifest.get('deltas', [])})
+    if removed:
+        logger.info(f"🧹 清理过期分片文件 {removed} 个")
+
+    metrics.record_records('feed', shards=len(entries), written=written, removed=removed, bytes=total_bytes,
+                           deltas=len(manifest.get('deltas', [])))
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RedLens 分片发布 (manifest + 按月分片)")
+    parser.add_argument('--input', default="matches_with_videos.json", help="融合结果文件")
+    parser.add_argument('--feed-dir', default=FEED_DIR, help="输出目录")
+    args = parser.parse_args()
+    try:
+        with open(args.input, 'r', encoding='utf-8') as f:
+            merged = json.load(f)
+        publish(merged, args.feed_dir)
+    except Exception as e:
+        logger.error(f"❌ 分片发布失败: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
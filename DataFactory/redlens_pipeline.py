@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+RedLens 数据工厂 - 单进程流水线 (redlens-pipeline)
+功能:
+1. 在同一个解释器里依次执行: 赛程抓取 -> 咪咕追更 -> 数据融合 -> Deep Links
+2. 阶段之间直接传递内存对象，不再反复读写 matches.json / migu_videos_complete.json / matches_with_videos.json
+3. 所有文件在最后统一落盘 (--dry-run 时不写结果文件，响应缓存只读、不保存窗口记录与断点日志；
+   状态库事务不提交，只有状态目录里还没有库时会从 JSON 建库)
+4. 记录每个阶段的耗时并在结束时汇总
+5. 赛程页未变化 (304/指纹一致) 时跳过解析；融合输入 (赛程 + 咪咕 + 队名映射) 与上次一致时
+   连融合和 Deep Links 一起跳过
+6. 各阶段共用同一个状态库连接 (match_store)，落盘时才提交事务并导出 JSON；--dry-run 不提交
+7. 结束时写出 Prometheus textfile 与 JSON 运行报告 (metrics)，含各阶段耗时与完赛场次的录像匹配率
+8. scheduled 模式按开球时间只抓到期的 (date, comp) 任务 (refresh_scheduler)；
+   --daemon 常驻运行，复用同一个抓取器的连接池，按调度的下一次到期时间休眠
+9. 落盘时把直播间 / 各语言录像 PID 的首次出现时间追加到日志 (publish_delays)，
+   调度器按学到的发布延迟决定何时密集查录像
+10. 落盘时另外发布按月分片的紧凑 feed (publish_feed: feed/manifest.json + 带内容哈希的分片)，
+    matches_with_videos.json 照常导出
+11. 落盘时写出首页摘要 home_summary.json (最近完赛 / 下一场 / 接下来三场，开球时间已换算为 UTC 与北京时间)
+
+用法: RUN_MODE=smart python3 DataFactory/redlens_pipeline.py [--mode force] [--engine sync] [--dry-run]
+      python3 DataFactory/redlens_pipeline.py --daemon [--tick 300] [--max-ticks N]
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+import fetch_fixtures
+import generate_deep_links
+import home_summary
+import merge_data
+import metrics
+import publish_feed
+from fetch_all_migu_videos import COMPETITION_MAP, FETCH_ENGINE, CompleteMiguFetcher
+from io_utils import atomic_write_json, content_hash, file_digest
+from match_store import record_key
+from publish_delays import FirstSeenLog
+from refresh_scheduler import RefreshScheduler
+from team_resolver import ALIASES_FILE
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
+logger = logging.getLogger("redlens_pipeline")
+
+STATE_FILE = os.path.join(fetch_fixtures.STATE_DIR, "pipeline_state.json")
+DAEMON_TICK = int(os.getenv("REDLENS_DAEMON_TICK", "300"))                        # 常驻模式最长休眠 (秒)
+DAEMON_MIN_SLEEP = 30                                                              # 两轮之间至少间隔 (秒)
+FIXTURES_REFRESH = int(os.getenv("REDLENS_FIXTURES_REFRESH", "3600"))             # 常驻模式赛程页检查间隔 (秒)
+
+
+class StageTimer:
+    """按阶段记录耗时与处理条目数"""
+
+    def __init__(self):
+        self.stages: List[Dict] = []
+
+    @contextmanager
+    def stage(self, name: str, title: str):
+        record = {'stage': name, 'items': 0, 'seconds': 0.0}
+        self.stages.append(record)
+        logger.info(f"▶️ {title}")
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record['seconds'] = round(time.perf_counter() - start, 3)
+            logger.info(f"⏱️ {name} 完成: {record['seconds']:.2f}s ({record['items']} 条)")
+
+    def log_summary(self):
+        total = sum(s['seconds'] for s in self.stages)
+        logger.info("📈 阶段耗时汇总:")
+        for s in self.stages:
+            share = s['seconds'] / total if total else 0.0
+            logger.info(f"   {s['stage']:<12} {s['seconds']:>8.2f}s  {share:>5.0%}  {s['items']:>6} 条")
+        logger.info(f"   {'total':<12} {total:>8.2f}s")
+
+
+def load_json(path: str) -> Optional[List[Dict]]:
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def load_state() -> Dict:
+    try:
+        return load_json(STATE_FILE) or {}
+    except ValueError:
+        return {}
+
+
+def merge_inputs_hash(fixtures: List[Dict], migu_all: List[Dict]) -> str:
+    """融合阶段的全部输入: 赛程、咪咕历史、队名映射与别名文件"""
+    config = [file_digest(path) if os.path.exists(path) else None
+              for path in (merge_data.MAPPING_FILE, ALIASES_FILE)]
+    return content_hash([fixtures, migu_all, config])
+
+
+def replay_match_rate(merged: List[Dict]) -> Optional[float]:
+    """已完赛场次中拿到录像 PID 的比例"""
+    finished = [m for m in merged if m.get('status') == 'C']
+    if not finished:
+        return None
+    return round(sum(1 for m in finished if m.get('migu_pid')) / len(finished), 4)
+
+
+def run_pipeline(mode: str, engine: Optional[str] = None, persist: bool = True,
+                 fetcher: Optional[CompleteMiguFetcher] = None, scheduler: Optional[RefreshScheduler] = None,
+                 refresh_fixtures: bool = True) -> List[Dict]:
+    """
+    fetcher / scheduler: 常驻模式跨轮次复用的抓取器与调度器 (为空时新建)
+    refresh_fixtures=False: 不请求赛程页，直接使用状态库里的赛程
+    """
+    timer = StageTimer()
+    state = load_state()
+
+    # Step 1: 赛程。抓取失败时沿用上一次的 matches.json (与逐个脚本运行时的行为一致)
+    with timer.stage('fixtures', "Step 1/4: 获取官方赛程...") as rec:
+        fixtures, fixtures_changed, page_state = [], False, None
+        if refresh_fixtures:
+            fixtures, fixtures_changed, page_state = fetch_fixtures.fetch_fixtures_incremental()
+        if not fixtures:
+            fixtures = fetch_fixtures.load_fixtures_file() or []
+            if refresh_fixtures:
+                logger.warning(f"⚠️ 赛程抓取失败，沿用本地 {fetch_fixtures.OUTPUT_FILE} ({len(fixtures)} 场)")
+        rec['items'] = len(fixtures)
+
+    # Step 2: 咪咕追更。抓取异常不中断流水线，后续阶段使用历史数据
+    with timer.stage('migu', f"Step 2/4: 追更咪咕视频 (模式: {mode})...") as rec:
+        fetcher = fetcher or CompleteMiguFetcher(persist=persist)
+        tasks = None
+        first_seen = FirstSeenLog()
+        if mode == 'scheduled':
+            scheduler = scheduler or RefreshScheduler()
+            scheduler.publish_delays = first_seen.scheduler_delays()
+            scheduler.fetched_at = state.get('persisted_at')
+            known = {record_key(m): m for m in merge_data.load_previous() or []}
+            tasks = scheduler.due_tasks(fixtures, known, COMPETITION_MAP)
+        try:
+            new_migu = fetcher.fetch_all_season(mode=mode, engine=engine, fixtures=fixtures, tasks=tasks)
+        except Exception as e:
+            logger.error(f"❌ 咪咕抓取失败: {e}")
+            new_migu = []
+        migu_all = fetcher.merge_with_history(new_migu)
+        rec['items'] = len(new_migu)
+
+    # 融合输入与上次完全一致且结果文件还在: 融合与 Deep Links 都不需要重算
+    inputs_hash = merge_inputs_hash(fixtures, migu_all)
+    previous = merge_data.load_previous() if state.get('merge_inputs') == inputs_hash else None
+    if previous:
+        logger.info(f"⏭️ 融合输入未变化 (赛程{'未变' if not fixtures_changed else '已变'}, 咪咕新增 {len(new_migu)} 条)，"
+                    f"跳过融合与 Deep Links，沿用 {merge_data.OUTPUT_FILE}")
+        merged = previous
+    else:
+        # Step 3: 数据融合
+        with timer.stage('merge', "Step 3/4: 数据融合...") as rec:
+            merged = merge_data.merge_data(fixtures, migu_all)
+            rec['items'] = len(merged)
+
+        # Step 4: Deep Links (原地写入 scheme 字段)
+        with timer.stage('deep_links', "Step 4/4: 生成 Deep Links...") as rec:
+            if generate_deep_links.process_links(merged) is None:
+                raise RuntimeError("Deep Link 生成失败")
+            rec['items'] = len(merged)
+
+    if persist:
+        with timer.stage('persist', "💾 写出结果文件...") as rec:
+            if page_state is not None:
+                fetch_fixtures.save_fixtures(fixtures if fixtures_changed else None, page_state)
+            fetcher.save_to_json(new_migu, final_list=migu_all)
+            if not previous:
+                merge_data.save_merged_data(merged)
+            publish_feed.publish(merged)
+            home_summary.write_summary(merged)
+            os.makedirs(os.path.dirname(STATE_FILE) or '.', exist_ok=True)
+            atomic_write_json(STATE_FILE, dict(state, merge_inputs=inputs_hash, persisted_at=round(time.time(), 3)))
+            first_seen.observe(merged, COMPETITION_MAP)
+            # 不限 scheduled 模式: smart / force 抓过的比赛也记下轮询时间，之后切到调度模式不会一起到期
+            scheduler = scheduler or RefreshScheduler()
+            scheduler.observe(tasks if tasks is not None else fetcher.tasks, fixtures, merged, COMPETITION_MAP)
+            scheduler.save()
+            rec['items'] = len(merged)
+    else:
+        logger.info("🧪 --dry-run: 不写出任何文件")
+
+    timer.log_summary()
+    first_seen.log_stats()
+    match_rate = replay_match_rate(merged)
+    if match_rate is not None:
+        metrics.set_gauge('redlens_match_rate', match_rate)
+        logger.info(f"🎯 完赛录像匹配率: {match_rate:.1%}")
+    if persist:
+        metrics.write_run_report(timer.stages, mode=mode, engine=engine or FETCH_ENGINE,
+                                 merge_skipped=bool(previous), fixtures_changed=fixtures_changed)
+    return merged
+
+
+def run_daemon(engine: Optional[str] = None, tick: int = DAEMON_TICK, max_ticks: int = 0):
+    """
+    常驻模式: 每轮只抓调度器给出的到期任务，然后睡到下一次到期 (最长 tick 秒)。
+    抓取器 (含连接池) 与调度器跨轮次复用；赛程页每 FIXTURES_REFRESH 秒检查一次 (条件请求)。
+    """
+    fetcher = CompleteMiguFetcher(keep_alive=True)
+    scheduler = RefreshScheduler()
+    last_fixtures = 0.0
+    ticks = 0
+    logger.info(f"🛰️ 常驻模式启动 | 最长休眠 {tick}s | 赛程检查间隔 {FIXTURES_REFRESH}s")
+    try:
+        while True:
+            started = time.time()
+            refresh = started - last_fixtures >= FIXTURES_REFRESH
+            try:
+                run_pipeline('scheduled', engine=engine, fetcher=fetcher, scheduler=scheduler,
+                             refresh_fixtures=refresh)
+                if refresh:
+                    last_fixtures = started
+            except Exception as e:
+                logger.error(f"❌ 本轮失败，下一轮重试: {e}")
+            ticks += 1
+            if max_ticks and ticks >= max_ticks:
+                break
+            wake = scheduler.next_wake or time.time() + tick
+            sleep = min(tick, max(DAEMON_MIN_SLEEP, wake - time.time()))
+            logger.info(f"💤 休眠 {sleep:.0f}s")
+            time.sleep(sleep)
+    except KeyboardInterrupt:
+        logger.info("🛑 收到中断，退出常驻模式")
+    finally:
+        fetcher.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RedLens 数据工厂单进程流水线")
+    parser.add_argument('--mode', default=os.getenv("RUN_MODE", "force"), choices=['smart', 'force', 'scheduled'],
+                        help="咪咕抓取模式 (默认读取 RUN_MODE)；scheduled 只抓按开球时间到期的比赛")
+    parser.add_argument('--engine', default=None, choices=['async', 'sync'], help="咪咕抓取引擎 (默认读取 FETCH_ENGINE)")
+    parser.add_argument('--dry-run', action='store_true', help="只在内存中跑完流水线，不写文件")
+    parser.add_argument('--daemon', action='store_true', help="常驻运行 (scheduled 模式，复用连接池)")
+    parser.add_argument('--tick', type=int, default=DAEMON_TICK, help="常驻模式两轮之间的最长休眠 (秒)")
+    parser.add_argument('--max-ticks', type=int, default=0, help="常驻模式跑满 N 轮后退出 (0 = 不退出)")
+    args = parser.parse_args()
+
+    if args.daemon:
+        run_daemon(engine=args.engine, tick=args.tick, max_ticks=args.max_ticks)
+        return
+
+    try:
+        run_pipeline(args.mode, engine=args.engine, persist=not args.dry_run)
+    except Exception as e:
+        logger.error(f"❌ 流水线失败: {e}")
+        sys.exit(1)
+    logger.info("✅ 完成!")
+
+
+if __name__ == "__main__":
+    main()
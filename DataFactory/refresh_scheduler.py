@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+RedLens 数据工厂 - 按开球时间的追更调度
+功能:
+1. 由赛程的日期 + 开球时间 (伦敦时间) 推算每场比赛下一次值得轮询的时间:
+   - 开球前 LIVE_LEAD 以内还没有直播间 -> 高频轮询 (LIVE_INTERVAL)
+   - 完赛后先查一次，然后在 "完赛 + 典型发布延迟" 附近高频轮询录像 PID (REPLAY_INTERVAL)，
+     迟迟等不到就逐步拉长间隔
+   - 已有 PID: 每次轮询结果不变就把间隔翻倍，最长 STABLE_MAX_INTERVAL；
+     完场超过 RETIRE_AFTER 且 PID 稳定 (或只有历史记录、从未轮询过) 的比赛不再轮询
+   - 离开球还远的比赛按 IDLE_INTERVAL 低频巡检
+2. 每一轮只给出到期比赛对应的 (date, comp) 任务，交给咪咕抓取器 (仍会按日期窗口合并请求)
+3. 每场比赛的上次轮询时间、PID 及连续稳定次数保存在 .cache/refresh_schedule.json；
+   每次落盘都会记录 (不限 scheduled 模式)，还没有记录的比赛以上次落盘时间 (fetched_at) 作为上次轮询时间
+"""
+
+import json
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+from http_cache import STATE_DIR
+from io_utils import atomic_write_json
+from kickoff_time import FIXTURE_TIMEZONE, fixture_kickoff_utc, local_to_utc
+from match_store import record_key
+
+logger = logging.getLogger(__name__)
+
+# ===== 配置区 (时长单位: 分钟) =====
+SCHEDULE_FILE = os.path.join(STATE_DIR, "refresh_schedule.json")
+DEFAULT_KICKOFF = "15:00"                                  # 赛程上没有具体时间 (TBC) 时的假设
+MATCH_DURATION = int(os.getenv("SCHEDULE_MATCH_MINUTES", "115"))          # 开球到完场 (含中场、补时)
+PUBLISH_DELAY = int(os.getenv("SCHEDULE_PUBLISH_DELAY_MINUTES", "120"))   # 完场到录像上架的典型延迟
+LIVE_LEAD = int(os.getenv("SCHEDULE_LIVE_LEAD_MINUTES", "2880"))          # 开球前多久开始盯直播间
+LIVE_INTERVAL = int(os.getenv("SCHEDULE_LIVE_INTERVAL_MINUTES", "10"))
+REPLAY_INTERVAL = int(os.getenv("SCHEDULE_REPLAY_INTERVAL_MINUTES", "10"))
+REPLAY_HOT_WINDOW = int(os.getenv("SCHEDULE_REPLAY_HOT_MINUTES", "360"))  # 预计上架后高频轮询多久
+IDLE_INTERVAL = int(os.getenv("SCHEDULE_IDLE_INTERVAL_MINUTES", "720"))
+STABLE_MAX_INTERVAL = int(os.getenv("SCHEDULE_STABLE_MAX_MINUTES", "10080"))  # PID 稳定后最长 7 天查一次
+RETIRE_AFTER = int(os.getenv("SCHEDULE_RETIRE_MINUTES", "43200"))          # 完场 30 天后 PID 稳定就不再轮询
+
+Task = Tuple[str, str]  # (YYYYMMDD, comp_id)
+
+
+def kickoff_epoch(match: Dict) -> Optional[float]:
+    """赛程记录的开球时间 (Unix 秒)；kickoff_utc 为 null (时间待定) 时按比赛日的 DEFAULT_KICKOFF 估计"""
+    kickoff = fixture_kickoff_utc(match)
+    if kickoff is None:
+        kickoff = local_to_utc(match.get('date'), DEFAULT_KICKOFF, FIXTURE_TIMEZONE)
+    return float(kickoff) if kickoff is not None else None
+
+
+class RefreshScheduler:
+    """
+    due_tasks() 给出本轮要抓的任务，observe() 在融合之后记录轮询结果。
+    publish_delay 可按赛事 ID 覆盖 (分钟)，未指定的赛事使用 PUBLISH_DELAY。
+    """
+
+    def __init__(self, path: str = SCHEDULE_FILE, publish_delays: Optional[Dict[str, float]] = None,
+                 fetched_at: Optional[float] = None):
+        self.path = path
+        self.publish_delays = publish_delays or {}
+        self.fetched_at = fetched_at  # 上次落盘时间 (Unix 秒)，没有轮询记录的比赛以它作为上次轮询时间
+        self.entries: Dict[str, Dict] = self._load()
+        self.next_wake: Optional[float] = None
+
+    def _load(self) -> Dict[str, Dict]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ 调度记录读取失败 {self.path}: {e}")
+            return {}
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        atomic_write_json(self.path, self.entries)
+
+    def publish_delay(self, comp_id: str) -> float:
+        return self.publish_delays.get(comp_id, PUBLISH_DELAY)
+
+    def next_poll(self, match: Dict, merged: Optional[Dict], comp_id: str, now: float) -> Optional[float]:
+        """这场比赛下一次值得轮询的时间 (Unix 秒)；开球时间未知或已不再轮询时返回 None"""
+        kickoff = kickoff_epoch(match)
+        if kickoff is None:
+            return None
+        entry = self.entries.get(record_key(match), {})
+        last = entry.get('last_polled', self.fetched_at or 0.0)
+        merged = merged or {}
+        full_time = kickoff + MATCH_DURATION * 60
+
+        if merged.get('migu_pid'):
+            if now - full_time >= RETIRE_AFTER * 60 and (entry.get('stable', 0) > 0 or 'last_polled' not in entry):
+                return None  # 完场已久且 PID 稳定 (smart / force 模式与 audit_pids 仍会覆盖)
+            # 已有录像: 结果不变就逐次拉长间隔
+            backoff = REPLAY_INTERVAL * (2 ** min(entry.get('stable', 0), 20))
+            return last + min(backoff, STABLE_MAX_INTERVAL) * 60
+
+        if now < full_time:
+            if merged.get('migu_live_url'):
+                return max(last, full_time)  # 直播间已就绪，下一个有用的时间点是完场
+            if now < kickoff - LIVE_LEAD * 60:
+                return min(last + IDLE_INTERVAL * 60, kickoff - LIVE_LEAD * 60)
+            return last + LIVE_INTERVAL * 60
+
+        # 完场但还没有录像: 完场后先查一次，之后在预计上架时间附近高频轮询
+        expected = full_time + self.publish_delay(comp_id) * 60
+        if last < full_time:
+            return full_time
+        if now < expected - REPLAY_INTERVAL * 60:
+            return max(last + REPLAY_INTERVAL * 60, expected - REPLAY_INTERVAL * 60)
+        overdue_windows = int(max(0.0, now - expected) // (REPLAY_HOT_WINDOW * 60))
+        interval = min(IDLE_INTERVAL, REPLAY_INTERVAL * (2 ** min(overdue_windows, 20)))
+        return last + interval * 60
+
+    def due_tasks(self, fixtures: List[Dict], merged: Dict[str, Dict], comp_ids: Dict[str, str],
+                  now: Optional[float] = None) -> Set[Task]:
+        """
+        fixtures: 赛程；merged: 上次融合结果 (按 record_key 索引)；comp_ids: 赛事名 -> 咪咕赛事 ID。
+        返回到期的 (date, comp) 任务，并把最早的下一次到期时间记在 next_wake。
+        """
+        now = time.time() if now is None else now
+        tasks: Set[Task] = set()
+        upcoming: List[float] = []
+        for match in fixtures:
+            comp_id = comp_ids.get(match.get('competition', 'Premier League'), "5")
+            due = self.next_poll(match, merged.get(record_key(match)), comp_id, now)
+            if due is None:
+                continue
+            if due <= now:
+                tasks.add((match['date'].replace('-', ''), comp_id))
+            else:
+                upcoming.append(due)
+        self.next_wake = min(upcoming) if upcoming else None
+        wake = datetime.fromtimestamp(self.next_wake).strftime('%m-%d %H:%M') if self.next_wake else '-'
+        logger.info(f"⏰ 调度: 本轮到期 {len(tasks)} 个 (日期, 赛事)，下一次到期 {wake}")
+        return tasks
+
+    def observe(self, tasks: Set[Task], fixtures: List[Dict], merged: List[Dict], comp_ids: Dict[str, str],
+                now: Optional[float] = None):
+        """记录本轮被轮询到的比赛: 更新上次轮询时间，PID 不变则稳定次数 +1，变化则清零"""
+        now = time.time() if now is None else now
+        by_key = {record_key(m): m for m in merged}
+        for match in fixtures:
+            comp_id = comp_ids.get(match.get('competition', 'Premier League'), "5")
+            if (match.get('date', '').replace('-', ''), comp_id) not in tasks:
+                continue
+            key = record_key(match)
+            pid = by_key.get(key, {}).get('migu_pid')
+            entry = self.entries.setdefault(key, {})
+            entry['stable'] = entry.get('stable', 0) + 1 if pid and pid == entry.get('pid') else 0
+            entry['pid'] = pid
+            entry['last_polled'] = round(now, 3)
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+RedLens 数据工厂 - 全场回放排序器
+功能:
+1. 每个视频只解析一次，得到紧凑记录 (时长秒数 / 语言 / 解说人数 / 是否集锦 / type)
+   语言检测只对全场回放候选 (带"回放"、非集锦、>60 分钟) 执行，其余视频不参与语言排序
+2. 正则全部模块级预编译，语言检测按视频名记忆化 (多俱乐部批量跑时同名视频大量重复)
+3. 单次遍历完成五级优先级的打分，结果与原 fetch_full_match_replay 的五轮扫描一致:
+   【1】带"回放"且 >60 分钟，按 (语言优先级, 时长) 排序，同时收集中文/粤语 PID
+   【2】同上集合中最长的一个
+   【3】非集锦且 >90 分钟中最长的
+   【4】type=4 中最长的 (不能是集锦)
+   【5】兜底: 非集锦中最长且 >30 分钟
+"""
+
+import re
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional
+
+# ===== 预编译规则 =====
+COMMENTATOR_PATTERN = re.compile(r'[（(]([^)）]+)[)）]')       # 括号中的解说员名单
+CANTONESE_PATTERN = re.compile(r'粤|陈凯冬|何辉|黄镇|罗毅')      # 粤语标记 / 粤语解说员
+ENGLISH_PATTERN = re.compile(r'English|英文')
+MANDARIN_PATTERN = re.compile(r'中文|国语')
+
+REPLAY_MIN_SECONDS = 3600       # 【1】【2】回放标记视频的最短时长
+FULL_MATCH_MIN_SECONDS = 5400   # 【3】完整比赛的最短时长
+FALLBACK_MIN_SECONDS = 1800     # 【5】兜底的最短时长
+RANK_SLOTS = ('mandarin', 'cantonese')
+NOT_RANKED = (None, 0, 0)       # 非候选视频不做语言检测
+
+
+class ReplayRecord(NamedTuple):
+    """单个回放视频的解析结果 (rank_key = (语言优先级, 时长, -原始位置)，越大越优先)"""
+    index: int
+    pid: str
+    name: str
+    seconds: int
+    language: Optional[str]
+    commentators: int
+    priority: int
+    highlight: bool
+    is_replay: bool
+    video_type: str
+    rank_key: tuple
+
+
+def duration_to_seconds(duration_str: str) -> int:
+    try:
+        parts = duration_str.split(':')
+        if len(parts) == 2: return int(parts[0]) * 60 + int(parts[1])
+        elif len(parts) == 3: return int(parts[0]) * 3600 + int(parts[1]) * 60 + int(parts[2])
+        return 0
+    except: return 0
+
+
+def is_definitely_highlight(video_name: str) -> bool:
+    """判断是否一定是集锦"""
+    return '集锦' in video_name or '精彩' in video_name
+
+
+@lru_cache(maxsize=4096)
+def detect_language_commentators(video_name: str):
+    """
+    检测视频的语言和解说人数
+    返回: (language, num_commentators, priority)
+    language: 'mandarin', 'cantonese', 'english', 'unknown'
+    num_commentators: 实际的解说人数 (从括号中的名字推断)
+    priority: 用于排序的优先级 (越高越优先)
+    """
+    match = COMMENTATOR_PATTERN.search(video_name)
+    num_commentators = 0
+    if match:
+        names = match.group(1)
+        # 统计人数：逗号、顿号、and、&作为分隔符
+        num_commentators = names.count('、') + names.count(',') + names.count('and') + names.count('&') + 1
+
+    if CANTONESE_PATTERN.search(video_name):
+        return 'cantonese', max(num_commentators, 2), 1  # 粤语优先级最低
+    if ENGLISH_PATTERN.search(video_name):
+        return 'english', max(num_commentators, 1), 2
+
+    if num_commentators >= 3:
+        return 'mandarin', num_commentators, 10 + num_commentators  # 3人版本最优（优先级最高）
+    elif num_commentators == 1:
+        return 'mandarin', 1, 3
+    elif num_commentators == 2:
+        return 'mandarin', 2, 5
+
+    if MANDARIN_PATTERN.search(video_name):
+        return 'mandarin', max(num_commentators, 2), 4
+
+    return 'unknown', num_commentators if num_commentators > 0 else 2, 0
+
+
+def parse_replay(video: Dict, index: int = 0, rank_all: bool = False) -> ReplayRecord:
+    """
+    解析单个视频。rank_all=False 时只对全场回放候选做语言检测，
+    其余视频的 language 为 None (它们不会进入语言排序)。
+    """
+    name = video.get('name', '')
+    seconds = duration_to_seconds(video.get('duration', '00:00'))
+    highlight = '集锦' in name or '精彩' in name
+    is_replay = '回放' in name
+    if rank_all or (is_replay and not highlight and seconds > REPLAY_MIN_SECONDS):
+        language, commentators, priority = detect_language_commentators(name)
+    else:
+        language, commentators, priority = NOT_RANKED
+    return ReplayRecord(index, video.get('pID', ''), name, seconds, language, commentators, priority,
+                        highlight, is_replay, video.get('type', ''), (priority, seconds, -index))
+
+
+def rank_replays(replay_list: List[Dict]) -> Optional[Dict]:
+    """
+    单次遍历选出全场回放 PID
+    返回: {'mandarin', 'cantonese', 'other', 'primary'} 或 None (没有合适视频)
+    """
+    if not replay_list: return None
+
+    head = None                                   # 【1】排序第一的视频
+    top: List[ReplayRecord] = []                  # 【1】有 PID 的前三名 (用于 other)
+    best_lang: Dict[str, Optional[ReplayRecord]] = dict.fromkeys(RANK_SLOTS)
+    longest_replay = longest_full = longest_type4 = longest_any = None
+
+    for index, video in enumerate(replay_list):
+        r = parse_replay(video, index)
+        # 严格大于: 时长相同时保留先出现的，与 max() 的行为一致
+        if r.video_type == '4' and (longest_type4 is None or r.seconds > longest_type4.seconds):
+            longest_type4 = r
+        if r.highlight:
+            continue
+        if longest_any is None or r.seconds > longest_any.seconds:
+            longest_any = r
+        if r.seconds > FULL_MATCH_MIN_SECONDS and (longest_full is None or r.seconds > longest_full.seconds):
+            longest_full = r
+        if not (r.is_replay and r.seconds > REPLAY_MIN_SECONDS):
+            continue
+
+        if longest_replay is None or r.seconds > longest_replay.seconds:
+            longest_replay = r
+        key = r.rank_key
+        if head is None or key > head.rank_key:
+            head = r
+        if r.pid:
+            if r.language in best_lang:
+                current = best_lang[r.language]
+                if current is None or key > current.rank_key:
+                    best_lang[r.language] = r
+            if len(top) < 3 or key > top[-1].rank_key:
+                top.append(r)
+                top.sort(key=lambda x: x.rank_key, reverse=True)
+                del top[3:]
+
+    replay_pids = {'mandarin': None, 'cantonese': None, 'other': None}
+
+    # 【优先级1】按语言优先级排序后的第一名 + 各语言最优版本
+    if head is not None:
+        chosen = set()
+        for lang, r in best_lang.items():
+            if r is not None:
+                replay_pids[lang] = r.pid
+                chosen.add(r.index)
+        for r in top:
+            if r.index not in chosen:
+                replay_pids['other'] = r.pid
+                break
+        if head.pid:
+            replay_pids['primary'] = head.pid
+            return replay_pids
+
+    # 【优先级2】任何非集锦的回放视频中最长的（不限语言）
+    if longest_replay is not None and longest_replay.pid:
+        replay_pids['primary'] = longest_replay.pid
+        if longest_replay.language in RANK_SLOTS:
+            replay_pids[longest_replay.language] = longest_replay.pid
+        return replay_pids
+
+    # 【优先级3】时长最长且可能是完整比赛的（>90分钟）
+    if longest_full is not None and longest_full.pid:
+        replay_pids['primary'] = longest_full.pid
+        return replay_pids
+
+    # 【优先级4】type=4 的视频中最长的（可能是官方版本）
+    if longest_type4 is not None and not longest_type4.highlight and longest_type4.pid:
+        replay_pids['primary'] = longest_type4.pid
+        return replay_pids
+
+    # 【优先级5】兜底: 最长的非集锦视频（至少30分钟）
+    if longest_any is not None and longest_any.pid and longest_any.seconds > FALLBACK_MIN_SECONDS:
+        replay_pids['primary'] = longest_any.pid
+        return replay_pids
+
+    return None if not any(replay_pids.values()) else replay_pids
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+RedLens 数据工厂 - 咪咕请求的统一容错层 (同步 requests / 异步 aiohttp 共用)
+功能:
+1. 按域名的令牌桶限速 (预约式: 令牌不足时算出需要等待的时长，并发请求按到达顺序排队)
+2. 只对真正的失败重试 (429 / 5xx / 网络错误 / 超时)，次数有上限，退避带随机抖动 (full jitter)，
+   429 的 Retry-After 会被采纳但同样受上限约束
+3. 按域名熔断: 连续失败达到阈值后直接失败，冷却后放行一个探测请求，成功即恢复；
+   任何方式结束的尝试 (含非重试类异常、协程被取消) 都会回报熔断器，探测请求超过 BREAKER_PROBE_TIMEOUT 未回报视为丢失，重新放行探测
+4. 每次重试、限速等待、熔断状态变化都计数，运行结束输出汇总；每次尝试的状态码、耗时、字节数记入 metrics
+"""
+
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, Optional
+from urllib.parse import urlsplit
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# ===== 配置区 =====
+RATE_PER_SECOND = float(os.getenv("MIGU_RATE_PER_SECOND", "8"))      # 每个域名每秒请求数
+RATE_BURST = int(os.getenv("MIGU_RATE_BURST", "8"))                  # 令牌桶容量 (允许的突发请求数)
+MAX_RETRIES = int(os.getenv("MIGU_MAX_RETRIES", "3"))                # 单个请求的最大重试次数
+BACKOFF_BASE = float(os.getenv("MIGU_BACKOFF_BASE", "0.5"))          # 退避基数 (秒)，第 n 次重试上限 base * 2^n
+BACKOFF_CAP = float(os.getenv("MIGU_BACKOFF_CAP", "8"))              # 单次退避 / Retry-After 的上限 (秒)
+BREAKER_THRESHOLD = int(os.getenv("MIGU_BREAKER_THRESHOLD", "5"))    # 连续失败 N 次后熔断
+BREAKER_COOLDOWN = float(os.getenv("MIGU_BREAKER_COOLDOWN", "30"))   # 熔断后多久放行探测请求 (秒)
+BREAKER_PROBE_TIMEOUT = float(os.getenv("MIGU_BREAKER_PROBE_TIMEOUT", "60"))  # 探测请求多久未回报视为丢失 (秒)
+RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+
+class CircuitOpenError(RuntimeError):
+    """熔断期间的请求直接失败，不访问网络"""
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """取一个令牌，返回调用方需要等待的秒数 (0 表示立即发送)"""
+        if self.rate <= 0:
+            return 0.0
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+
+class CircuitBreaker:
+    """
+    closed -> (连续失败达到阈值) -> open -> (冷却结束) -> half_open -> 探测成功 closed / 失败 open；
+    探测请求 probe_timeout 秒内没有回报 (调用方丢失了结果) 时重新放行一个探测，避免一直停在 half_open
+    """
+
+    def __init__(self, host: str, threshold: int, cooldown: float, counters: Counter,
+                 probe_timeout: float = BREAKER_PROBE_TIMEOUT):
+        self.host = host
+        self.threshold = max(1, threshold)
+        self.cooldown = cooldown
+        self.probe_timeout = probe_timeout
+        self.counters = counters
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_started = 0.0
+        self.lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self.lock:
+            if self.state == 'closed':
+                return True
+            now = time.monotonic()
+            if self.state == 'open' and now - self.opened_at >= self.cooldown:
+                self.state = 'half_open'
+                self.probe_started = now
+                self.counters['breaker_half_open'] += 1
+                logger.info(f"🔌 熔断冷却结束，放行探测请求: {self.host}")
+                return True
+            if self.state == 'half_open' and now - self.probe_started >= self.probe_timeout:
+                self.probe_started = now
+                self.counters['breaker_probe_lost'] += 1
+                logger.warning(f"🔌 探测请求 {self.probe_timeout:g}s 未回报，重新放行探测: {self.host}")
+                return True
+            return False  # open 冷却中，或 half_open 已有探测请求在途
+
+    def record_success(self):
+        with self.lock:
+            if self.state != 'closed':
+                self.counters['breaker_closed'] += 1
+                logger.info(f"✅ 熔断恢复: {self.host}")
+            self.state = 'closed'
+            self.failures = 0
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.state == 'half_open' or (self.state == 'closed' and self.failures >= self.threshold):
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+                self.counters['breaker_opened'] += 1
+                logger.warning(f"🔌 熔断: {self.host} 连续失败 {self.failures} 次，{self.cooldown:g}s 内直接失败")
+
+
+class Resilience:
+    """
+    call(url, send) / call_async(url, send): send() 发出一次请求并返回响应对象，
+    status_of(响应) 取状态码 (默认 .status_code)。重试用尽时返回最后一次响应或抛出最后一次异常。
+    """
+
+    def __init__(self, rate: float = RATE_PER_SECOND, burst: int = RATE_BURST, max_retries: int = MAX_RETRIES,
+                 backoff_base: float = BACKOFF_BASE, backoff_cap: float = BACKOFF_CAP,
+                 breaker_threshold: int = BREAKER_THRESHOLD, breaker_cooldown: float = BREAKER_COOLDOWN,
+                 seed: Optional[int] = None):
+        self.rate = rate
+        self.burst = burst
+        self.max_retries = max(0, max_retries)
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+        self.rng = random.Random(seed)
+        self.counters: Counter = Counter()
+        self._exported: Counter = Counter()
+        self.buckets: Dict[str, TokenBucket] = {}
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.lock = threading.Lock()
+
+    # ---------- 组件 ----------
+
+    def _host(self, url: str) -> str:
+        return urlsplit(url).netloc
+
+    def _bucket(self, host: str) -> TokenBucket:
+        with self.lock:
+            if host not in self.buckets:
+                self.buckets[host] = TokenBucket(self.rate, self.burst)
+            return self.buckets[host]
+
+    def breaker(self, host: str) -> CircuitBreaker:
+        with self.lock:
+            if host not in self.breakers:
+                self.breakers[host] = CircuitBreaker(host, self.breaker_threshold, self.breaker_cooldown, self.counters)
+            return self.breakers[host]
+
+    def backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """第 attempt 次重试前的等待: [0, base * 2^attempt] 内均匀抖动；Retry-After 优先，二者都不超过上限"""
+        if retry_after:
+            try:
+                return min(self.backoff_cap, max(0.0, float(retry_after)))
+            except ValueError:
+                pass  # HTTP 日期格式的 Retry-After 按普通退避处理
+        return self.rng.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** attempt)))
+
+    # ---------- 单次尝试的前后处理 (同步/异步共用) ----------
+
+    def _before(self, host: str) -> float:
+        if not self.breaker(host).allow():
+            self.counters['breaker_rejected'] += 1
+            raise CircuitOpenError(f"{host} 熔断中")
+        wait = self._bucket(host).reserve()
+        if wait > 0:
+            self.counters['throttled'] += 1
+            self.counters['throttled_ms'] += int(wait * 1000)
+        self.counters['requests'] += 1
+        return wait
+
+    def _after(self, url: str, host: str, response: Any, error: Optional[BaseException], seconds: float,
+               status_of: Callable[[Any], int], size_of: Callable[[Any], int]) -> bool:
+        """记录结果 (含请求指标)，返回是否属于可重试的失败"""
+        status = None if error is not None else status_of(response)
+        metrics.record_request(url, type(error).__name__ if error is not None else status, seconds,
+                               0 if error is not None else size_of(response))
+        if error is None and status not in RETRY_STATUS_CODES:
+            self.breaker(host).record_success()  # 404 等业务状态说明服务本身可用
+            return False
+        self.breaker(host).record_failure()
+        self.counters['failures'] += 1
+        if error is not None:
+            self.counters[f"error_{type(error).__name__}"] += 1
+        else:
+            self.counters[f"status_{status}"] += 1
+        return True
+
+    def _abort(self, host: str):
+        """尝试被非重试类异常或取消打断: 按失败回报熔断器后由调用方继续抛出"""
+        self.breaker(host).record_failure()
+        self.counters['aborted'] += 1
+
+    def _next_delay(self, attempt: int, response: Any, headers_of: Callable[[Any], Any]) -> Optional[float]:
+        if attempt >= self.max_retries:
+            self.counters['gave_up'] += 1
+            return None
+        self.counters['retries'] += 1
+        headers = headers_of(response) if response is not None else None
+        return self.backoff(attempt, headers.get('Retry-After') if headers is not None else None)
+
+    # ---------- 对外接口 ----------
+
+    def call(self, url: str, send: Callable[[], Any],
+             status_of: Callable[[Any], int] = lambda r: r.status_code,
+             headers_of: Callable[[Any], Any] = lambda r: r.headers,
+             size_of: Callable[[Any], int] = lambda r: 0,
+             retry_on: tuple = (Exception,)) -> Any:
+        host = self._host(url)
+        for attempt in range(self.max_retries + 1):
+            wait = self._before(host)
+            if wait > 0:
+                time.sleep(wait)
+            response, error = None, None
+            start = time.perf_counter()
+            try:
+                response = send()
+            except retry_on as e:
+                error = e
+            except BaseException:
+                self._abort(host)
+                raise
+            if not self._after(url, host, response, error, time.perf_counter() - start, status_of, size_of):
+                return response
+            delay = self._next_delay(attempt, response, headers_of)
+            if delay is None:
+                break
+            time.sleep(delay)
+        if error is not None:
+            raise error
+        return response
+
+    async def call_async(self, url: str, send: Callable[[], Awaitable[Any]],
+                         status_of: Callable[[Any], int] = lambda r: r.status,
+                         headers_of: Callable[[Any], Any] = lambda r: r.headers,
+                         size_of: Callable[[Any], int] = lambda r: 0,
+                         retry_on: tuple = (Exception,)) -> Any:
+        host = self._host(url)
+        for attempt in range(self.max_retries + 1):
+            wait = self._before(host)
+            response, error = None, None
+            start = time.perf_counter()
+            try:
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                    start = time.perf_counter()
+                response = await send()
+            except retry_on as e:
+                error = e
+            except BaseException:  # 非重试类异常 / 任务被取消: 也要回报熔断器，否则探测请求一去不回
+                self._abort(host)
+                raise
+            if not self._after(url, host, response, error, time.perf_counter() - start, status_of, size_of):
+                return response
+            delay = self._next_delay(attempt, response, headers_of)
+            if delay is None:
+                break
+            await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        return response
+
+    def stats(self) -> Dict[str, int]:
+        return dict(self.counters)
+
+    def export_metrics(self):
+        """把自上次导出以来新增的事件计入 redlens_resilience_events_total"""
+        for event, value in self.counters.items():
+            delta = value - self._exported[event]
+            if delta:
+                metrics.inc('redlens_resilience_events_total', delta, event=event)
+        self._exported = Counter(self.counters)
+
+    def log_stats(self):
+        c = self.counters
+        if not c['requests'] and not c['breaker_rejected']:
+            return
+        errors = ", ".join(f"{k}={v}" for k, v in sorted(c.items()) if k.startswith(('status_', 'error_')))
+        logger.info(f"🛡️ 容错统计 | 请求: {c['requests']} | 重试: {c['retries']} | 放弃: {c['gave_up']} | "
+                    f"限速等待: {c['throttled']} 次/{c['throttled_ms'] / 1000:.1f}s | "
+                    f"熔断: 打开 {c['breaker_opened']} / 拒绝 {c['breaker_rejected']} / 恢复 {c['breaker_closed']}"
+                    + (f" | 失败明细: {errors}" if errors else ""))
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+RedLens 数据工厂 - 咪咕扫描断点日志
+功能:
+1. 每完成一个 match-list 任务 (锚点日期, 赛事) 就把它覆盖的日期和解析出的记录追加到
+   .cache/scan_journal.jsonl，逐行写入并 fsync；进程中途被杀最多丢掉最后一行
+2. 下一次以相同的任务集合启动时 (模式 + 任务哈希一致，且日志未过期) 跳过已完成的任务，
+   把日志里的记录并入结果，长时间回填 / 网络不稳时总耗时有上界
+3. 结果写入状态库并导出后清空日志；失败的请求不记入日志，恢复时会重新请求
+"""
+
+import json
+import logging
+import os
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from http_cache import STATE_DIR
+from io_utils import atomic_write_bytes, content_hash
+
+logger = logging.getLogger(__name__)
+
+# ===== 配置区 =====
+JOURNAL_FILE = os.path.join(STATE_DIR, "scan_journal.jsonl")
+JOURNAL_MAX_AGE = int(os.getenv("SCAN_JOURNAL_MAX_AGE", str(6 * 3600)))  # 超过 N 秒的日志不再用于恢复
+
+Task = Tuple[str, str]  # (YYYYMMDD, comp_id)
+
+
+def scan_id(mode: str, tasks: Iterable[Task]) -> str:
+    return content_hash([mode, sorted(tasks)])
+
+
+class ScanJournal:
+    """enabled=False 时只读 (流水线 --dry-run)，不追加也不清空"""
+
+    def __init__(self, path: str = JOURNAL_FILE, enabled: bool = True):
+        self.path = path
+        self.enabled = enabled
+        self.scan: Optional[str] = None
+
+    def _read(self) -> List[Dict]:
+        if not os.path.exists(self.path):
+            return []
+        entries = []
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    break  # 中断时写了一半的最后一行
+        return entries
+
+    @staticmethod
+    def _line(entry: Dict) -> str:
+        return json.dumps(entry, ensure_ascii=False, separators=(',', ':')) + '\n'
+
+    def _append(self, entry: Dict, mode: str = 'a'):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.path, mode, encoding='utf-8') as f:
+            f.write(self._line(entry))
+            f.flush()
+            os.fsync(f.fileno())
+
+    def begin(self, scan: str) -> Dict[Task, Dict]:
+        """
+        开始 (或恢复) 一次扫描，返回日志中已完成的任务 {(锚点, 赛事): {'dates': [...], 'records': [...]}}。
+        日志属于别的任务集合或已过期时重新开始。
+        """
+        self.scan = scan
+        entries = self._read()
+        header = entries[0] if entries else {}
+        if header.get('scan') == scan and time.time() - header.get('started_at', 0) <= JOURNAL_MAX_AGE:
+            completed = {(e['anchor'], e['comp']): e for e in entries[1:] if 'anchor' in e}
+            if self.enabled:
+                # 按解析出的完整行重写，去掉中断时写了一半的末行，否则新追加的第一条会接在半行后面无法解析
+                atomic_write_bytes(self.path, ''.join(self._line(e) for e in entries).encode('utf-8'))
+            if completed:
+                logger.info(f"📒 断点恢复: 日志中已完成 {len(completed)} 个任务 "
+                            f"({sum(len(e['records']) for e in completed.values())} 条记录)，跳过这些请求")
+            return completed
+        if self.enabled:
+            self._append({'scan': scan, 'started_at': round(time.time(), 3)}, mode='w')
+        return {}
+
+    def record(self, anchor: str, comp_id: str, dates: List[str], records: List[Dict]):
+        """记录一个已完成的任务 (响应成功且记录已解析完)"""
+        if self.enabled and self.scan:
+            self._append({'anchor': anchor, 'comp': comp_id, 'dates': dates, 'records': records})
+
+    def clear(self):
+        """结果已落盘，日志不再需要"""
+        if self.enabled and os.path.exists(self.path):
+            os.remove(self.path)
+        self.scan = None
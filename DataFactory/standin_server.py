@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+RedLens 本地替身服务 (咪咕 + arsenal.com)
+功能:
+1. 回放模式: 按 URL 路径返回录制好的响应
+   - /vms-match/.../normal-match-list/{date}/{comp}/up/1/miguvideo
+   - /vms-match/.../all-view-list/{mgdbId}/2/miguvideo
+   - /results-and-fixtures-list (赛程 HTML)
+2. 录制模式 (--record): 本地没有录制文件时转发到真实源站，并把响应存为 fixture
+3. 故障注入: 固定/抖动延迟、429 比例、5xx 比例、超时比例
+4. 支持 If-None-Match -> 304，便于验证条件请求与本地缓存
+
+用法:
+  python3 DataFactory/standin_server.py --record                     # 先录制一遍真实流量
+  python3 DataFactory/standin_server.py --latency-ms 200 --error-rate 0.1 --throttle-rate 0.05
+  MIGU_BASE_URL=http://127.0.0.1:8765 ARSENAL_BASE_URL=http://127.0.0.1:8765 ./update_all.sh
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import random
+import ssl
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Tuple
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
+logger = logging.getLogger(__name__)
+
+# ===== 配置区 =====
+DEFAULT_PORT = 8765
+DEFAULT_FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "standin_fixtures")
+UPSTREAMS = {
+    '/vms-match/': "https://vms-sc.miguvideo.com",
+    '/results-and-fixtures-list': "https://www.arsenal.com",
+}
+UPSTREAM_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36',
+    'Referer': 'https://www.miguvideo.com/',
+}
+SERVER_ERROR_CODES = [500, 502, 503, 504]
+
+
+def upstream_for(path: str) -> Optional[str]:
+    for prefix, base in UPSTREAMS.items():
+        if path.startswith(prefix):
+            return base
+    return None
+
+
+def fixture_path(fixtures_dir: str, path: str) -> Tuple[str, str]:
+    """URL 路径 -> (fixture 文件, Content-Type)；目录结构与 URL 路径一致"""
+    clean = path.split('?', 1)[0].strip('/')
+    if clean.startswith('vms-match/'):
+        return os.path.join(fixtures_dir, clean + '.json'), 'application/json; charset=utf-8'
+    return os.path.join(fixtures_dir, clean + '.html'), 'text/html; charset=utf-8'
+
+
+class StandinConfig:
+    def __init__(self, args):
+        self.fixtures_dir = args.fixtures_dir
+        self.record = args.record
+        self.latency = args.latency_ms / 1000.0
+        self.jitter = args.jitter_ms / 1000.0
+        self.throttle_rate = args.throttle_rate
+        self.error_rate = args.error_rate
+        self.timeout_rate = args.timeout_rate
+        self.timeout_seconds = args.timeout_seconds
+        self.rng = random.Random(args.seed)
+        self.lock = threading.Lock()
+        self.stats = Counter()
+
+    def draw(self) -> float:
+        with self.lock:
+            return self.rng.random()
+
+    def count(self, key: str):
+        with self.lock:
+            self.stats[key] += 1
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    config: StandinConfig = None
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, fmt, *args):
+        logger.debug(fmt % args)
+
+    def _send(self, status: int, body: bytes = b'', content_type: str = 'application/json; charset=utf-8',
+              headers: Optional[dict] = None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        if body and self.command != 'HEAD':
+            self.wfile.write(body)
+        self.config.count(f"status_{status}")
+
+    def _inject_faults(self) -> bool:
+        """返回 True 表示已经以故障响应结束本次请求"""
+        cfg = self.config
+        delay = cfg.latency + (cfg.draw() * cfg.jitter if cfg.jitter else 0)
+        if delay > 0:
+            time.sleep(delay)
+
+        roll = cfg.draw()
+        if roll < cfg.timeout_rate:
+            cfg.count('fault_timeout')
+            time.sleep(cfg.timeout_seconds)  # 客户端超时后连接直接断开
+            self.close_connection = True
+            return True
+        roll -= cfg.timeout_rate
+        if roll < cfg.throttle_rate:
+            cfg.count('fault_429')
+            self._send(429, b'{"code":429}', headers={'Retry-After': '1'})
+            return True
+        roll -= cfg.throttle_rate
+        if roll < cfg.error_rate:
+            cfg.count('fault_5xx')
+            with cfg.lock:
+                status = cfg.rng.choice(SERVER_ERROR_CODES)
+            self._send(status, b'{"code":500}')
+            return True
+        return False
+
+    def _record(self, path: str, target: str) -> Optional[bytes]:
+        base = upstream_for(path)
+        if not base:
+            return None
+        context = ssl.create_default_context()
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE  # 与抓取脚本的 verify=False 保持一致
+        try:
+            request = urllib.request.Request(base + path, headers=UPSTREAM_HEADERS)
+            with urllib.request.urlopen(request, timeout=30, context=context) as response:
+                body = response.read()
+        except (urllib.error.URLError, OSError) as e:
+            logger.warning(f"⚠️ 录制失败 {path}: {e}")
+            return None
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, 'wb') as f:
+            f.write(body)
+        self.config.count('recorded')
+        logger.info(f"📼 已录制: {path} -> {os.path.relpath(target, self.config.fixtures_dir)}")
+        return body
+
+    def do_GET(self):
+        cfg = self.config
+        if self.path == '/__stats':
+            with cfg.lock:
+                body = json.dumps(dict(cfg.stats), ensure_ascii=False).encode('utf-8')
+            return self._send(200, body)
+
+        cfg.count('requests')
+        if self._inject_faults():
+            return
+
+        target, content_type = fixture_path(cfg.fixtures_dir, self.path)
+        body = None
+        if os.path.exists(target):
+            with open(target, 'rb') as f:
+                body = f.read()
+        elif cfg.record:
+            body = self._record(self.path, target)
+
+        if body is None:
+            cfg.count('missing')
+            logger.info(f"❓ 无录制数据: {self.path}")
+            return self._send(404, b'{"code":404}')
+
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        if self.headers.get('If-None-Match') == etag:
+            return self._send(304, headers={'ETag': etag})
+        self._send(200, body, content_type, headers={'ETag': etag})
+
+    do_HEAD = do_GET
+
+
+def main():
+    parser = argparse.ArgumentParser(description="咪咕 / arsenal.com 本地替身服务")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--fixtures-dir', default=DEFAULT_FIXTURES_DIR, help="录制文件目录")
+    parser.add_argument('--record', action='store_true', help="缺失的 fixture 从真实源站拉取并保存")
+    parser.add_argument('--latency-ms', type=float, default=0, help="每个请求的固定延迟")
+    parser.add_argument('--jitter-ms', type=float, default=0, help="额外的随机延迟上限")
+    parser.add_argument('--throttle-rate', type=float, default=0, help="返回 429 的比例")
+    parser.add_argument('--error-rate', type=float, default=0, help="返回 5xx 的比例")
+    parser.add_argument('--timeout-rate', type=float, default=0, help="挂起直到客户端超时的比例")
+    parser.add_argument('--timeout-seconds', type=float, default=35, help="超时故障的挂起时长")
+    parser.add_argument('--seed', type=int, default=None, help="故障注入随机种子 (便于复现)")
+    args = parser.parse_args()
+
+    StandinHandler.config = StandinConfig(args)
+    server = ThreadingHTTPServer((args.host, args.port), StandinHandler)
+    server.daemon_threads = True
+    logger.info(f"🧪 替身服务已启动: http://{args.host}:{args.port} | fixtures: {args.fixtures_dir} | "
+                f"录制: {'开' if args.record else '关'}")
+    logger.info(f"   export MIGU_BASE_URL=http://{args.host}:{args.port} ARSENAL_BASE_URL=http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        logger.info(f"📊 请求统计: {json.dumps(dict(StandinHandler.config.stats), ensure_ascii=False)}")
+
+
+if __name__ == "__main__":
+    main()
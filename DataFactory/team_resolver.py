@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+RedLens 数据工厂 - 队名解析器
+功能:
+1. 由 team_name_mapping.json (+ team_aliases.json 别名) 编译出 "规范化队名 -> 球队 ID" 索引
+2. 中英文队名统一解析为同一个球队 ID (如 "Wolves" / "Wolverhampton Wanderers" / "狼队")
+3. 查询结果记忆化；只有索引未命中时才走模糊兜底 (小编辑距离，不做前缀匹配: "Villa" 不是比利亚雷亚尔，
+   "Paris FC" 不是巴黎圣日耳曼)；简称请写进 team_aliases.json。
+   短于 4 个字符的队名 ("曼城" / "曼联") 只做精确匹配，避免误配；
+   带女足 / U21 / 青年队等后缀的名字不做模糊兜底，不会被并到一线队
+4. 按英文规范名列出球队的全部中文写法 (咪咕抓取器识别多个跟踪俱乐部时使用)
+"""
+
+import json
+import logging
+import os
+import re
+import unicodedata
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+MAPPING_FILE = "team_name_mapping.json"
+ALIASES_FILE = "team_aliases.json"   # {"英文规范名": ["别名", ...]}，可选
+
+_PUNCT_PATTERN = re.compile(r"[\s\.\-'’&·•,()（）]+")
+_AFFIX_PATTERN = re.compile(r"^(fc|afc|cf)(?=.)|(?<=.)(fc|afc|cf|足球俱乐部|俱乐部)$")
+FUZZY_MIN_LENGTH = 4       # 规范化后短于此长度的名字不做编辑距离兜底
+# 女足 / 青年队等变体队名的后缀 (规范化后匹配)，这类名字只认精确命中
+_VARIANT_PATTERN = re.compile(r"(女足|女子|女篮|u\d{2}|青年队?|预备队|后备队|women|womens|ladies|youth|reserves?)$")
+
+
+def normalize_name(name: str) -> str:
+    """NFKC + 小写 + 去标点空格 + 去 FC/俱乐部 等前后缀"""
+    text = unicodedata.normalize('NFKC', name or '').lower()
+    text = _PUNCT_PATTERN.sub('', text)
+    return _AFFIX_PATTERN.sub('', text)
+
+
+def slugify(name: str) -> str:
+    return re.sub(r'[^a-z0-9]+', '-', unicodedata.normalize('NFKD', name).lower()).strip('-')
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Levenshtein 距离，超过 limit 时提前返回 limit + 1"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+class TeamResolver:
+    """队名 -> 球队 ID (英文规范名的 slug)"""
+
+    def __init__(self, mapping: Dict[str, str], aliases: Optional[Dict[str, List[str]]] = None):
+        self.index: Dict[str, str] = {}
+        self.english: Dict[str, str] = {}
+        self.chinese: Dict[str, str] = {}
+        self._memo: Dict[str, Optional[str]] = {}
+        self.fuzzy_hits = 0
+        self.misses = 0
+
+        # 同一个中文名的多个英文写法归为同一支球队，以第一个出现的英文名为规范名
+        by_chinese: Dict[str, str] = {}
+        for en, cn in mapping.items():
+            team_id = by_chinese.setdefault(cn, slugify(en))
+            self.english.setdefault(team_id, en)
+            self.chinese.setdefault(team_id, cn)
+            self._add(en, team_id)
+            self._add(cn, team_id)
+
+        for canonical, names in (aliases or {}).items():
+            team_id = self.resolve(canonical) or slugify(canonical)
+            self.english.setdefault(team_id, canonical)
+            self._add(canonical, team_id)
+            for alias in names:
+                self._add(alias, team_id)
+        self._memo.clear()
+
+    def _add(self, name: str, team_id: str):
+        key = normalize_name(name)
+        if not key:
+            return
+        existing = self.index.setdefault(key, team_id)
+        if existing != team_id:
+            logger.warning(f"⚠️ 队名冲突: '{name}' 同时指向 {existing} / {team_id}，保留前者")
+
+    @classmethod
+    def from_files(cls, mapping_file: str = MAPPING_FILE, aliases_file: str = ALIASES_FILE) -> 'TeamResolver':
+        with open(mapping_file, 'r', encoding='utf-8') as f:
+            mapping = json.load(f)
+        return cls(mapping, load_aliases(aliases_file))
+
+    def resolve(self, name: str) -> Optional[str]:
+        """返回球队 ID，无法识别时返回 None"""
+        if name in self._memo:
+            return self._memo[name]
+        key = normalize_name(name)
+        team_id = self.index.get(key)
+        if team_id is None and key:
+            team_id = self._fuzzy(key)
+            if team_id is None:
+                self.misses += 1
+            else:
+                self.fuzzy_hits += 1
+                logger.debug(f"   🔤 模糊识别队名: {name} -> {team_id}")
+        self._memo[name] = team_id
+        return team_id
+
+    def _fuzzy(self, key: str) -> Optional[str]:
+        if _VARIANT_PATTERN.search(key):
+            return None  # "曼联女足" / "切尔西U21" 不是一线队
+
+        # 小编辑距离: "南安普敦" -> "南安普顿"；距离相同的候选不止一支球队时宁可不配
+        if len(key) < FUZZY_MIN_LENGTH:
+            return None
+        limit = max(1, len(key) // 4)
+        best, best_ids = limit + 1, set()
+        for k, tid in self.index.items():
+            if len(k) < FUZZY_MIN_LENGTH:
+                continue
+            d = edit_distance(key, k, limit)
+            if d < best:
+                best, best_ids = d, {tid}
+            elif d == best:
+                best_ids.add(tid)
+        return best_ids.pop() if best <= limit and len(best_ids) == 1 else None
+
+    def english_name(self, team_id: str) -> Optional[str]:
+        return self.english.get(team_id)
+
+    def chinese_name(self, team_id: str) -> Optional[str]:
+        return self.chinese.get(team_id)
+
+
+def load_aliases(aliases_file: str = ALIASES_FILE) -> Dict[str, List[str]]:
+    if not os.path.exists(aliases_file):
+        return {}
+    try:
+        with open(aliases_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"⚠️ 别名文件读取失败 {aliases_file}: {e}")
+        return {}
+
+
+def is_chinese(name: str) -> bool:
+    return any('一' <= ch <= '鿿' for ch in name or '')
+
+
+def chinese_names(english: str, mapping: Dict[str, str], aliases: Optional[Dict[str, List[str]]] = None) -> List[str]:
+    """某支球队在咪咕侧可能出现的中文写法: 映射表里的中文名在前，其后是别名表里的中文别名"""
+    names = [mapping[english]] if mapping.get(english) else []
+    for alias in (aliases or {}).get(english, []):
+        if is_chinese(alias) and alias not in names:
+            names.append(alias)
+    return names
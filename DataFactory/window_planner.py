@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+RedLens 数据工厂 - match-list 日期窗口合并
+功能:
+1. normal-match-list/{date}/{comp}/up 一次返回一段日期 (matchList 以日期为键)，
+   按赛事学习 "锚点日期 -> 覆盖窗口" 的偏移量，持久化到 .cache/migu_windows.json
+2. 按学到的窗口为每个赛事挑选最少的锚点日期覆盖全部需要的日期 (区间覆盖贪心)
+3. 首轮响应返回后按实际覆盖的日期核对，漏掉的日期以原日期为锚点补抓一轮，
+   窗口估计偏大或响应失败时最多退化为逐日请求
+4. 统计并输出本次节省的请求数
+"""
+
+import json
+import logging
+import os
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from http_cache import STATE_DIR
+from io_utils import atomic_write_json
+
+logger = logging.getLogger(__name__)
+
+WINDOWS_FILE = os.path.join(STATE_DIR, "migu_windows.json")
+WINDOW_COALESCING = os.getenv("MIGU_WINDOW_COALESCING", "1") != "0"  # 0 = 每个日期单独请求
+DATE_FORMAT = '%Y%m%d'
+
+Task = Tuple[str, str]  # (YYYYMMDD, comp_id)
+
+
+def _to_date(value: str) -> Optional[date]:
+    try:
+        return datetime.strptime(value, DATE_FORMAT).date()
+    except (TypeError, ValueError):
+        return None
+
+
+def response_dates(data: Optional[Dict], anchor: str) -> List[str]:
+    """响应里 matchList 的日期键；列表形式的 matchList 视为只覆盖锚点当天"""
+    if not data or data.get('code') != 200:
+        return []
+    match_list = (data.get('body') or {}).get('matchList')
+    if isinstance(match_list, dict):
+        return [k for k in match_list if _to_date(k)]
+    if isinstance(match_list, list):
+        return [anchor]
+    return []
+
+
+class WindowPlanner:
+    """
+    窗口以相对锚点的天数偏移 [lo, hi] 表示。matchList 只列出有比赛的日期，单个响应看到的跨度
+    一定落在真实窗口之内，所以取历次观测的并集作为估计：只会逐渐逼近真实窗口，不会越界。
+    没有观测时窗口为 [0, 0]，即与逐日请求完全一致。
+    """
+
+    def __init__(self, path: str = WINDOWS_FILE, enabled: bool = WINDOW_COALESCING):
+        self.path = path
+        self.enabled = enabled
+        self.windows: Dict[str, Dict] = self._load()
+        self._dirty = False
+        self.reset()
+
+    def reset(self):
+        """清空单次抓取的覆盖记录 (常驻进程每一轮开始时调用)，已学到的窗口保留"""
+        self.covered: Dict[str, Set[str]] = {}   # comp_id -> 已被响应覆盖的日期
+        self.requested: Set[Task] = set()
+        self.waves = 0
+
+    def _load(self) -> Dict[str, Dict]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ 窗口记录读取失败 {self.path}: {e}")
+            return {}
+
+    def save(self):
+        if not self._dirty:
+            return
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        atomic_write_json(self.path, self.windows)
+        self._dirty = False
+
+    def window(self, comp_id: str) -> Tuple[int, int]:
+        w = self.windows.get(comp_id) if self.enabled else None
+        return (w['lo'], w['hi']) if w else (0, 0)
+
+    def plan(self, tasks: Iterable[Task]) -> List[Task]:
+        """首轮锚点: 每个赛事按已学窗口做区间覆盖，锚点优先选本来就需要的日期"""
+        by_comp: Dict[str, List[date]] = {}
+        for date_str, comp_id in tasks:
+            day = _to_date(date_str)
+            if day:
+                by_comp.setdefault(comp_id, []).append(day)
+
+        anchors: List[Task] = []
+        for comp_id, days in by_comp.items():
+            lo, hi = self.window(comp_id)
+            days = sorted(set(days))
+            i = 0
+            while i < len(days):
+                first = days[i]
+                # 窗口 [a+lo, a+hi] 覆盖 first 的锚点 a 位于 [first-hi, first-lo]，取能覆盖到最远的那个
+                latest = first - timedelta(days=lo)
+                candidates = [d for d in days[i:] if d <= latest and d >= first - timedelta(days=hi)]
+                anchor = candidates[-1] if candidates else latest
+                anchors.append((anchor.strftime(DATE_FORMAT), comp_id))
+                reach = anchor + timedelta(days=hi)
+                while i < len(days) and days[i] <= reach:
+                    i += 1
+        self.waves += 1
+        self.requested.update(anchors)
+        return sorted(anchors)
+
+    def observe(self, anchor: str, comp_id: str, data: Optional[Dict]):
+        """记录一次响应实际覆盖的日期，并扩展该赛事的窗口估计"""
+        if not data or data.get('code') != 200:
+            return
+        self.record_coverage(anchor, comp_id, response_dates(data, anchor))
+
+    def record_coverage(self, anchor: str, comp_id: str, keys: List[str], learn: bool = True):
+        """
+        一次成功响应的锚点与 matchList 日期键 (断点恢复时由日志直接提供)。
+        learn=False 时只计入覆盖、不扩展窗口估计 (恢复的任务不应改变本次规划的锚点)
+        """
+        covered = self.covered.setdefault(comp_id, set())
+        covered.add(anchor)  # 成功请求过的锚点本身视为已处理 (与逐日请求一致)
+        anchor_day = _to_date(anchor)
+        if not keys or anchor_day is None:
+            return
+        days = sorted(_to_date(k) for k in keys)
+        first, last = days[0], days[-1]
+        day = first
+        while day <= last:
+            covered.add(day.strftime(DATE_FORMAT))
+            day += timedelta(days=1)
+        if not learn:
+            return
+
+        lo, hi = (first - anchor_day).days, (last - anchor_day).days
+        w = self.windows.get(comp_id)
+        if w is None or lo < w['lo'] or hi > w['hi']:
+            self.windows[comp_id] = {
+                'lo': min(lo, w['lo']) if w else lo,
+                'hi': max(hi, w['hi']) if w else hi,
+                'updated_at': datetime.now().isoformat(timespec='seconds'),
+            }
+            self._dirty = True
+
+    def uncovered(self, tasks: Iterable[Task]) -> Set[Task]:
+        """还没被任何响应 (含断点日志) 覆盖的任务"""
+        return {t for t in tasks if t[0] not in self.covered.get(t[1], set())}
+
+    def follow_up(self, tasks: Iterable[Task]) -> List[Task]:
+        """
+        核对上一轮: 需要的日期既不在任何响应的覆盖范围内、也没有以它为锚点成功请求过时，
+        以该日期本身为锚点补抓 (已经请求过的锚点不重复请求，与逐日请求时的失败行为一致)
+        """
+        missing = sorted(t for t in self.uncovered(tasks) if t not in self.requested)
+        if missing:
+            self.waves += 1
+            self.requested.update(missing)
+        return missing
+
+    def log_savings(self, needed: int):
+        made = len(self.requested)
+        saved = needed - made
+        logger.info(f"🧮 窗口合并: 需要 {needed} 个 (日期, 赛事) → 实际 {made} 个请求 ({self.waves} 轮)，"
+                    f"节省 {saved} 个请求")